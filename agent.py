@@ -0,0 +1,453 @@
+"""
+The agent loop, shared by the command-line interface (`main.py`) and the
+long-running server (`server.py`).
+
+An `AgentSession` owns everything that belongs to a single conversation:
+the `messages` history, the working directory the tools are confined to,
+and the iteration counter. It can be driven either synchronously with
+`client.models` or as an asyncio task with `client.aio.models`.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+# Local imports
+from prompts import system_prompt
+from config import (
+    CALL_LEDGER_ENABLED,
+    HISTORY_TOKEN_BUDGET,
+    MAX_ITERATIONS,
+    MAX_TOOL_WORKERS,
+    MODEL_NAME,
+    WORKING_DIR,
+)
+from executor import execute_function_calls
+from history import HistoryManager
+from call_ledger import CallLedger
+from checkpoint import SessionCheckpoint
+from scheduler import ModelScheduler, SessionDeadlineExceeded
+from tracing import Tracer, payload_size
+from output_shaping import shape_output
+from functions.bulk_files import recover_interrupted_writes
+from functions.output_store import OutputStore
+from functions.read_ledger import ReadLedger
+from functions.registry import available_functions, function_map, model_arguments
+
+
+def call_function(
+    function_call_part: types.Part,
+    verbose: bool = False,
+    working_directory: str = WORKING_DIR,
+    tool_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    output_store: Optional[OutputStore] = None,
+    call_ledger: Optional[CallLedger] = None,
+) -> types.Content:
+    """
+    Executes a specific tool (function) requested by the model.
+
+    Args:
+        function_call_part: The part of the response containing the function call details.
+        verbose (bool): Whether to print detailed logs.
+        working_directory (str): The sandbox directory the tool is confined to.
+        tool_options (dict, optional): Host-side keyword arguments per tool name
+            (e.g. {"run_python_file": {"exec_mode": "forkserver"}}). These are
+            never exposed to the model.
+        output_store (OutputStore, optional): Keeps the originals of results
+            that are shortened before entering the history.
+        call_ledger (CallLedger, optional): The session's earlier calls; a
+            read-only call repeating one over unchanged files is answered
+            with a back-reference instead of being run.
+
+    Returns:
+        types.Content: The (shaped) output of the tool wrapped in a format the model understands.
+    """
+    function_name = function_call_part.name
+    target_function = function_map.get(function_name)
+
+    if target_function is None:
+        # Handle case where model hallucinates a non-existent function
+        return types.Content(
+            role="tool",
+            parts=[
+                types.Part.from_function_response(
+                    name=function_name,
+                    response={"error": f"Unknown function: {function_name}"},
+                )
+            ],
+        )
+
+    # Host-side options (limits, ledgers, ...) must not be set by the model
+    original_args = model_arguments(function_name, function_call_part.args)
+
+    # Create a copy of args to inject the secure working directory
+    new_args = dict(original_args)
+    new_args["working_directory"] = working_directory
+    new_args.update((tool_options or {}).get(function_name, {}))
+
+    # Logging
+    if verbose:
+        print(f"Calling function: {function_name}({original_args})")
+    else:
+        print(f" - Calling function: {function_name}...")
+
+    ticket = call_ledger.begin(function_name, dict(original_args)) if call_ledger is not None else None
+    if ticket is not None and ticket.reference is not None:
+        function_result = ticket.reference
+    else:
+        # Execute the actual Python function
+        try:
+            function_result = target_function(**new_args)
+        except Exception as e:
+            function_result = f"Error executing tool: {e}"
+        if ticket is not None:
+            call_ledger.finish(ticket, function_result)
+
+        # Collapse repeats and fit the result to the tool's token budget
+        if isinstance(function_result, str):
+            function_result = shape_output(function_name, function_result, output_store)
+
+    # Return the result back to the model
+    return types.Content(
+        role="tool",
+        parts=[
+            types.Part.from_function_response(
+                name=function_name,
+                response={"result": function_result},
+            )
+        ],
+    )
+
+
+def generate_content_config() -> types.GenerateContentConfig:
+    """Builds the request configuration shared by every model call."""
+    return types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        tools=[available_functions()],
+        temperature=0.0, # Keep it deterministic for code generation
+    )
+
+
+class AgentSession:
+    """
+    A single conversation between the user, the model and the tools.
+
+    Attributes:
+        messages (list): The conversation history sent to the model. Old turns
+            are compacted in place to stay within the history token budget.
+        working_directory (str): The sandbox directory for this session's tools.
+        iteration (int): Number of model calls made so far.
+        last_response: The most recent model response, if any.
+        tracer (Tracer): Timings and token counts of every model and tool call.
+        output_store (OutputStore): Originals of shortened tool results,
+            paged by the `read_tool_output` tool.
+        read_ledger (ReadLedger): The file versions the model has, so
+            re-reads can be answered with only what changed.
+        call_ledger (CallLedger): Earlier tool calls, so repeated ones are
+            answered with a back-reference and loops without progress are
+            stopped; None if CALL_LEDGER_ENABLED is off.
+        scheduler (ModelScheduler): Paces and retries model calls, if set.
+        deadline_seconds (float): Wall-clock budget for each `run`; None (the
+            default) or 0 for no limit.
+        checkpoint (SessionCheckpoint): Where each step is saved, if set.
+        final_text (str): The model's final answer once the loop has finished.
+    """
+
+    def __init__(
+        self,
+        working_directory: str = WORKING_DIR,
+        verbose: bool = False,
+        max_workers: int = MAX_TOOL_WORKERS,
+        max_iterations: int = MAX_ITERATIONS,
+        history_token_budget: int = HISTORY_TOKEN_BUDGET,
+        tool_options: Optional[Dict[str, Dict[str, Any]]] = None,
+        tracer: Optional[Tracer] = None,
+        scheduler: Optional[ModelScheduler] = None,
+        deadline_seconds: Optional[float] = None,
+        checkpoint: Optional[SessionCheckpoint] = None,
+    ):
+        self.working_directory = working_directory
+        # Roll back a write_files transaction that a crash left half-applied
+        recover_interrupted_writes(working_directory)
+        self.verbose = verbose
+        self.max_workers = max_workers
+        self.max_iterations = max_iterations
+        self.output_store = OutputStore()
+        self.read_ledger = ReadLedger()
+        self.call_ledger = CallLedger(working_directory) if CALL_LEDGER_ENABLED else None
+        # Copied per session: the tools below must see this session's own state
+        self.tool_options = {name: dict(options) for name, options in (tool_options or {}).items()}
+        self.tool_options.setdefault("read_tool_output", {})["store"] = self.output_store
+        for name in ("get_file_content", "read_files", "write_file", "write_files"):
+            self.tool_options.setdefault(name, {})["ledger"] = self.read_ledger
+        self.messages: List[types.Content] = []
+        self.iteration = 0
+        self.last_response = None
+        self.final_text: Optional[str] = None
+        # Content elided from the history is no longer a valid base for delta
+        # reads, and an elided result can no longer be referred back to
+        self.history = HistoryManager(
+            token_budget=history_token_budget,
+            on_file_elided=self.read_ledger.forget,
+            on_output_elided=self.call_ledger.forget_output if self.call_ledger is not None else None,
+        )
+        self.tracer = tracer or Tracer()
+        # Rate limits and retries for model calls; None calls the model directly
+        self.scheduler = scheduler
+        self.deadline_seconds = deadline_seconds
+        # Persists every step so an interrupted session can be resumed
+        self.checkpoint = checkpoint
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """
+        Continues from a loaded checkpoint (see `SessionCheckpoint.load`).
+
+        The read ledger starts empty, so the first re-read of each file is
+        delivered in full rather than as a diff against the history.
+        """
+        self.messages = state["messages"]
+        self.iteration = state["iteration"]
+        self.final_text = state["final_text"]
+        self.output_store.restore(state.get("outputs") or {}, state.get("next_output_id", 1))
+
+    def pending_tool_calls(self) -> Optional[List[types.FunctionCall]]:
+        """
+        Returns the function calls of the last model turn if their results
+        are not in the history yet (e.g. the process died while running them).
+        """
+        if not self.messages or self.messages[-1].role != "model":
+            return None
+        calls = [part.function_call for part in self.messages[-1].parts or [] if part.function_call]
+        return calls or None
+
+    def _save_checkpoint(self) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.messages, self.iteration, self.final_text, self.output_store)
+
+    def add_user_prompt(self, user_prompt: str) -> None:
+        """Appends a new user instruction and resets the per-task state."""
+        pending = self.pending_tool_calls()
+        if pending:
+            # The model expects a response to each of its calls before the
+            # next prompt; calls it still needs it can make again
+            self.messages.append(
+                types.Content(
+                    role="user",
+                    parts=[
+                        types.Part.from_function_response(
+                            name=call.name,
+                            response={"error": "Not run: the session was interrupted before this call ran."},
+                        )
+                        for call in pending
+                    ],
+                )
+            )
+        self.messages.append(
+            types.Content(
+                role="user",
+                parts=[types.Part(text=user_prompt)],
+            )
+        )
+        self.iteration = 0
+        self.final_text = None
+        if self.call_ledger is not None:
+            self.call_ledger.stalled_rounds = 0
+
+    def request_kwargs(self) -> Dict[str, Any]:
+        """Returns the arguments for the next `generate_content` call."""
+        # Drop stale tool outputs and old file dumps before re-sending history
+        start = self.tracer.now()
+        history_tokens = self.history.compact(self.messages)
+        self.tracer.record_span(
+            "history", "compact", self.iteration + 1, start, self.tracer.now(), history_tokens=history_tokens
+        )
+        return {
+            "model": MODEL_NAME,
+            "contents": self.messages,
+            "config": generate_content_config(),
+        }
+
+    def handle_response(self, response: types.GenerateContentResponse) -> Optional[List[types.FunctionCall]]:
+        """
+        Records a model response in the history.
+
+        Returns:
+            list: The function calls to execute, or None if the loop is over
+            (in which case `final_text` holds the answer, if there is one).
+        """
+        self.iteration += 1
+        self.last_response = response
+
+        if not response.candidates:
+            print("Error: No candidates returned from model.")
+            return None
+
+        # Add the model's response (thoughts/function calls) to history
+        for candidate in response.candidates:
+            self.messages.append(candidate.content)
+
+        if response.function_calls:
+            self._save_checkpoint()
+            return response.function_calls
+
+        # No function calls? We have the final answer.
+        if response.text:
+            self.final_text = response.text
+        else:
+            print("Model returned no text and no function calls. Stopping.")
+        self._save_checkpoint()
+        return None
+
+    def run_tool_calls(self, function_calls: List[types.FunctionCall]) -> None:
+        """Executes the requested tools and appends their results to the history."""
+        def traced_call(call: types.FunctionCall) -> types.Content:
+            start = self.tracer.now()
+            result = call_function(
+                call,
+                verbose=self.verbose,
+                working_directory=self.working_directory,
+                tool_options=self.tool_options,
+                output_store=self.output_store,
+                call_ledger=self.call_ledger,
+            )
+            response = result.parts[0].function_response.response if result.parts else None
+            self.tracer.record_tool_call(
+                self.iteration,
+                call.name,
+                start,
+                self.tracer.now(),
+                args_bytes=payload_size(dict(call.args or {})),
+                result_bytes=payload_size(response),
+            )
+            return result
+
+        # Execute the function calls (independent ones run concurrently)
+        if self.call_ledger is not None:
+            self.call_ledger.start_round(self.iteration)
+        results = execute_function_calls(function_calls, traced_call, max_workers=self.max_workers)
+        if self.call_ledger is not None:
+            self.call_ledger.end_round()
+
+        function_call_results = []
+        for result in results:
+            # Validate the structure of the result
+            if (
+                not hasattr(result, "parts")
+                or not result.parts
+                or not hasattr(result.parts[0], "function_response")
+            ):
+                raise RuntimeError("Function call returned invalid format.")
+
+            part = result.parts[0]
+            function_call_results.append(part)
+
+            if self.verbose:
+                print(f"   -> Tool Output: {part.function_response.response}")
+
+        # Append tool results to history so the model can see them
+        if function_call_results:
+            self.messages.append(
+                types.Content(
+                    role="user", # In GenAI SDK, tool outputs often come as user role
+                    parts=function_call_results,
+                )
+            )
+        self._save_checkpoint()
+
+    def _deadline(self) -> Optional[float]:
+        """Returns the monotonic deadline for a run starting now."""
+        return time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+
+    @staticmethod
+    def _check_deadline(deadline: Optional[float]) -> None:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise SessionDeadlineExceeded("Session deadline reached")
+
+    def stalled(self) -> bool:
+        """
+        Returns True (after saying so) if the last turns only repeated
+        earlier tool calls, so further iterations would be wasted.
+        """
+        if self.call_ledger is None or not self.call_ledger.stalled:
+            return False
+        print(
+            f"Stopping: the last {self.call_ledger.stalled_rounds} turns only repeated earlier "
+            "tool calls without making progress."
+        )
+        return True
+
+    def run(self, client) -> Optional[str]:
+        """
+        Runs the reasoning loop with the synchronous client.
+
+        Flow:
+        1. Model thinks and decides if it needs to use a tool.
+        2. If tool needed -> Script executes tool -> Returns result to Model -> Loop back to 1.
+        3. If no tool needed -> Model gives final answer -> Exit.
+
+        Returns:
+            str: The model's final answer, or None if the loop ended without one.
+        """
+        deadline = self._deadline()
+        pending = self.pending_tool_calls()
+        if pending:
+            # Resumed right after a model turn: run its tools before calling the model again
+            self.run_tool_calls(pending)
+        while self.iteration < self.max_iterations:
+            try:
+                self._check_deadline(deadline)
+                # Send history to the model and get a response
+                request = self.request_kwargs()
+                start = self.tracer.now()
+                if self.scheduler is not None:
+                    response = self.scheduler.generate(client.models.generate_content, request, deadline)
+                else:
+                    response = client.models.generate_content(**request)
+                self.tracer.record_model_call(self.iteration + 1, start, self.tracer.now(), response)
+                function_calls = self.handle_response(response)
+                if function_calls is None:
+                    break
+                self.run_tool_calls(function_calls)
+                if self.stalled():
+                    break
+
+            except Exception as e:
+                print(f"\n❌ Error during agent loop: {e}")
+                break
+
+        return self.final_text
+
+    async def run_async(self, client) -> Optional[str]:
+        """
+        Runs the reasoning loop with the asynchronous client (`client.aio`).
+
+        Tool calls are blocking file and process operations, so they run in
+        a worker thread to keep the event loop free for other sessions.
+        Unlike `run`, errors are propagated to the caller.
+
+        Returns:
+            str: The model's final answer, or None if the loop ended without one.
+        """
+        deadline = self._deadline()
+        pending = self.pending_tool_calls()
+        if pending:
+            await asyncio.to_thread(self.run_tool_calls, pending)
+        while self.iteration < self.max_iterations:
+            self._check_deadline(deadline)
+            request = self.request_kwargs()
+            start = self.tracer.now()
+            if self.scheduler is not None:
+                response = await self.scheduler.agenerate(client.aio.models.generate_content, request, deadline)
+            else:
+                response = await client.aio.models.generate_content(**request)
+            self.tracer.record_model_call(self.iteration + 1, start, self.tracer.now(), response)
+            function_calls = self.handle_response(response)
+            if function_calls is None:
+                break
+            await asyncio.to_thread(self.run_tool_calls, function_calls)
+            if self.stalled():
+                break
+
+        return self.final_text
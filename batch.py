@@ -0,0 +1,269 @@
+"""
+Batch mode: run a JSONL file of tasks concurrently, each in its own workspace.
+
+Every task gets a private copy of a template directory (a copy-on-write
+clone where the filesystem supports it), so tasks can edit and run code
+without seeing each other's changes. Tasks run as async agent sessions on
+one shared client, at most `--concurrency` at a time, and each result is
+appended to the output JSONL as soon as its task finishes.
+
+Input (one JSON object per line):
+    {"id": "...", "prompt": "...", "template": "path/to/repo"}
+
+    - "id" (optional) names the task and its workspace; defaults to the line number.
+    - "template" (optional) is the directory to copy. Defaults to config.WORKING_DIR
+      (or --template).
+
+Output (one JSON object per line, in completion order):
+    {"id": "...", "status": "ok", "result": "...", "iterations": 4, "seconds": 12.3,
+     "working_directory": "...", "usage": {...}}
+    {"id": "...", "status": "error", "error": "...", ...}
+
+Usage:
+    python batch.py tasks.jsonl results.jsonl [--concurrency 8] [--workspace-root DIR]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Local imports
+from agent import AgentSession
+from config import (
+    BATCH_MAX_CONCURRENT_TASKS,
+    MAX_TOOL_WORKERS,
+    RESPONSE_CACHE_MODE,
+    RUN_CACHE_ENABLED,
+    SESSION_DEADLINE_SECONDS,
+    WORKING_DIR,
+)
+from response_cache import MODES as RESPONSE_CACHE_MODES, CachingClient, ResponseCache
+from scheduler import shared_scheduler
+from server import create_client
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+def clone_workspace(template: str, destination: str) -> None:
+    """
+    Copies `template` to `destination`, which must not exist yet.
+
+    Uses `cp --reflink=auto` where available, so on copy-on-write
+    filesystems (btrfs, XFS, APFS via `cp -c`) the clone shares data blocks
+    with the template and costs almost nothing; otherwise it is a regular
+    recursive copy.
+
+    Raises:
+        FileExistsError: If `destination` exists, e.g. a workspace left by
+            an earlier batch in the same workspace root, or another task
+            whose id maps to the same directory name.
+    """
+    # Claimed atomically, so two tasks can never share (or copy into) one
+    # workspace; the template's contents are then copied into it
+    os.mkdir(destination)
+    source = os.path.join(template, ".")
+    commands = {
+        "linux": ["cp", "-a", "--reflink=auto", source, destination],
+        "darwin": ["cp", "-Rc", source, destination],
+    }
+    command = commands.get(sys.platform)
+    if command is not None and shutil.which(command[0]):
+        completed = subprocess.run(command, capture_output=True)
+        if completed.returncode == 0:
+            return
+    # Only the directory created above is ever removed
+    shutil.rmtree(destination, ignore_errors=True)
+    shutil.copytree(template, destination, symlinks=True)
+
+
+def load_tasks(path: str) -> List[Dict[str, Any]]:
+    """Reads and validates the task list."""
+    tasks = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            task = json.loads(line)
+            if not isinstance(task, dict) or not task.get("prompt"):
+                raise ValueError(f'{path}:{number}: each task needs a "prompt"')
+            task_id = str(task.get("id", number))
+            if task_id in seen:
+                raise ValueError(f"{path}:{number}: duplicate task id {task_id!r}")
+            seen.add(task_id)
+            tasks.append({**task, "id": task_id})
+    return tasks
+
+
+def _workspace_name(task_id: str) -> str:
+    """Makes a task id safe to use as a directory name."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", task_id)[:100] or "task"
+
+
+class BatchRunner:
+    """
+    Runs tasks with bounded concurrency and streams their results.
+
+    Args:
+        client: A `genai.Client` (or wrapper); its `aio` interface is used.
+        workspace_root (str): Directory that receives one workspace per task.
+        concurrency (int): Maximum number of tasks running at once.
+        session_options (dict): Extra keyword arguments for every AgentSession.
+        rate_limit (bool): Whether model calls go through the shared rate
+            limiter and retry scheduler (see scheduler.py).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        workspace_root: str,
+        concurrency: int = BATCH_MAX_CONCURRENT_TASKS,
+        session_options: Optional[Dict[str, Any]] = None,
+        rate_limit: bool = True,
+    ):
+        self.client = client
+        self.workspace_root = workspace_root
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session_options = session_options or {}
+        self.rate_limit = rate_limit
+
+    async def run_task(self, task: Dict[str, Any], default_template: str) -> Dict[str, Any]:
+        """Clones the workspace and runs one task to completion."""
+        working_directory = os.path.join(self.workspace_root, _workspace_name(task["id"]))
+        reply: Dict[str, Any] = {"id": task["id"], "working_directory": working_directory}
+        session: Optional[AgentSession] = None
+        async with self.semaphore:
+            started = time.monotonic()
+            try:
+                template = task.get("template") or default_template
+                if not os.path.isdir(template):
+                    raise ValueError(f'Template "{template}" is not a directory')
+                await asyncio.to_thread(clone_workspace, template, working_directory)
+
+                session = AgentSession(
+                    working_directory=working_directory,
+                    # Every session gets its own scheduler; they share the process-wide limiter
+                    scheduler=shared_scheduler() if self.rate_limit else None,
+                    **self.session_options,
+                )
+                session.add_user_prompt(task["prompt"])
+                result = await session.run_async(self.client)
+                reply.update(status="ok", result=result, iterations=session.iteration)
+            except Exception as e:
+                reply.update(status="error", error=f"{type(e).__name__}: {e}")
+                if session is not None:
+                    reply["iterations"] = session.iteration
+
+        reply["seconds"] = round(time.monotonic() - started, 3)
+        if session is not None:
+            usage = session.tracer.summary()
+            reply["usage"] = {key: value for key, value in usage.items() if key != "tools"}
+        return reply
+
+    async def run(self, tasks: List[Dict[str, Any]], default_template: str, output_path: str) -> Dict[str, int]:
+        """Runs every task and appends each result to `output_path` as it finishes."""
+        counts = {"ok": 0, "error": 0}
+        with open(output_path, "a", encoding="utf-8") as output:
+            for finished in asyncio.as_completed([self.run_task(task, default_template) for task in tasks]):
+                reply = await finished
+                counts[reply["status"]] += 1
+                output.write(json.dumps(reply) + "\n")
+                output.flush()
+                print(f"[{sum(counts.values())}/{len(tasks)}] {reply['id']}: {reply['status']} ({reply['seconds']}s)")
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of agent tasks in isolated workspaces")
+    parser.add_argument("tasks", help="Input JSONL, one task per line")
+    parser.add_argument("output", help="Output JSONL; results are appended as tasks finish")
+    parser.add_argument("--template", default=WORKING_DIR, help="Directory copied for tasks that do not name one")
+    parser.add_argument(
+        "--workspace-root",
+        help="Directory for the per-task workspaces (default: a new temporary directory)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_MAX_CONCURRENT_TASKS,
+        help="Maximum number of tasks running at once",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_TOOL_WORKERS,
+        help="Maximum number of tool calls from one model turn to run concurrently",
+    )
+    parser.add_argument(
+        "--exec-mode",
+        choices=["subprocess", "forkserver"],
+        default="forkserver",
+        help="How run_python_file starts scripts (batches default to the warm fork server)",
+    )
+    parser.add_argument(
+        "--cache-runs",
+        action="store_true",
+        default=RUN_CACHE_ENABLED,
+        help="Reuse the output of identical script runs over an unchanged workspace",
+    )
+    parser.add_argument(
+        "--response-cache",
+        choices=RESPONSE_CACHE_MODES,
+        default=RESPONSE_CACHE_MODE,
+        help="Record model responses to disk, or replay recorded ones without calling the API",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        default=SESSION_DEADLINE_SECONDS,
+        help="Wall-clock budget for each task; 0 for no limit",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable detailed logging")
+    args = parser.parse_args()
+
+    # Replaying recorded responses needs no key
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key is None and args.response_cache != "replay":
+        raise RuntimeError("GEMINI_API_KEY not found. Please create a .env file with your key.")
+
+    tasks = load_tasks(args.tasks)
+    workspace_root = args.workspace_root or tempfile.mkdtemp(prefix="ai-agent-batch-")
+    os.makedirs(workspace_root, exist_ok=True)
+
+    client = create_client(api_key, args.concurrency) if api_key else None
+    if args.response_cache != "passthrough":
+        client = CachingClient(client, ResponseCache(args.response_cache))
+
+    session_options = {
+        "verbose": args.verbose,
+        "max_workers": args.max_workers,
+        "deadline_seconds": args.deadline,
+        "tool_options": {"run_python_file": {"exec_mode": args.exec_mode, "use_cache": args.cache_runs}},
+    }
+    runner = BatchRunner(
+        client,
+        workspace_root,
+        concurrency=args.concurrency,
+        session_options=session_options,
+        rate_limit=args.response_cache != "replay",
+    )
+
+    print(f"🤖 Running {len(tasks)} tasks (concurrency {args.concurrency}) in {workspace_root}")
+    counts = asyncio.run(runner.run(tasks, os.path.abspath(args.template), args.output))
+    print(f"✅ {counts['ok']} succeeded, ❌ {counts['error']} failed. Results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
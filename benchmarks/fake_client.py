@@ -0,0 +1,69 @@
+"""
+A stand-in for `genai.Client` that replays a scripted conversation.
+
+Each turn of a script is either a list of tool calls, given as
+{"name": ..., "args": {...}} dicts, or a string, which becomes the model's
+final text answer. The fake returns the turns in order regardless of what
+it is sent, so the agent loop and the tools run exactly as they would
+against the real API, minus the network.
+"""
+
+from typing import Any, Dict, List, Union
+
+from google.genai import types
+
+Turn = Union[str, List[Dict[str, Any]]]
+
+
+def scripted_response(turn: Turn, prompt_tokens: int = 0) -> types.GenerateContentResponse:
+    """Builds the model response for one scripted turn."""
+    if isinstance(turn, str):
+        parts = [types.Part(text=turn)]
+    else:
+        parts = [
+            types.Part(function_call=types.FunctionCall(name=call["name"], args=call.get("args", {})))
+            for call in turn
+        ]
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=sum(len(str(part.to_json_dict())) for part in parts) // 4,
+        ),
+    )
+
+
+class _Models:
+    def __init__(self, script: List[Turn]):
+        self._script = list(script)
+        self.calls = 0
+
+    def generate_content(self, model: str, contents: List[types.Content], config: Any = None):
+        if self.calls >= len(self._script):
+            raise RuntimeError("Scripted conversation exhausted")
+        turn = self._script[self.calls]
+        self.calls += 1
+        # Report roughly what the real API would count for the prompt
+        prompt_tokens = sum(len(str(content.model_dump(exclude_none=True))) for content in contents) // 4
+        return scripted_response(turn, prompt_tokens)
+
+
+class _AsyncModels:
+    def __init__(self, models: _Models):
+        self._models = models
+
+    async def generate_content(self, **kwargs: Any):
+        return self._models.generate_content(**kwargs)
+
+
+class _Aio:
+    def __init__(self, models: _Models):
+        self.models = _AsyncModels(models)
+
+
+class ScriptedClient:
+    """Drop-in replacement for `genai.Client` with `.models` and `.aio.models`."""
+
+    def __init__(self, script: List[Turn]):
+        self.models = _Models(script)
+        self.aio = _Aio(self.models)
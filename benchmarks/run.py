@@ -0,0 +1,329 @@
+"""
+Offline benchmark of the agent loop and its tools.
+
+Replays scripted conversations (see benchmarks/fake_client.py) through
+`AgentSession.run`, the loop `main.py` drives, against a synthetic
+workspace, and reports iterations/sec, per-tool latency percentiles and
+peak RSS. Results can be saved as a baseline and later runs compared
+against it; a regression beyond the tolerance makes the run exit with 1.
+
+The baseline records the machine it was measured on, including the time
+of a fixed CPU-bound calibration workload. Timings from another machine
+are scaled by the ratio of the two calibration times before comparing;
+a different Python version is not comparable at all. Re-record the
+baseline only for an intended change in cost, never to make a
+regression pass, and preferably on the machine that recorded it.
+
+Usage (from the repository root):
+    python -m benchmarks.run                      # run and compare to baseline.json
+    python -m benchmarks.run --save-baseline      # run and store a new baseline
+    python -m benchmarks.run --files 2000 --file-size 20000 --output-bytes 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from agent import AgentSession
+from benchmarks.fake_client import ScriptedClient, Turn
+from benchmarks.workspace import make_workspace, module_path
+from config import PYTHON_EXEC_MODE
+from functions.search_code import search_index
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Latencies below this many seconds are treated as noise when comparing
+_NOISE_FLOOR_SECONDS = 0.002
+
+
+def _call(name: str, **args: Any) -> Dict[str, Any]:
+    return {"name": name, "args": args}
+
+
+def scenario_explore(files: int) -> List[Turn]:
+    """Lists the tree, reads a few modules, searches and outlines code."""
+    reads = [_call("get_file_content", file_path=module_path(i)) for i in range(0, files, max(1, files // 4))][:4]
+    return [
+        [_call("get_files_info", directory=".", max_depth=3)],
+        reads,
+        [_call("search_code", query=f"def func_{files // 2}_3"), _call("get_symbols", path="pkg0")],
+        [_call("search_code", query=r"class Model\d+_4\b", regex=True, max_results=20)],
+        [_call("get_symbol_source", file_path=module_path(0), symbol="Model0_4.scaled")],
+        [_call("get_file_content", file_path=module_path(files - 1), start_line=10, end_line=40)],
+        "Explored the workspace.",
+    ]
+
+
+def scenario_edit_run(files: int) -> List[Turn]:
+    """Writes a script, runs it, edits it and runs it again."""
+    script = "from pkg0.mod0 import func_0_2\n\nprint('A', func_0_2(3))\n"
+    return [
+        [_call("write_file", file_path="bench_script.py", content=script)],
+        [_call("run_python_file", file_path="bench_script.py")],
+        [_call("edit_file", file_path="bench_script.py", edits=[{"search": "'A'", "replace": "'B'"}])],
+        [_call("run_python_file", file_path="bench_script.py"), _call("get_file_content", file_path="bench_script.py")],
+        [_call("run_python_file", file_path="main.py", args=["2.5"])],
+        "Edited and ran the script.",
+    ]
+
+
+def scenario_output(files: int) -> List[Turn]:
+    """Runs a script that floods stdout."""
+    return [
+        [_call("run_python_file", file_path="emit.py")],
+        [_call("run_python_file", file_path="emit.py")],
+        "Ran the noisy script.",
+    ]
+
+
+SCENARIOS = {
+    "explore": scenario_explore,
+    "edit_run": scenario_edit_run,
+    "output": scenario_output,
+}
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def run_scenario(name: str, workspace: str, files: int, repeat: int, exec_mode: str) -> Dict[str, Any]:
+    """Runs one scenario `repeat` times and aggregates its timings."""
+    iterations = 0
+    elapsed = 0.0
+    rates: List[float] = []
+    tool_latencies: Dict[str, List[float]] = {}
+
+    for _ in range(repeat):
+        session = AgentSession(
+            working_directory=workspace,
+            max_iterations=100,
+            tool_options={"run_python_file": {"exec_mode": exec_mode}},
+        )
+        session.add_user_prompt(f"Benchmark scenario {name}")
+        client = ScriptedClient(SCENARIOS[name](files))
+
+        start = time.perf_counter()
+        # The tools announce every call; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            final_text = session.run(client)
+        seconds = time.perf_counter() - start
+        elapsed += seconds
+        rates.append(session.iteration / seconds)
+        if final_text is None:
+            raise RuntimeError(f"Scenario {name} did not reach its final answer")
+
+        iterations += session.iteration
+        for span in session.tracer.spans:
+            if span["kind"] == "tool":
+                tool_latencies.setdefault(span["name"], []).append(span["duration"])
+
+    return {
+        "iterations": iterations,
+        "seconds": elapsed,
+        # The median run, so a single cold start (e.g. building the search index) does not dominate
+        "iterations_per_sec": _percentile(rates, 0.50),
+        "tools": {
+            tool: {
+                "calls": len(latencies),
+                "p50": _percentile(latencies, 0.50),
+                "p95": _percentile(latencies, 0.95),
+                "max": max(latencies),
+            }
+            for tool, latencies in sorted(tool_latencies.items())
+        },
+    }
+
+
+def _calibrate(repeat: int = 5) -> float:
+    """Seconds for a fixed pure-Python workload (best of `repeat`), as a measure of machine speed."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        words = [f"name_{i % 997}_{i}" for i in range(100_000)]
+        counts: Dict[str, int] = {}
+        for word in words:
+            key = word.split("_")[1]
+            counts[key] = counts.get(key, 0) + 1
+        sorted(words, key=len)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def machine_info() -> Dict[str, Any]:
+    """Describes the machine and interpreter the benchmark runs on."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "calibration_seconds": _calibrate(),
+    }
+
+
+def speed_ratio(machine: Dict[str, Any], baseline_machine: Dict[str, Any]) -> float:
+    """How much slower this machine is than the baseline's (1.0 if either was not calibrated)."""
+    current, before = machine.get("calibration_seconds"), baseline_machine.get("calibration_seconds")
+    return current / before if current and before else 1.0
+
+
+def _peak_rss_kb() -> int:
+    """
+    Peak resident set size of the agent process, in KiB. Scripts are not
+    included: a child's ru_maxrss also counts the parent's pages it shared
+    between fork and exec, so it says little about the script itself.
+    """
+    scale = 1024 if sys.platform == "darwin" else 1  # ru_maxrss is bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Returns one message per metric that regressed beyond `tolerance`.
+    Baseline timings are first scaled by the speed ratio of the two
+    machines; memory is compared as recorded.
+    """
+    if baseline.get("config") != results["config"]:
+        return [f"Baseline was recorded with {baseline.get('config')}, not {results['config']}; not comparable"]
+    machine, baseline_machine = results["machine"], baseline.get("machine", {})
+    # Interpreter releases change costs in ways the calibration does not capture
+    interpreter = (machine["implementation"], machine["python"].rsplit(".", 1)[0])
+    baseline_interpreter = (
+        baseline_machine.get("implementation", "CPython"),
+        baseline_machine.get("python", "").rsplit(".", 1)[0],
+    )
+    if baseline_interpreter != interpreter:
+        recorded, running = " ".join(baseline_interpreter), " ".join(interpreter)
+        return [f"Baseline was recorded with {recorded}, not {running}; not comparable"]
+
+    ratio = speed_ratio(machine, baseline_machine)
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        # Compared as seconds per iteration, with the same noise floor as tool latencies
+        seconds_per_iteration = ratio / before["iterations_per_sec"]
+        limit = max(seconds_per_iteration * (1 + tolerance), seconds_per_iteration + _NOISE_FLOOR_SECONDS)
+        if 1 / current["iterations_per_sec"] > limit:
+            regressions.append(
+                f"{name}: {current['iterations_per_sec']:.1f} iterations/sec "
+                f"(baseline {before['iterations_per_sec'] / ratio:.1f})"
+            )
+        for tool, stats in current["tools"].items():
+            old = before["tools"].get(tool)
+            if old is None:
+                continue
+            # p95 over a handful of calls is mostly noise; it is reported, not gated
+            p50 = old["p50"] * ratio
+            limit = max(p50 * (1 + tolerance), p50 + _NOISE_FLOOR_SECONDS)
+            if stats["p50"] > limit:
+                regressions.append(
+                    f"{name}/{tool}: p50 {stats['p50'] * 1000:.2f} ms (baseline {p50 * 1000:.2f} ms)"
+                )
+    if results["peak_rss_kb"] > baseline["peak_rss_kb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {results['peak_rss_kb']} KiB (baseline {baseline['peak_rss_kb']} KiB)")
+    return regressions
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    """Renders benchmark results as a table."""
+    lines = [f"Workspace: {results['config']}"]
+    for name, scenario in results["scenarios"].items():
+        lines.append(
+            f"\n{name}: {scenario['iterations']} iterations in {scenario['seconds']:.3f}s "
+            f"({scenario['iterations_per_sec']:.1f} iterations/sec)"
+        )
+        for tool, stats in scenario["tools"].items():
+            lines.append(
+                f"  {tool:<20} {stats['calls']:>4} calls  p50 {stats['p50'] * 1000:8.2f} ms  "
+                f"p95 {stats['p95'] * 1000:8.2f} ms  max {stats['max'] * 1000:8.2f} ms"
+            )
+    lines.append(f"\nPeak RSS: {results['peak_rss_kb']} KiB")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agent loop and tools")
+    parser.add_argument("--files", type=int, default=200, help="Number of generated modules")
+    parser.add_argument("--file-size", type=int, default=4000, help="Approximate bytes per module")
+    parser.add_argument("--output-bytes", type=int, default=200_000, help="Bytes written by emit.py")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Scenario(s) to run (default: all)")
+    parser.add_argument(
+        "--exec-mode", choices=["subprocess", "forkserver"], default=PYTHON_EXEC_MODE, help="run_python_file mode"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare against or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix="agent-bench-")
+    try:
+        make_workspace(workspace, args.files, args.file_size, args.output_bytes)
+        results: Dict[str, Any] = {
+            "config": {
+                "files": args.files,
+                "file_size": args.file_size,
+                "output_bytes": args.output_bytes,
+                "repeat": args.repeat,
+                "exec_mode": args.exec_mode,
+            },
+            "machine": machine_info(),
+            "scenarios": {
+                name: run_scenario(name, workspace, args.files, args.repeat, args.exec_mode)
+                for name in (args.scenario or sorted(SCENARIOS))
+            },
+        }
+        results["peak_rss_kb"] = _peak_rss_kb()
+    finally:
+        # The search index is persisted per workspace; do not leave one behind
+        try:
+            os.unlink(search_index(workspace).index_path)
+        except OSError:
+            pass
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    print(format_report(results))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline_machine = baseline.get("machine", {})
+    if baseline_machine.get("platform") != results["machine"]["platform"]:
+        print(f"\nBaseline was recorded on {baseline_machine.get('platform', 'an unknown machine')}.")
+    print(
+        f"\nCalibration: {results['machine']['calibration_seconds'] * 1000:.1f} ms "
+        f"(baseline timings scaled by {speed_ratio(results['machine'], baseline_machine):.2f})"
+    )
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\n✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic workspaces for the benchmarks.
+
+A workspace is a package tree of generated Python modules (`pkg<N>/mod<M>.py`)
+plus two scripts: `main.py`, which imports a few modules and prints a
+result, and `emit.py`, which writes a configurable volume of output.
+"""
+
+import os
+from typing import List
+
+# Modules per generated package directory
+_MODULES_PER_PACKAGE = 50
+
+
+def module_path(index: int) -> str:
+    """Relative path of the index-th generated module."""
+    return f"pkg{index // _MODULES_PER_PACKAGE}/mod{index}.py"
+
+
+def _module_source(index: int, file_size: int) -> str:
+    """Generates a module of roughly `file_size` bytes made of small functions."""
+    chunks: List[str] = [f'"""Generated module {index}."""\n\nimport math\n\n']
+    size = len(chunks[0])
+    function = 0
+    while size < file_size:
+        chunk = (
+            f"\ndef func_{index}_{function}(value):\n"
+            f'    """Returns value scaled by {function}."""\n'
+            f"    return math.floor(value * {function} + {index})\n\n"
+        )
+        if function % 5 == 4:
+            chunk += (
+                f"\nclass Model{index}_{function}:\n"
+                f"    def __init__(self, value):\n"
+                f"        self.value = value\n\n"
+                f"    def scaled(self):\n"
+                f"        return func_{index}_{function}(self.value)\n\n"
+            )
+        chunks.append(chunk)
+        size += len(chunk)
+        function += 1
+    return "".join(chunks)
+
+
+def make_workspace(root: str, files: int, file_size: int, output_bytes: int) -> str:
+    """
+    Creates a synthetic workspace under `root`.
+
+    Args:
+        root (str): Directory to create the workspace in (created if missing).
+        files (int): Number of generated modules.
+        file_size (int): Approximate size of each module in bytes.
+        output_bytes (int): Bytes `emit.py` writes to stdout.
+
+    Returns:
+        str: The workspace directory.
+    """
+    for index in range(files):
+        path = os.path.join(root, module_path(index))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_module_source(index, file_size))
+
+    for package in range((files + _MODULES_PER_PACKAGE - 1) // _MODULES_PER_PACKAGE):
+        open(os.path.join(root, f"pkg{package}", "__init__.py"), "w").close()
+
+    with open(os.path.join(root, "main.py"), "w", encoding="utf-8") as f:
+        f.write(
+            "import sys\n"
+            "from pkg0.mod0 import func_0_1\n\n"
+            "value = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0\n"
+            "print(f'result: {func_0_1(value)}')\n"
+        )
+
+    with open(os.path.join(root, "emit.py"), "w", encoding="utf-8") as f:
+        f.write(
+            "import sys\n\n"
+            f"remaining = {output_bytes}\n"
+            "line = 'x' * 79 + '\\n'\n"
+            "while remaining > 0:\n"
+            "    sys.stdout.write(line[:remaining])\n"
+            "    remaining -= len(line)\n"
+        )
+    return root
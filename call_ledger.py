@@ -0,0 +1,262 @@
+"""
+Duplicate tool-call detection for one session.
+
+Models regularly repeat a call they already made (`get_files_info(".")`
+for the third time, or re-reading a file they just read). `CallLedger`
+fingerprints every call as (tool, arguments, state of what the tool looks
+at) and answers a read-only call whose fingerprint it has seen before with
+a short back-reference to the earlier result instead of running it again:
+
+    - File tools depend on the stat signature of their files.
+    - Directory-wide tools (listing, search, outlines) depend on the
+      session's workspace generation, which every write and every script
+      run advances. Walking the tree on every
+      call would cost as much as the tools themselves, which are served
+      from indexes.
+    - `run_python_file` is never skipped, since it can have side effects,
+      but it is fingerprinted with the count of writes so far, so a run
+      repeating an earlier run with no write in between and with unchanged
+      output is known to have made no progress. A run may have changed
+      the workspace itself, so it always advances the generation.
+    - Writes are never skipped. They are fingerprinted with the stat
+      signature their targets had right after the write, so a write
+      repeating an earlier one over a file nothing touched since is known
+      to have made no progress.
+
+A back-reference is only useful while the earlier result is still in the
+history, so `forget_output` is called for every result the history
+compaction elides.
+
+The ledger also counts rounds (model turns) in which every call only
+repeated an earlier one. After MAX_DUPLICATE_ROUNDS such rounds in a row
+the session stops instead of burning its remaining iterations.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config import MAX_DUPLICATE_ROUNDS
+from executor import MULTI_FILE_TOOLS, READ_ONLY_TOOLS, SESSION_TOOLS, WRITE_TOOLS
+from functions.file_cache import Signature, file_signature
+from functions.run_python_file import strip_run_stats
+
+# Read-only tools whose argument names a list of {"file_path": ...} entries
+MULTI_FILE_READ_TOOLS = {"read_files": "files"}
+
+# Tools that are fingerprinted to detect lack of progress, but always run
+OBSERVED_TOOLS = {"run_python_file"}
+
+# How a back-reference begins, so the history compaction can tell it from
+# the result it refers to.
+REFERENCE_PREFIX = "[Same result as "
+
+
+def _call_id(name: str, args: Dict[str, Any]) -> str:
+    """Returns a canonical text form of a call."""
+    return name + json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _key(call_id: str, state: str) -> str:
+    return hashlib.sha256(f"{call_id}\0{state}".encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    """One fingerprinted call: where it first ran, and the hash of its result."""
+
+    def __init__(self, call_id: str, name: str, iteration: int):
+        self.call_id = call_id
+        self.name = name
+        self.iteration = iteration
+        self.result_hash: Optional[str] = None
+
+
+class CallTicket:
+    """
+    The ledger's answer to one call, passed back to `CallLedger.finish`.
+
+    Attributes:
+        reference (str): A back-reference to return instead of running the
+            tool, or None if the tool must run.
+    """
+
+    def __init__(
+        self,
+        entry: Optional[_Entry] = None,
+        reference: Optional[str] = None,
+        write: Optional[Tuple[str, Dict[str, Any]]] = None,
+    ):
+        self.entry = entry
+        self.reference = reference
+        # The (name, args) of a write, whose result state `finish` records
+        self.write = write
+
+
+class CallLedger:
+    """
+    Per-session memory of tool calls.
+
+    Args:
+        working_directory (str): The sandbox the session's tools work in.
+        max_duplicate_rounds (int): Rounds in a row without progress after
+            which `stalled` becomes True; 0 disables the check.
+
+    Attributes:
+        duplicates (int): Calls answered with a back-reference.
+        stalled_rounds (int): Consecutive rounds without progress so far.
+    """
+
+    def __init__(self, working_directory: str, max_duplicate_rounds: int = MAX_DUPLICATE_ROUNDS):
+        self.abs_root = os.path.abspath(working_directory)
+        self.max_duplicate_rounds = max_duplicate_rounds
+        self.duplicates = 0
+        self.stalled_rounds = 0
+        self._entries: Dict[str, _Entry] = {}
+        # Keys of writes over the state their targets were left in
+        self._writes: Set[str] = set()
+        self._iteration = 0
+        self._progress = False
+        # Advanced by everything that may change the workspace
+        self._generation = 0
+        # Advanced by writes that changed something, and by unknown tools
+        self._edits = 0
+        self._lock = threading.Lock()
+
+    # ---- fingerprints ----
+
+    def _file_state(self, rel_path: Any) -> Optional[Signature]:
+        try:
+            return file_signature(os.stat(os.path.join(self.abs_root, str(rel_path or "."))))
+        except OSError:
+            return None
+
+    def _state(self, name: str, args: Dict[str, Any]) -> Optional[str]:
+        """Describes what a call's result depends on, or None for untracked tools."""
+        if name in SESSION_TOOLS:
+            return ""
+        if name in MULTI_FILE_READ_TOOLS:
+            entries = args.get(MULTI_FILE_READ_TOOLS[name]) or []
+            return repr([self._file_state(entry.get("file_path")) for entry in entries if isinstance(entry, dict)])
+        if name in READ_ONLY_TOOLS:
+            path = args.get(READ_ONLY_TOOLS[name])
+            if READ_ONLY_TOOLS[name] == "file_path":
+                return repr(self._file_state(path))
+            return f"{os.path.normpath(str(path or '.'))}@{self._generation}"
+        if name in OBSERVED_TOOLS:
+            return f"@{self._edits}"
+        return None
+
+    def _write_state(self, name: str, args: Dict[str, Any]) -> Optional[str]:
+        """Describes the files a write tool targets, or None for other tools."""
+        if name in WRITE_TOOLS:
+            return repr(self._file_state(args.get(WRITE_TOOLS[name])))
+        if MULTI_FILE_TOOLS.get(name):
+            entries = args.get("files") or []
+            return repr([self._file_state(entry.get("file_path")) for entry in entries if isinstance(entry, dict)])
+        return None
+
+    # ---- calls ----
+
+    def begin(self, name: str, args: Dict[str, Any]) -> CallTicket:
+        """
+        Looks a call up before it runs.
+
+        Returns:
+            CallTicket: With a `reference` if the call duplicates an earlier
+            read-only call over the same state.
+        """
+        try:
+            state = self._state(name, args)
+        except Exception:
+            state = None
+        if state is None:
+            return self._begin_write(name, args)
+
+        call_id = _call_id(name, args)
+        key = _key(call_id, state)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(call_id, name, self._iteration)
+                return CallTicket(entry)
+
+        if name in OBSERVED_TOOLS:
+            return CallTicket(entry)
+
+        # The executor runs a call identical to one of the same turn after it
+        with self._lock:
+            self.duplicates += 1
+        when = "earlier in this step" if entry.iteration == self._iteration else f"in step {entry.iteration}"
+        return CallTicket(
+            entry,
+            reference=(
+                f"{REFERENCE_PREFIX}your identical {name} call {when}: nothing it depends on has changed "
+                "since. Use that result instead of repeating the call.]"
+            ),
+        )
+
+    def _begin_write(self, name: str, args: Dict[str, Any]) -> CallTicket:
+        """Records a call that may change the workspace."""
+        try:
+            state = self._write_state(name, args)
+        except Exception:
+            state = None
+        with self._lock:
+            # May change anything a directory-wide tool reports
+            self._generation += 1
+            if state is not None and _key(_call_id(name, args), state) in self._writes:
+                # Repeats a write over files left as that write left them
+                return CallTicket(write=(name, args))
+            self._edits += 1
+        self._progress = True
+        return CallTicket(write=(name, args) if state is not None else None)
+
+    def finish(self, ticket: CallTicket, result: Any) -> None:
+        """Records the result of the call `ticket` was issued for."""
+        if ticket.write is not None:
+            name, args = ticket.write
+            try:
+                state = self._write_state(name, args)
+            except Exception:
+                return
+            with self._lock:
+                self._writes.add(_key(_call_id(name, args), state))
+            return
+        entry = ticket.entry
+        if entry is None or ticket.reference is not None:
+            return
+        if entry.name in OBSERVED_TOOLS:
+            # The run may have written files; telling would mean walking the tree
+            with self._lock:
+                self._generation += 1
+        # Timings differ between otherwise identical runs
+        result_hash = hashlib.sha256(strip_run_stats(str(result)).encode("utf-8")).hexdigest()
+        # An observed tool that ran again only made progress if its output changed
+        if result_hash != entry.result_hash:
+            self._progress = True
+        entry.result_hash = result_hash
+
+    def forget_output(self, name: str, args: Dict[str, Any]) -> None:
+        """Drops the entries of a call whose result was elided from the history."""
+        call_id = _call_id(name, args)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.call_id == call_id]:
+                del self._entries[key]
+
+    # ---- rounds ----
+
+    def start_round(self, iteration: int) -> None:
+        """Marks the start of the tool calls of one model turn."""
+        self._iteration = iteration
+        self._progress = False
+
+    def end_round(self) -> None:
+        """Updates the count of consecutive rounds without progress."""
+        self.stalled_rounds = 0 if self._progress else self.stalled_rounds + 1
+
+    @property
+    def stalled(self) -> bool:
+        """True once the model has repeated itself for `max_duplicate_rounds` rounds."""
+        return 0 < self.max_duplicate_rounds <= self.stalled_rounds
@@ -0,0 +1,156 @@
+"""
+Append-only session checkpoints.
+
+A checkpoint file is JSONL. The first line is a header; every later line
+records the messages added to the session since the previous line, plus
+the iteration counter and final answer at that point, and the originals of
+the tool outputs shortened since (see functions/output_store.py), so the
+`out-N` ids in the history still resolve after a resume:
+
+    {"type": "header", "version": 1, "session": "...", "working_directory": "...", "created": 1700000000.0}
+    {"type": "step", "start": 0, "iteration": 1, "final_text": null, "messages": [...],
+     "outputs": {"out-1": "..."}, "next_output_id": 2}
+
+Only new messages are written, so saving costs O(new messages) however
+long the session gets, and loading is a single sequential parse. Each line
+is written with one `write` and fsynced; a line cut short by a crash is
+dropped on load, which resumes from the last complete step.
+
+History compaction rewrites old messages in memory only. The checkpoint
+keeps them as they were sent; a resumed session compacts them again on its
+first request.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from config import CHECKPOINT_DIR
+from functions.output_store import OutputStore
+
+_VERSION = 1
+
+
+def checkpoint_path(session_id: str, directory: str = CHECKPOINT_DIR) -> str:
+    """Returns the checkpoint file of a named session."""
+    return os.path.join(directory, f"{session_id}.jsonl")
+
+
+class SessionCheckpoint:
+    """
+    Writer (and loader) of one session's checkpoint file.
+
+    Attributes:
+        session_id (str): Name of the session; also the file name.
+        path (str): The checkpoint file.
+        saved_messages (int): How many of the session's messages are on disk.
+        next_output_id (int): The output store's next id at the last save;
+            outputs from that id on are not on disk yet.
+    """
+
+    def __init__(self, session_id: str, directory: str = CHECKPOINT_DIR):
+        self.session_id = session_id
+        self.path = checkpoint_path(session_id, directory)
+        self.saved_messages = 0
+        self.next_output_id = 1
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def create(self, working_directory: str) -> None:
+        """Starts a new checkpoint file (replacing any old one of the same name)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+        self._append(
+            {
+                "type": "header",
+                "version": _VERSION,
+                "session": self.session_id,
+                "working_directory": os.path.abspath(working_directory),
+                "created": time.time(),
+            }
+        )
+        self.saved_messages = 0
+        self.next_output_id = 1
+
+    def save(
+        self,
+        messages: List[types.Content],
+        iteration: int,
+        final_text: Optional[str],
+        output_store: Optional[OutputStore] = None,
+    ) -> None:
+        """Appends the messages, and the stored outputs, added since the last save."""
+        new_messages = messages[self.saved_messages:]
+        record = {
+            "type": "step",
+            "start": self.saved_messages,
+            "iteration": iteration,
+            "final_text": final_text,
+            "messages": [message.model_dump(mode="json", exclude_none=True) for message in new_messages],
+        }
+        if output_store is not None:
+            record["outputs"], record["next_output_id"] = output_store.since(self.next_output_id)
+        self._append(record)
+        self.saved_messages = len(messages)
+        self.next_output_id = record.get("next_output_id", self.next_output_id)
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Reads the checkpoint back.
+
+        Returns:
+            dict: {"working_directory", "messages", "iteration", "final_text",
+            "outputs", "next_output_id"}.
+
+        Raises:
+            FileNotFoundError: If the session has no checkpoint.
+            ValueError: If the file is not a checkpoint of a supported version.
+        """
+        with open(self.path, "rb") as f:
+            lines = f.readlines()
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get("type") != "header" or header.get("version") != _VERSION:
+            raise ValueError(f"{self.path} is not a version {_VERSION} session checkpoint")
+
+        state: Dict[str, Any] = {
+            "working_directory": header["working_directory"],
+            "messages": [],
+            "iteration": 0,
+            "final_text": None,
+            "outputs": {},
+            "next_output_id": 1,
+        }
+        valid_bytes = len(lines[0])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line) if line.endswith(b"\n") else None
+            except ValueError:
+                record = None
+            if record is None or record.get("start") != len(state["messages"]):
+                # A step cut short by a crash. Drop it, so later steps are
+                # appended right after the last intact one.
+                os.truncate(self.path, valid_bytes)
+                break
+            state["messages"].extend(types.Content.model_validate(message) for message in record["messages"])
+            state["iteration"] = record["iteration"]
+            state["final_text"] = record["final_text"]
+            state["outputs"].update(record.get("outputs") or {})
+            state["next_output_id"] = record.get("next_output_id", state["next_output_id"])
+            valid_bytes += len(line)
+
+        self.saved_messages = len(state["messages"])
+        self.next_output_id = state["next_output_id"]
+        return state
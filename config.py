@@ -1,2 +1,252 @@
+import os
+import tempfile
+
 MAX_CHARS = 10000
+# The directory where the agent is allowed to work (sandbox)
 WORKING_DIR = "./calculator"
+MODEL_NAME = "gemini-2.0-flash-exp" # or "gemini-2.0-flash" depending on availability
+
+# Root directory for the agent's on-disk caches (kept next to this file).
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".agent_cache")
+
+# Maximum number of model calls per task before the agent gives up.
+MAX_ITERATIONS = 20
+
+# Maximum number of tool calls from a single model turn that may run at once.
+# Set to 1 to execute tool calls strictly one after another.
+MAX_TOOL_WORKERS = 4
+
+# ==========================================
+# Server mode (server.py)
+# ==========================================
+
+# Default listening address. A path-like value binds a Unix domain socket,
+# "host:port" binds TCP on that address. The socket's directory must be
+# private to the user running the server (the server creates it with mode
+# 0700), so other local users can neither connect nor plant a socket there.
+SERVER_ADDRESS = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or os.path.join(tempfile.gettempdir(), f"ai-agent-{os.getuid()}"),
+    "ai-agent.sock",
+)
+
+# Clients may only run sessions in this directory or below it.
+SERVER_ALLOWED_ROOT = WORKING_DIR
+
+# Maximum number of agent loops running at the same time across all sessions.
+SERVER_MAX_CONCURRENT_RUNS = 16
+
+# Maximum number of prompts a single session may process at the same time.
+# Keeping this at 1 means follow-up prompts queue behind the running one
+# instead of interleaving with its history.
+SESSION_MAX_CONCURRENT_RUNS = 1
+
+# Default number of tasks batch.py runs at once.
+BATCH_MAX_CONCURRENT_TASKS = 8
+
+# ==========================================
+# Conversation history (history.py)
+# ==========================================
+
+# Estimated prompt-token budget for the history sent on each model call.
+# Older turns are compacted once the history grows beyond it.
+HISTORY_TOKEN_BUDGET = 32000
+
+# Number of most recent messages that are always sent verbatim.
+HISTORY_KEEP_RECENT_MESSAGES = 6
+
+# Append-only session checkpoints (checkpoint.py), one file per session.
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "sessions")
+
+# ==========================================
+# File tools
+# ==========================================
+
+# Upper bound on the total size of file contents kept in the in-process
+# read cache (functions/file_cache.py). Least recently used files are evicted.
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Files larger than this are read through a memory map with a cached
+# line-offset index instead of being decoded and cached whole.
+# Must stay well above 4 * MAX_CHARS.
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+# Number of large-file line indexes kept between reads.
+LINE_INDEX_CACHE_ENTRIES = 32
+
+# Number of parsed Python outlines (get_symbols) kept between calls.
+SYMBOL_CACHE_ENTRIES = 1024
+
+# A re-read of a file the model already has is answered with a unified diff
+# against that version, unless the diff is larger than this fraction of the
+# file (then the file is sent in full).
+DELTA_READ_MAX_DIFF_RATIO = 0.5
+
+# Upper bound on the file versions one session remembers for delta reads.
+READ_LEDGER_MAX_BYTES = 8 * 1024 * 1024
+
+# Shared size budget of one read_files call (characters over all files),
+# and the most files it may read at once.
+READ_FILES_MAX_CHARS = 4 * MAX_CHARS
+READ_FILES_MAX_FILES = 20
+
+# Journals of write_files transactions, kept until all of their renames are
+# done so a crash midway can be rolled back.
+WRITE_JOURNAL_DIR = os.path.join(CACHE_DIR, "journals")
+
+# Number of leading bytes inspected to decide whether a file is binary.
+BINARY_SNIFF_BYTES = 8192
+
+# Entries skipped when listing or indexing the workspace, in .gitignore
+# syntax. The workspace's own .gitignore files are applied on top.
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/",
+    ".venv/",
+    "venv/",
+    "__pycache__/",
+    "node_modules/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".tox/",
+    ".agent_cache/",
+    "*.pyc",
+]
+
+# Default and maximum number of entries returned by one get_files_info call.
+LIST_DEFAULT_LIMIT = 200
+LIST_MAX_LIMIT = 2000
+
+# ==========================================
+# Tool output shaping (output_shaping.py)
+# ==========================================
+
+# Estimated token budget of one tool result entering the history. Longer
+# results keep their head and tail; the original stays readable through
+# read_tool_output.
+TOOL_OUTPUT_TOKEN_BUDGET = 2500
+
+# Per-tool overrides of the budget.
+TOOL_OUTPUT_TOKEN_BUDGETS = {
+    "run_python_file": 2000,
+    "profile_python_file": 2000,
+    "get_files_info": 2000,
+}
+
+# Tools whose results are never shaped: file contents must stay exact for
+# edits (and are paged by line range, at most MAX_CHARS per call), and
+# read_tool_output is itself the pager.
+UNSHAPED_TOOLS = {"get_file_content", "get_symbol_source", "read_files", "read_tool_output"}
+
+# Share of the budget given to the head of a long result. The tail, where
+# errors and summaries usually are, gets the rest.
+TOOL_OUTPUT_HEAD_FRACTION = 0.4
+
+# Runs of at least this many identical (or, over budget, near-identical)
+# lines are collapsed.
+REPEATED_LINES_MIN_RUN = 3
+
+# Upper bound on the original outputs one session keeps for read_tool_output.
+# The oldest are dropped first.
+TOOL_OUTPUT_STORE_MAX_BYTES = 16 * 1024 * 1024
+
+# ==========================================
+# Duplicate tool calls (call_ledger.py)
+# ==========================================
+
+# Answer a read-only call that repeats an earlier one over unchanged files
+# with a back-reference to the earlier result instead of running it again.
+CALL_LEDGER_ENABLED = True
+
+# Stop the session after this many model turns in a row whose tool calls
+# only repeated earlier ones (0 disables the check).
+MAX_DUPLICATE_ROUNDS = 3
+
+# ==========================================
+# Script execution (run_python_file, profile_python_file)
+# ==========================================
+
+# Wall-clock limit for a single script run.
+RUN_TIMEOUT_SECONDS = 30
+
+# Resource limits applied to every script run (and the processes it starts)
+# with setrlimit; None leaves a limit as inherited from the agent.
+#   - CPU seconds count all threads, so they can exceed the wall-clock time.
+#   - Memory is the address space, which is larger than the resident size.
+#   - Processes are counted per user (not per run) and do not apply to root.
+RUN_MAX_CPU_SECONDS = 60
+RUN_MAX_MEMORY_BYTES = 4 * 1024 * 1024 * 1024
+RUN_MAX_OPEN_FILES = 256
+RUN_MAX_PROCESSES = 4096
+
+# "subprocess" starts a new interpreter per run; "forkserver" forks each run
+# from a warm interpreter (POSIX only) and is much faster to start.
+PYTHON_EXEC_MODE = "subprocess"
+
+# Modules the fork server imports once, so forked scripts start with them loaded.
+FORKSERVER_PRELOAD_MODULES = [
+    "argparse", "collections", "dataclasses", "datetime", "decimal",
+    "functools", "itertools", "json", "math", "pathlib", "random", "re",
+    "statistics", "string", "typing", "unittest",
+]
+
+# Rows per table in a profile_python_file report, by default and at most.
+PROFILE_DEFAULT_ROWS = 15
+PROFILE_MAX_ROWS = 50
+
+# A profiled run is stopped this long before RUN_TIMEOUT_SECONDS, so a slow
+# script still returns the profile of what it did so far.
+PROFILE_STOP_MARGIN_SECONDS = 2
+
+# Each output stream of a script keeps at most its first OUTPUT_HEAD_BYTES and
+# last OUTPUT_TAIL_BYTES; the middle is dropped as it streams in.
+OUTPUT_HEAD_BYTES = 16 * 1024
+OUTPUT_TAIL_BYTES = 16 * 1024
+
+# A script that writes more than this to stdout or stderr is killed early.
+# Set to 0 to let it run (output beyond the head/tail is still discarded).
+OUTPUT_MAX_BYTES_PER_STREAM = 16 * 1024 * 1024
+
+# Opt-in memoization of script runs: an identical run (same script, args and
+# workspace content) returns the stored output instead of executing again.
+RUN_CACHE_ENABLED = False
+RUN_CACHE_DIR = os.path.join(CACHE_DIR, "runs")
+
+# ==========================================
+# Model Call Scheduling
+# ==========================================
+
+# Process-wide limits shared by all sessions (0 disables a limit).
+MODEL_REQUESTS_PER_MINUTE = 60
+MODEL_TOKENS_PER_MINUTE = 1_000_000
+
+# Retries of a model call after rate-limit (429), server (5xx) or network errors.
+MODEL_MAX_RETRIES = 5
+MODEL_RETRY_BASE_DELAY_SECONDS = 1.0
+MODEL_RETRY_MAX_DELAY_SECONDS = 30.0
+
+# Default wall-clock budget for one task of a batch or server session (their
+# --deadline flag; 0 for none). CLI sessions have none unless --deadline is given.
+SESSION_DEADLINE_SECONDS = 600
+
+# ==========================================
+# Model Response Cache
+# ==========================================
+
+# "passthrough" (always call the model), "record" (serve recorded responses,
+# record new ones) or "replay" (recorded responses only; see response_cache.py).
+RESPONSE_CACHE_MODE = "passthrough"
+RESPONSE_CACHE_DIR = os.path.join(CACHE_DIR, "responses")
+
+# ==========================================
+# Code Search
+# ==========================================
+
+# Persisted trigram indexes used by search_code, one file per working directory.
+SEARCH_INDEX_DIR = os.path.join(CACHE_DIR, "search_index")
+
+# Files larger than this are not indexed; every search scans them directly.
+SEARCH_MAX_FILE_BYTES = 1024 * 1024
+
+# Minimum time between stat-only rescans of the tree; files written by the
+# agent itself are re-indexed immediately regardless.
+SEARCH_RESCAN_INTERVAL_SECONDS = 2.0
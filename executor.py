@@ -0,0 +1,150 @@
+"""
+Concurrent execution of the tool calls returned in a single model turn.
+
+The model frequently asks for several independent reads at once (e.g. four
+`get_file_content` calls). Running them one after another wastes wall-clock
+time, so this module schedules them on a worker pool while keeping the
+semantics of sequential execution:
+
+    - Read-only tools (listing, reading) run in parallel.
+    - Writes are serialized against every earlier call touching the same path.
+    - Script execution can touch anything, so it waits for all earlier calls
+      and every later call waits for it.
+    - A call identical to an earlier one waits for it, so the session's
+      call ledger (see call_ledger.py) answers the repeat, never the first.
+    - Results are always returned in the original call order.
+"""
+
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import MAX_TOOL_WORKERS
+
+# Tools that never modify the working directory.
+READ_ONLY_TOOLS = {
+    "get_files_info": "directory",
+    "get_file_content": "file_path",
+    "search_code": "directory",
+    "get_symbols": "path",
+    "get_symbol_source": "file_path",
+}
+
+# Tools that only read the session's own state, never the working directory.
+SESSION_TOOLS = {"read_tool_output"}
+
+# Tools that modify exactly the path given in the named argument.
+WRITE_TOOLS = {
+    "write_file": "file_path",
+    "edit_file": "file_path",
+}
+
+# Tools that read (False) or write (True) the "file_path" of every entry in
+# their "files" argument.
+MULTI_FILE_TOOLS = {
+    "read_files": False,
+    "write_files": True,
+}
+
+
+def _normalize(path: Optional[str]) -> str:
+    """Normalizes a model-supplied relative path for overlap comparisons."""
+    return os.path.normpath(path or ".")
+
+
+def _paths_overlap(a: str, b: str) -> bool:
+    """Returns True if one path is equal to, or contained in, the other."""
+    if not a or not b:
+        # The empty path of a session tool overlaps nothing
+        return False
+    if a == "." or b == ".":
+        return True
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def call_footprint(name: str, args: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """
+    Describes which part of the workspace a tool call touches.
+
+    Args:
+        name (str): The tool name.
+        args (dict): The arguments supplied by the model.
+
+    Returns:
+        tuple: (path, writes). A path of None means the call may touch the
+        whole working directory (e.g. running a script or an unknown tool);
+        an empty path means it touches none of it.
+    """
+    if name in SESSION_TOOLS:
+        return "", False
+    if name in READ_ONLY_TOOLS:
+        return _normalize(args.get(READ_ONLY_TOOLS[name])), False
+    if name in WRITE_TOOLS:
+        return _normalize(args.get(WRITE_TOOLS[name])), True
+    if name in MULTI_FILE_TOOLS:
+        # The deepest directory containing all of the files stands for them
+        paths = [_normalize(entry.get("file_path")) for entry in args.get("files") or [] if isinstance(entry, dict)]
+        try:
+            return os.path.commonpath(paths) or ".", MULTI_FILE_TOOLS[name]
+        except ValueError:
+            # No paths, or relative mixed with absolute ones
+            return None, MULTI_FILE_TOOLS[name]
+    return None, True
+
+
+def _conflicts(first: Tuple[Optional[str], bool], second: Tuple[Optional[str], bool]) -> bool:
+    """Returns True if two footprints must not run concurrently."""
+    path_a, writes_a = first
+    path_b, writes_b = second
+    if not (writes_a or writes_b):
+        return False
+    if path_a is None or path_b is None:
+        return True
+    return _paths_overlap(path_a, path_b)
+
+
+def execute_function_calls(
+    function_calls: Sequence[Any],
+    call_fn: Callable[[Any], Any],
+    max_workers: int = MAX_TOOL_WORKERS,
+) -> List[Any]:
+    """
+    Executes the tool calls of one model turn, in parallel where it is safe.
+
+    Each call waits only for earlier calls it conflicts with, so a read that
+    follows a write to the same file still observes the write.
+
+    Args:
+        function_calls: The `function_calls` of a model response, in order.
+        call_fn: Executes a single call and returns its result.
+        max_workers (int): Upper bound on concurrently running tools.
+            A value of 1 (or fewer) disables parallelism entirely.
+
+    Returns:
+        list: The results of `call_fn`, in the original call order.
+    """
+    if max_workers <= 1 or len(function_calls) <= 1:
+        return [call_fn(call) for call in function_calls]
+
+    footprints = [call_footprint(call.name, dict(call.args or {})) for call in function_calls]
+    identities = [call.name + json.dumps(dict(call.args or {}), sort_keys=True, default=str) for call in function_calls]
+
+    def run_after(call: Any, dependencies: List[Future]) -> Any:
+        # Dependencies are always earlier calls, which the pool dequeues
+        # first, so waiting here can never deadlock the pool.
+        for dependency in dependencies:
+            dependency.result()
+        return call_fn(call)
+
+    futures: List[Future] = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(function_calls))) as pool:
+        for index, call in enumerate(function_calls):
+            dependencies = [
+                futures[earlier]
+                for earlier in range(index)
+                if identities[earlier] == identities[index] or _conflicts(footprints[earlier], footprints[index])
+            ]
+            futures.append(pool.submit(run_after, call, dependencies))
+
+        return [future.result() for future in futures]
@@ -0,0 +1,367 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+from config import MAX_CHARS, READ_FILES_MAX_CHARS, READ_FILES_MAX_FILES, WRITE_JOURNAL_DIR
+from functions.get_file_content import get_file_content
+from functions.read_ledger import ReadLedger
+from functions.write_file import record_write, stage_text
+
+
+class _FileRangePath(TypedDict):
+    file_path: str
+
+
+class FileRange(_FileRangePath, total=False):
+    """
+    One file of a read_files call.
+
+    Attributes:
+        file_path (str): The relative path of the file to read.
+        start_line (int): First line to read (1-based, inclusive).
+        end_line (int): Last line to read (1-based, inclusive).
+    """
+
+    start_line: int
+    end_line: int
+
+
+class FileWrite(TypedDict):
+    """
+    One file of a write_files call.
+
+    Attributes:
+        file_path (str): The relative path where the file should be written.
+        content (str): The complete new text of the file.
+    """
+
+    file_path: str
+    content: str
+
+
+def share_budget(sizes: List[int], budget: int) -> List[int]:
+    """
+    Splits `budget` over items of the given sizes: items smaller than an
+    even share get all they need, and what they leave over is split evenly
+    among the larger ones.
+    """
+    allotments = [0] * len(sizes)
+    remaining = budget
+    left = len(sizes)
+    for index in sorted(range(len(sizes)), key=lambda i: sizes[i]):
+        allotments[index] = min(sizes[index], remaining // left)
+        remaining -= allotments[index]
+        left -= 1
+    return allotments
+
+
+def read_files(working_directory: str, files: List[FileRange], *, ledger: Optional[ReadLedger] = None) -> str:
+    """
+    Reads several files, or line ranges of them, in one call. Prefer it over
+    several get_file_content calls when you need a group of related files.
+    All files share one size budget; a file that does not fit is cut short
+    with a note, and the rest can be read with get_file_content.
+
+    Security:
+        - Same sandboxing as get_file_content, which reads every file.
+
+    Performance:
+        - One call and one history entry instead of one per file.
+        - All files are stat()ed up front and the budget is shared out
+          before anything is read, so no file is read further than what
+          fits in the result.
+
+    Args:
+        working_directory (str): The base directory where file access is allowed.
+        files (List[FileRange]): The files to read, in the order they are
+            returned.
+        ledger (ReadLedger, optional): The session's record of delivered
+            file versions (host-supplied).
+
+    Returns:
+        str: Each file's content under a "=== path ===" header (per-file
+        errors inline), or an error message starting with 'Error:'.
+    """
+    if not files:
+        return "Error: No files given."
+    if len(files) > READ_FILES_MAX_FILES:
+        return f"Error: At most {READ_FILES_MAX_FILES} files can be read per call."
+
+    abs_working_dir = os.path.abspath(working_directory)
+    sizes = []
+    for entry in files:
+        abs_file_path = os.path.abspath(os.path.join(working_directory, entry.get("file_path") or ""))
+        try:
+            # Paths outside the sandbox get no share; get_file_content rejects them
+            sizes.append(os.stat(abs_file_path).st_size if abs_file_path.startswith(abs_working_dir) else 0)
+        except OSError:
+            sizes.append(0)
+
+    sections = []
+    for entry, size, allotment in zip(files, sizes, share_budget(sizes, READ_FILES_MAX_CHARS)):
+        file_path = entry.get("file_path") or ""
+        start_line = entry.get("start_line")
+        end_line = entry.get("end_line")
+        if size and not allotment:
+            sections.append(f"=== {file_path} ===\n[Not read: the budget of this call is used up; read it with get_file_content]")
+            continue
+
+        # Only a file delivered whole may be recorded as the version the model has
+        whole = start_line is None and end_line is None and size <= min(allotment, MAX_CHARS)
+        text = get_file_content(
+            working_directory,
+            file_path,
+            start_line=start_line,
+            end_line=end_line,
+            ledger=ledger if whole else None,
+        )
+        # A file that fits is never cut; its header or delta notice may overshoot a little
+        if size > allotment and len(text) > allotment and not text.startswith("Error"):
+            text = text[:allotment] + (
+                f"\n[...Cut at {allotment} characters to share the budget of this call; "
+                "read the rest with get_file_content...]"
+            )
+        sections.append(f"=== {file_path} ===\n{text}")
+    return "\n\n".join(sections)
+
+
+def _journal_dir(working_directory: str) -> str:
+    """Returns the directory holding the write journals of a working directory."""
+    digest = hashlib.sha256(os.path.abspath(working_directory).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(WRITE_JOURNAL_DIR, digest)
+
+
+def _unlink(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _roll_back(plan: Dict[str, Any]) -> None:
+    """
+    Undoes a transaction that did not commit. A staged file that is still
+    there was not renamed yet; one that is gone replaced its target, which
+    is restored from its backup (or removed, if it was new).
+    """
+    for entry in plan["files"]:
+        if os.path.exists(entry["temp"]):
+            _unlink(entry["temp"])
+            _unlink(entry["backup"])
+        elif entry["backup"]:
+            if os.path.exists(entry["backup"]):
+                os.replace(entry["backup"], entry["target"])
+        else:
+            _unlink(entry["target"])
+    for directory in reversed(plan["created_dirs"]):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def _clean_up(plan: Dict[str, Any]) -> None:
+    """Removes what a committed transaction left behind."""
+    for entry in plan["files"]:
+        _unlink(entry["temp"])
+        _unlink(entry["backup"])
+
+
+def recover_interrupted_writes(working_directory: str) -> int:
+    """
+    Finishes write_files transactions that were cut short by a crash: an
+    uncommitted one is rolled back, a committed one is cleaned up, and one
+    that died before writing its plan (so before staging anything) only
+    leaves its journal to remove. Journals still locked by a running
+    transaction are left alone.
+
+    Returns:
+        int: The number of transactions recovered.
+    """
+    directory = _journal_dir(working_directory)
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".journal")]
+    except FileNotFoundError:
+        return 0
+
+    recovered = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            journal = open(path, "r+", encoding="utf-8")
+        except FileNotFoundError:
+            continue
+        with journal:
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            lines = journal.read().splitlines()
+            try:
+                plan = json.loads(lines[0])
+            except (IndexError, ValueError):
+                # Empty, or torn before the plan was complete: nothing was staged yet
+                plan = None
+            if plan is not None:
+                if "committed" in lines[1:]:
+                    _clean_up(plan)
+                else:
+                    _roll_back(plan)
+            _unlink(path)
+            recovered += 1
+    return recovered
+
+
+class WriteTransaction:
+    """
+    Applies several file writes all-or-nothing.
+
+        1. Journal: the plan (every target, and the temporary file, backup
+           and new directories it will take) is written and fsynced to a
+           journal, which stays locked until the transaction is over.
+        2. Stage: each new content goes to its temporary file next to its
+           target, and each existing target is hard-linked (or copied) to
+           its backup.
+        3. Commit: the temporary files are renamed over their targets, then
+           "committed" is appended to the journal.
+        4. Clean up: the backups and the journal are removed.
+
+    If a step fails, whatever the plan names that already exists is undone
+    before the error is raised. If the process dies, the next
+    `recover_interrupted_writes` for the working directory does the same.
+    """
+
+    def __init__(self, working_directory: str):
+        self.working_directory = working_directory
+        self.transaction_id = uuid.uuid4().hex[:12]
+        self.plan: Dict[str, Any] = {"transaction": self.transaction_id, "files": [], "created_dirs": []}
+
+    def _make_plan(self, writes: List[Tuple[str, str]]) -> None:
+        for index, (abs_file_path, _) in enumerate(writes):
+            parent = os.path.dirname(abs_file_path)
+            missing = []
+            while parent and not os.path.exists(parent) and parent not in self.plan["created_dirs"]:
+                missing.append(parent)
+                parent = os.path.dirname(parent)
+            self.plan["created_dirs"].extend(reversed(missing))
+
+            # Named after the transaction, so the plan can list them up front
+            target = os.path.realpath(abs_file_path)
+            prefix = os.path.join(os.path.dirname(target), f".tmp-{self.transaction_id}-{index}")
+            backup = f"{prefix}.bak" if os.path.exists(target) else None
+            self.plan["files"].append({"target": target, "temp": f"{prefix}.part", "backup": backup})
+
+    def _stage(self, writes: List[Tuple[str, str]]) -> None:
+        for directory in self.plan["created_dirs"]:
+            os.mkdir(directory)
+        for (abs_file_path, content), entry in zip(writes, self.plan["files"]):
+            stage_text(abs_file_path, content, os.path.basename(entry["temp"]))
+            if entry["backup"]:
+                try:
+                    os.link(entry["target"], entry["backup"])
+                except OSError:
+                    shutil.copy2(entry["target"], entry["backup"])
+
+    def commit(self, writes: List[Tuple[str, str]]) -> None:
+        """
+        Writes every (absolute path, content) pair, or none of them.
+
+        Raises:
+            OSError: If the writes could not be applied; the workspace is
+                then as it was before.
+        """
+        directory = _journal_dir(self.working_directory)
+        os.makedirs(directory, exist_ok=True)
+        journal_path = os.path.join(directory, f"{self.transaction_id}.journal")
+        # Only given its recoverable name once locked, so recovery never
+        # mistakes the journal of a starting transaction for a dead one
+        with open(f"{journal_path}.new", "w", encoding="utf-8") as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            os.rename(f"{journal_path}.new", journal_path)
+            try:
+                self._make_plan(writes)
+                journal.write(json.dumps(self.plan) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+                self._stage(writes)
+
+                for entry in self.plan["files"]:
+                    os.replace(entry["temp"], entry["target"])
+                journal.write("committed\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            except BaseException:
+                _roll_back(self.plan)
+                _unlink(journal_path)
+                raise
+            _clean_up(self.plan)
+            _unlink(journal_path)
+
+
+def write_files(working_directory: str, files: List[FileWrite], *, ledger: Optional[ReadLedger] = None) -> str:
+    """
+    Writes several files in one call, all or nothing: if any file cannot be
+    written, none of them is changed. Use it for changes that span files,
+    e.g. a module and its test.
+
+    Security:
+        - Prevents Path Traversal attacks by validating that every target
+          remains within the 'working_directory' before anything is written.
+        - Existing files are backed up and a journal is kept until all
+          renames are done, so a failure (or crash) midway is rolled back
+          instead of leaving the workspace half-written.
+
+    Args:
+        working_directory (str): The root permitted directory.
+        files (List[FileWrite]): The files to write. Each path may appear
+            only once.
+        ledger (ReadLedger, optional): The session's record of delivered
+            file versions (host-supplied).
+
+    Returns:
+        str: A success message listing the files, or an error message starting with 'Error'.
+    """
+    if not files:
+        return "Error: No files given."
+
+    abs_working_dir = os.path.abspath(working_directory)
+    writes = []
+    seen = set()
+    for entry in files:
+        file_path = entry.get("file_path")
+        content = entry.get("content")
+        if not file_path or not isinstance(content, str):
+            return 'Error: Every file needs a "file_path" and a "content". No files were changed.'
+        abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+        # Security Check: Ensure we are not writing outside the sandbox
+        if not abs_file_path.startswith(abs_working_dir):
+            return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory. No files were changed.'
+        if os.path.isdir(abs_file_path):
+            return f'Error: "{file_path}" is a directory. No files were changed.'
+        real_path = os.path.realpath(abs_file_path)
+        if real_path in seen:
+            return f'Error: "{file_path}" appears more than once. No files were changed.'
+        seen.add(real_path)
+        writes.append((file_path, abs_file_path, content))
+
+    try:
+        recover_interrupted_writes(working_directory)
+        WriteTransaction(working_directory).commit([(abs_file_path, content) for _, abs_file_path, content in writes])
+    except Exception as e:
+        return f"Error writing files: {e}. No files were changed."
+
+    for file_path, abs_file_path, content in writes:
+        record_write(working_directory, abs_file_path, content)
+        if ledger is not None:
+            if len(content) <= MAX_CHARS:
+                ledger.record(file_path, content)
+            else:
+                ledger.forget(file_path)
+
+    summary = ", ".join(f'"{file_path}" ({len(content)} characters)' for file_path, _, content in writes)
+    return f"Successfully wrote {len(writes)} files: {summary}"
@@ -0,0 +1,255 @@
+import os
+import re
+from typing import List, Optional, Tuple, TypedDict
+
+from functions.write_file import atomic_write_text, record_write
+
+# "@@ -12,5 +12,6 @@" (counts are optional and default to 1)
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    """Raised when an edit or a hunk cannot be applied; the message says why."""
+
+
+class EditBlock(TypedDict):
+    """
+    One search/replace block of an edit_file call.
+
+    Attributes:
+        search (str): Exact text to find.
+        replace (str): Text to put in its place.
+    """
+
+    search: str
+    replace: str
+
+
+def edit_file(
+    working_directory: str,
+    file_path: str,
+    edits: Optional[List[EditBlock]] = None,
+    patch: Optional[str] = None,
+) -> str:
+    """
+    Applies targeted changes to an existing file instead of rewriting it,
+    with search/replace blocks or a unified diff. Prefer this over write_file
+    for changes to existing files. If any block or hunk fails to apply, the
+    file is left unchanged.
+
+    Security:
+        - Prevents Path Traversal attacks by validating that the target file
+          remains within the 'working_directory'.
+        - All changes are applied in memory first and written atomically, so
+          a failing edit leaves the file untouched.
+
+    Args:
+        working_directory (str): The root permitted directory.
+        file_path (str): The relative path of the file to edit.
+        edits (List[EditBlock], optional): Search/replace blocks, applied
+            in order. Each search text must match the file exactly (including
+            indentation) and occur exactly once.
+        patch (str, optional): A unified diff (with @@ hunk headers) for this
+            file. Use either edits or patch.
+
+    Returns:
+        str: A summary of the applied change, or an error message starting with 'Error:'.
+    """
+    # Resolve absolute paths to ensure accurate security checks
+    abs_working_dir = os.path.abspath(working_directory)
+    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+
+    # Security Check: Ensure we are not editing outside the sandbox
+    if not abs_file_path.startswith(abs_working_dir):
+        return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory.'
+
+    if not os.path.isfile(abs_file_path):
+        return f'Error: File not found or is not a regular file: "{file_path}". Use write_file to create new files.'
+
+    if bool(edits) == bool(patch):
+        return "Error: Provide either 'edits' or 'patch' (exactly one of them)."
+
+    try:
+        with open(abs_file_path, "r", encoding="utf-8", newline="") as f:
+            original = f.read()
+    except UnicodeDecodeError:
+        return f'Error: "{file_path}" is not a UTF-8 text file.'
+    except Exception as e:
+        return f'Error reading file "{file_path}": {e}'
+
+    try:
+        if edits:
+            content = apply_edits(original, edits)
+            summary = f"{len(edits)} edit(s)"
+        else:
+            content, hunks = apply_unified_diff(original, patch)
+            summary = f"{hunks} hunk(s)"
+    except PatchError as e:
+        return f'Error: Could not edit "{file_path}": {e}. The file was not modified.'
+
+    if content == original:
+        return f'No changes: the edits leave "{file_path}" unchanged.'
+
+    try:
+        atomic_write_text(abs_file_path, content)
+        record_write(working_directory, abs_file_path, content)
+    except Exception as e:
+        return f'Error writing file "{file_path}": {e}'
+
+    return (
+        f'Successfully edited "{file_path}" ({summary} applied; '
+        f"{len(original.splitlines())} -> {len(content.splitlines())} lines)"
+    )
+
+
+def apply_edits(content: str, edits: List[EditBlock]) -> str:
+    """
+    Applies search/replace blocks in order.
+
+    Raises:
+        PatchError: If a block is malformed, or its search text is missing or
+            ambiguous in the content as modified by the previous blocks.
+    """
+    for number, edit in enumerate(edits, start=1):
+        search = edit.get("search")
+        replace = edit.get("replace")
+        if not isinstance(search, str) or not isinstance(replace, str):
+            raise PatchError(f"edit {number} needs both 'search' and 'replace' strings")
+        if not search:
+            raise PatchError(f"edit {number} has an empty 'search' text")
+
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f"edit {number}: search text not found{_near_miss(content, search)}")
+        if count > 1:
+            lines = _match_lines(content, search)
+            raise PatchError(
+                f"edit {number}: search text occurs {count} times (at lines "
+                f"{', '.join(map(str, lines))}); include more surrounding lines to make it unique"
+            )
+        content = content.replace(search, replace, 1)
+    return content
+
+
+def _match_lines(content: str, search: str) -> List[int]:
+    """Returns the 1-based line numbers where `search` starts."""
+    lines = []
+    start = content.find(search)
+    while start != -1:
+        lines.append(content.count("\n", 0, start) + 1)
+        start = content.find(search, start + 1)
+    return lines
+
+
+def _near_miss(content: str, search: str) -> str:
+    """Explains a failed search when it only differs in whitespace."""
+    first_line = next((line.strip() for line in search.splitlines() if line.strip()), "")
+    if not first_line:
+        return ""
+    for number, line in enumerate(content.splitlines(), start=1):
+        if line.strip() == first_line:
+            return (
+                f" (its first line matches line {number} when ignoring whitespace; "
+                "check indentation and line endings)"
+            )
+    return f" (no line matches {first_line[:80]!r})"
+
+
+def apply_unified_diff(content: str, patch: str) -> Tuple[str, int]:
+    """
+    Applies a unified diff to `content`.
+
+    Hunks are located at their stated line first, then at the closest
+    position where their context matches, so diffs made against a slightly
+    shifted version of the file still apply.
+
+    Returns:
+        tuple: (new content, number of hunks applied).
+
+    Raises:
+        PatchError: If the diff has no hunks or a hunk's context does not match.
+    """
+    lines = content.splitlines(keepends=True)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    hunks = _parse_hunks(patch)
+    if not hunks:
+        raise PatchError("the patch contains no '@@' hunks")
+
+    # Lines shift as earlier hunks add or remove lines
+    shift = 0
+    for number, (old_start, old_lines, new_lines) in enumerate(hunks, start=1):
+        expected = max(0, old_start - 1 + shift)
+        position = _find_hunk(lines, old_lines, expected)
+        if position is None:
+            raise PatchError(f"hunk {number} (@@ -{old_start} @@) {_hunk_mismatch(lines, old_lines, expected)}")
+        replacement = [line + newline for line in new_lines]
+        # Keep a missing final newline missing if the hunk touches the end
+        end = position + len(old_lines)
+        if end == len(lines) and lines and not lines[-1].endswith("\n") and replacement:
+            replacement[-1] = replacement[-1][: -len(newline)]
+        lines[position:end] = replacement
+        shift = position - (old_start - 1) + len(new_lines) - len(old_lines)
+    return "".join(lines), len(hunks)
+
+
+def _parse_hunks(patch: str) -> List[Tuple[int, List[str], List[str]]]:
+    """Splits a unified diff into (old start line, old lines, new lines) hunks."""
+    hunks = []
+    current = None
+    for raw in patch.splitlines():
+        header = _HUNK_HEADER.match(raw)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or raw.startswith(("--- ", "+++ ")) and not current[1] and not current[2]:
+            continue  # File headers and anything before the first hunk
+        if raw.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        tag, text = raw[:1], raw[1:]
+        if tag == " " or raw == "":
+            current[1].append(text)
+            current[2].append(text)
+        elif tag == "-":
+            current[1].append(text)
+        elif tag == "+":
+            current[2].append(text)
+        else:
+            raise PatchError(f"unexpected line in hunk {len(hunks)}: {raw[:80]!r}")
+    return hunks
+
+
+def _matches_at(lines: List[str], old_lines: List[str], position: int) -> bool:
+    """Checks whether `old_lines` match the file starting at `position`."""
+    if position < 0 or position + len(old_lines) > len(lines):
+        return False
+    return all(
+        lines[position + offset].rstrip("\r\n") == old
+        for offset, old in enumerate(old_lines)
+    )
+
+
+def _find_hunk(lines: List[str], old_lines: List[str], expected: int) -> Optional[int]:
+    """Finds where a hunk applies, searching outward from its expected line."""
+    if not old_lines:
+        return min(expected, len(lines))
+    for distance in range(len(lines) + 1):
+        for position in (expected - distance, expected + distance):
+            if _matches_at(lines, old_lines, position):
+                return position
+    return None
+
+
+def _hunk_mismatch(lines: List[str], old_lines: List[str], expected: int) -> str:
+    """Describes the first line where a hunk disagrees with the file."""
+    for offset, old in enumerate(old_lines):
+        index = expected + offset
+        if index >= len(lines):
+            return f"does not apply: the file ends at line {len(lines)}, expected {old[:80]!r}"
+        found = lines[index].rstrip("\r\n")
+        if found != old:
+            return (
+                f"does not apply at line {index + 1}: expected {old[:80]!r}, "
+                f"found {found[:80]!r}, and the hunk's lines do not match anywhere else"
+            )
+    return "does not apply"
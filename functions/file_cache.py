@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import FILE_CACHE_MAX_BYTES
+
+# (st_mtime_ns, st_size, st_ino): changes whenever the file is rewritten.
+Signature = Tuple[int, int, int]
+
+
+def file_signature(st: os.stat_result) -> Signature:
+    """Builds the validation signature for a file from its stat result."""
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileCache:
+    """
+    In-process cache of decoded file contents shared by the file tools.
+
+    Entries are keyed on the resolved (real) path and validated against the
+    file's (mtime_ns, size, inode) on every lookup, so edits made outside
+    the agent are always picked up. Eviction is least-recently-used and
+    bounded by the total size of the cached files.
+
+    Thread-safe: tools from the same model turn may run concurrently.
+    """
+
+    def __init__(self, max_bytes: int = FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Signature, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, real_path: str, signature: Signature) -> Optional[str]:
+        """Returns the cached content if it is still valid for `signature`."""
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(real_path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, real_path: str, signature: Signature, content: str) -> None:
+        """Stores `content` for the file version described by `signature`."""
+        size = signature[1]
+        with self._lock:
+            self._remove(real_path)
+            if size > self.max_bytes:
+                return
+            self._entries[real_path] = (signature, content)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, real_path: str) -> None:
+        """Drops any cached content for the given path."""
+        with self._lock:
+            self._remove(real_path)
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+            }
+
+    def _remove(self, real_path: str) -> None:
+        """Removes an entry; the caller must hold the lock."""
+        entry = self._entries.pop(real_path, None)
+        if entry is not None:
+            self.total_bytes -= entry[0][1]
+
+
+# Shared by get_file_content and write_file.
+file_cache = FileCache()
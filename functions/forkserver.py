@@ -0,0 +1,393 @@
+"""
+Fork server for fast Python script execution.
+
+Starting a fresh interpreter for every `run_python_file` call costs tens of
+milliseconds before the script even begins, plus the import time of every
+module it uses. The fork server is a long-lived interpreter that imports a
+set of common standard-library modules once, then forks a clean child for
+each run. The child starts with those modules already loaded.
+
+The server side runs as a separate process:
+
+    python functions/forkserver.py <socket path> <comma-separated modules>
+
+and must only depend on the standard library, because it is started with
+`functions/` as its import root and everything it imports is inherited by
+every script it runs.
+
+Protocol (one Unix socket connection per run):
+    client -> server: one JSON line {"path", "argv", "cwd", "limits"} sent
+                      together with the write ends of the stdout and stderr pipes
+    server -> client: {"pid": <child pid>}
+    server -> client: {"returncode": <exit code, negative for signals>,
+                       "usage": <resource usage, see `usage_from_rusage`>}
+
+The resource limit helpers below are also used by `run_python_file` for
+scripts started as a new interpreter.
+"""
+
+import atexit
+import json
+import os
+import resource
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# ==========================================
+# Resource limits
+# ==========================================
+
+# Limit names accepted by `apply_resource_limits`, and what they map to.
+RESOURCE_LIMITS = {
+    "cpu_seconds": resource.RLIMIT_CPU,
+    "memory_bytes": resource.RLIMIT_AS,
+    "open_files": resource.RLIMIT_NOFILE,
+    "processes": resource.RLIMIT_NPROC,
+}
+
+
+def resource_limit_values(limits: Dict[str, Optional[int]]) -> Dict[int, Tuple[int, int]]:
+    """
+    Returns the (soft, hard) values `apply_resource_limits` sets, by resource.
+    None leaves a limit as it is, and no limit is raised above the calling
+    process's current hard limit.
+
+    The CPU limit's hard value is one second above the soft one: the script
+    gets SIGXCPU first, then SIGKILL if it catches that and keeps going.
+    """
+    values = {}
+    for name, value in limits.items():
+        if value is None:
+            continue
+        which = RESOURCE_LIMITS[name]
+        _, hard = resource.getrlimit(which)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        new_hard = value + 1 if which == resource.RLIMIT_CPU else value
+        if hard != resource.RLIM_INFINITY:
+            new_hard = min(new_hard, hard)
+        values[which] = (value, new_hard)
+    return values
+
+
+def apply_resource_limits(limits: Dict[str, Optional[int]]) -> None:
+    """
+    Lowers the resource limits of the calling process (and of everything it
+    starts), by name as in RESOURCE_LIMITS; see `resource_limit_values`.
+    """
+    for which, value in resource_limit_values(limits).items():
+        resource.setrlimit(which, value)
+
+
+def usage_from_rusage(rusage: resource.struct_rusage) -> Dict[str, float]:
+    """Picks what a run report needs out of a `wait4` resource usage."""
+    return {
+        "user_seconds": rusage.ru_utime,
+        "system_seconds": rusage.ru_stime,
+        # Kilobytes on Linux, bytes on macOS
+        "max_rss_kb": rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss,
+    }
+
+
+# ==========================================
+# Server
+# ==========================================
+
+def _run_child(request: dict, stdout_fd: int, stderr_fd: int) -> None:
+    """
+    Runs a script in the freshly forked child and never returns.
+
+    Mirrors `python <path> <args...>` started with `cwd`: argv, sys.path[0],
+    `__main__` and the exit code behave the same way.
+    """
+    code = 1
+    try:
+        # Before the open files limit is lowered: descriptors above it must be closed too
+        max_fd = os.sysconf("SC_OPEN_MAX") if "SC_OPEN_MAX" in os.sysconf_names else 65536
+        # Own process group, so a timeout can kill the script and its children
+        os.setpgid(0, 0)
+        apply_resource_limits(request.get("limits") or {})
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in (devnull, stdout_fd, stderr_fd):
+            os.close(fd)
+        # Everything else is the server's: the listener, the selector, the
+        # wakeup pipe and the connections (and output pipes) of other runs
+        os.closerange(3, max(max_fd, 3))
+
+        os.chdir(request["cwd"])
+        script = os.path.abspath(request["path"])
+        sys.argv = [request["path"]] + list(request["argv"])
+        sys.path[0] = os.path.dirname(script)
+
+        import builtins
+        import traceback
+        import types
+
+        # A fresh __main__ module, like the interpreter creates for a script
+        main_module = types.ModuleType("__main__")
+        main_module.__file__ = script
+        main_module.__builtins__ = builtins
+        sys.modules["__main__"] = main_module
+
+        try:
+            with open(script, "rb") as f:
+                source = f.read()
+            exec(compile(source, script, "exec"), main_module.__dict__)
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException as e:
+            # Skip this frame so the traceback starts in the script itself
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            code = 1
+
+        # What the interpreter would do on a normal shutdown
+        for thread in threading.enumerate():
+            if thread is not threading.main_thread() and not thread.daemon:
+                thread.join()
+        atexit._run_exitfuncs()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code & 0xFF)
+
+
+def serve(socket_path: str, preload: List[str]) -> None:
+    """Accepts run requests on `socket_path` until the process is killed."""
+    for module in preload:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+
+    # Child exits are noticed through the signal wakeup fd, which keeps the
+    # server single-threaded (and therefore safe to fork from).
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wakeup_r, selectors.EVENT_READ, "reap")
+    children = {}
+
+    while True:
+        for key, _ in selector.select(timeout=1.0):
+            if key.data == "accept":
+                conn, _ = listener.accept()
+                try:
+                    message, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+                    request = json.loads(message)
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    pid = os.fork()
+                except Exception:
+                    conn.close()
+                    continue
+                if pid == 0:
+                    listener.close()
+                    conn.close()
+                    _run_child(request, fds[0], fds[1])
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = conn
+                try:
+                    conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+                except OSError:
+                    pass
+            else:
+                try:
+                    os.read(wakeup_r, 4096)
+                except BlockingIOError:
+                    pass
+
+        # Reap on every pass; signals can be coalesced
+        while children:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is None:
+                continue
+            try:
+                reply = {"returncode": os.waitstatus_to_exitcode(status), "usage": usage_from_rusage(rusage)}
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+            except OSError:
+                pass
+            finally:
+                conn.close()
+
+
+# ==========================================
+# Client
+# ==========================================
+
+class ForkServerClient:
+    """
+    Starts the fork server on first use and runs scripts through it.
+
+    Args:
+        preload (List[str]): Modules the server imports before forking.
+        startup_timeout (float): Seconds to wait for the server to come up.
+    """
+
+    def __init__(self, preload: List[str], startup_timeout: float = 10.0):
+        self.preload = preload
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._socket_path: Optional[str] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self) -> str:
+        """Returns the socket path of a running server, starting one if needed."""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return self._socket_path
+
+            socket_dir = tempfile.mkdtemp(prefix="ai-agent-forkserver-")
+            self._socket_path = os.path.join(socket_dir, "server.sock")
+            self._process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), self._socket_path, ",".join(self.preload)],
+                stdin=subprocess.DEVNULL,
+            )
+
+            deadline = time.monotonic() + self.startup_timeout
+            while not os.path.exists(self._socket_path):
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Python fork server failed to start")
+                time.sleep(0.01)
+            return self._socket_path
+
+    def close(self) -> None:
+        """Stops the server process."""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+            if self._socket_path is not None:
+                try:
+                    os.unlink(self._socket_path)
+                    os.rmdir(os.path.dirname(self._socket_path))
+                except OSError:
+                    pass
+                self._socket_path = None
+
+    def spawn(
+        self, path: str, argv: List[str], cwd: str, limits: Optional[Dict[str, Optional[int]]] = None
+    ) -> "ForkedProcess":
+        """
+        Starts `path` with `argv` in `cwd` in a forked child, under the given
+        resource limits (see `apply_resource_limits`).
+
+        Returns:
+            ForkedProcess: The running script; the caller reads its output
+            pipes and then calls `wait`.
+        """
+        socket_path = self._ensure_started()
+
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            control.connect(socket_path)
+            request = {"path": path, "argv": argv, "cwd": os.path.abspath(cwd), "limits": limits or {}}
+            socket.send_fds(control, [json.dumps(request).encode() + b"\n"], [stdout_w, stderr_w])
+            control_file = control.makefile("rb")
+            pid = json.loads(control_file.readline())["pid"]
+        except Exception:
+            control.close()
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise
+        finally:
+            # The child holds the write ends now; EOF arrives when it exits
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        return ForkedProcess(pid, stdout_r, stderr_r, control, control_file)
+
+
+class ForkedProcess:
+    """
+    A script started by the fork server.
+
+    Attributes:
+        pid (int): Process id (and process group id) of the script.
+        stdout_fd (int): Read end of the script's stdout pipe.
+        stderr_fd (int): Read end of the script's stderr pipe.
+        usage (dict): CPU time and peak RSS of the script once it has
+            exited (see `usage_from_rusage`), or None.
+    """
+
+    def __init__(self, pid: int, stdout_fd: int, stderr_fd: int, control: socket.socket, control_file):
+        self.pid = pid
+        self.stdout_fd = stdout_fd
+        self.stderr_fd = stderr_fd
+        self.usage: Optional[Dict[str, float]] = None
+        self._control = control
+        self._control_file = control_file
+
+    def kill(self) -> None:
+        """Kills the script's process group, ignoring processes that are gone."""
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def wait(self, timeout: float) -> int:
+        """
+        Waits for the exit status reported by the fork server.
+
+        Raises:
+            subprocess.TimeoutExpired: If the script has not exited in time.
+        """
+        try:
+            self._control.settimeout(max(0.0, timeout))
+            line = self._control_file.readline()
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(str(self.pid), timeout)
+        finally:
+            self._control_file.close()
+            self._control.close()
+        if not line:
+            raise RuntimeError("Python fork server exited while running the script")
+        reply = json.loads(line)
+        self.usage = reply.get("usage")
+        return reply["returncode"]
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], [name for name in sys.argv[2].split(",") if name])
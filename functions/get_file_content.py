@@ -1,21 +1,97 @@
+import mmap
 import os
-from config import MAX_CHARS
+import stat
+from typing import Optional
+from config import BINARY_SNIFF_BYTES, MAX_CHARS, MMAP_THRESHOLD_BYTES
+from functions.file_cache import file_cache, file_signature
+from functions.line_index import line_index_cache
+from functions.read_ledger import ReadLedger, delta_since
 
-def get_file_content(working_directory: str, file_path: str) -> str:
+# Control bytes that legitimately appear in text files (\b, \t, \n, \f, \r, ESC).
+_TEXT_CONTROL_BYTES = {8, 9, 10, 12, 13, 27}
+
+
+def is_binary(header: bytes) -> bool:
+    """
+    Guesses whether file data is binary from its first few kilobytes.
+
+    A NUL byte, or more than 30% control bytes, marks the data as binary.
+    """
+    if not header:
+        return False
+    if b"\x00" in header:
+        return True
+    control = sum(1 for byte in header if byte < 32 and byte not in _TEXT_CONTROL_BYTES)
+    return control / len(header) > 0.3
+
+
+def _line_header(file_path: str, start_line: int, end_line: int, line_count: int) -> str:
+    """Describes which lines of the file a ranged read returned."""
+    return f'[Lines {start_line}-{end_line} of {line_count} in "{file_path}"]\n'
+
+
+def _clamp_lines(start_line: Optional[int], end_line: Optional[int], line_count: int):
+    """Turns optional 1-based, inclusive line bounds into a valid span."""
+    start = max(1, start_line or 1)
+    end = min(line_count, end_line or line_count)
+    return start, end
+
+
+def _cap(text: str, file_path: str, continuation: str) -> str:
+    """Cuts `text` at MAX_CHARS and tells the model how to read on."""
+    if len(text) <= MAX_CHARS:
+        return text
+    return text[:MAX_CHARS] + (
+        f'\n[...File "{file_path}" truncated at {MAX_CHARS} characters; {continuation}...]'
+    )
+
+
+def get_file_content(
+    working_directory: str,
+    file_path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    full: bool = False,
+    *,
+    ledger: Optional[ReadLedger] = None,
+) -> str:
     """
     Reads the content of a file within the permitted working directory.
+    Long files are truncated; read further with a line range or a byte range.
+    Re-reading a whole file you already have returns only what changed.
 
     Security:
         - Prevents Path Traversal attacks by ensuring the resolved file path
           starts with the absolute working directory path.
         - Truncates content if it exceeds MAX_CHARS to prevent token limit issues.
+        - Refuses to decode binary files (detected from a header sniff).
+
+    Performance:
+        - Decoded contents are served from the shared file cache while the
+          file's (mtime, size, inode) signature is unchanged.
+        - Files larger than MMAP_THRESHOLD_BYTES are memory-mapped; their
+          line-offset index is kept between calls so seeking to a line is O(1).
+        - With a session ledger, a whole-file re-read of a file the model
+          already has (read or written by it) is answered with "unchanged" or
+          a unified diff against that version instead of the full text.
 
     Args:
         working_directory (str): The base directory where file access is allowed.
         file_path (str): The relative path of the file to read.
+        offset (int, optional): Byte offset to start reading at. Cannot be
+            combined with start_line/end_line.
+        length (int, optional): Number of bytes to read from `offset`.
+        start_line (int, optional): First line to read (1-based, inclusive).
+        end_line (int, optional): Last line to read (1-based, inclusive).
+        full (bool): Return the whole content even if you already saw this
+            version of the file.
+        ledger (ReadLedger, optional): The session's record of delivered
+            file versions (host-supplied).
 
     Returns:
-        str: The content of the file, or an error message starting with 'Error:'.
+        str: The content of the file (or, on a re-read, what changed), or an error message starting with 'Error:'.
     """
     # Resolve absolute paths to ensure accurate comparison
     abs_working_dir = os.path.abspath(working_directory)
@@ -26,22 +102,118 @@ def get_file_content(working_directory: str, file_path: str) -> str:
     if not abs_file_path.startswith(abs_working_dir):
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory.'
 
-    # Check if the file exists and is actually a file (not a directory)
-    if not os.path.isfile(abs_file_path):
+    # Check if the file exists and is actually a file (not a directory).
+    # A single stat() also provides the signature used to validate the cache.
+    try:
+        st = os.stat(abs_file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         return f'Error: File not found or is not a regular file: "{file_path}"'
 
+    if offset is not None and offset < 0 or length is not None and length < 0:
+        return "Error: offset and length must not be negative."
+    if start_line is not None and start_line < 1 or end_line is not None and end_line < 1:
+        return "Error: start_line and end_line are 1-based."
+    if (offset is not None or length is not None) and (start_line is not None or end_line is not None):
+        return "Error: Use either offset/length or start_line/end_line, not both."
+
     try:
-        # Open with UTF-8 encoding to support international characters
-        # errors='replace' prevents crashing on non-text bytes
-        with open(abs_file_path, "r", encoding="utf-8", errors="replace") as f:
-            content = f.read(MAX_CHARS)
-            
-            # If the file is larger than the limit, append a truncation notice
-            if os.path.getsize(abs_file_path) > MAX_CHARS:
-                content += (
-                    f'\n[...File "{file_path}" truncated at {MAX_CHARS} characters...]'
-                )
-        return content
+        real_path = os.path.realpath(abs_file_path)
+        signature = file_signature(st)
+
+        # Byte ranges are served straight from the file, whatever its size.
+        if offset is not None or length is not None:
+            return _read_bytes(abs_file_path, file_path, st.st_size, offset or 0, length)
+
+        if st.st_size > MMAP_THRESHOLD_BYTES:
+            return _read_large(abs_file_path, real_path, signature, file_path, start_line, end_line)
+
+        content = file_cache.get(real_path, signature)
+        if content is None:
+            with open(abs_file_path, "rb") as f:
+                data = f.read()
+            if is_binary(data[:BINARY_SNIFF_BYTES]):
+                return f'Error: "{file_path}" appears to be a binary file ({st.st_size} bytes) and cannot be displayed as text.'
+            # errors='replace' keeps stray invalid bytes in otherwise-text files readable
+            content = data.decode("utf-8", errors="replace")
+            file_cache.put(real_path, signature, content)
+
+        if start_line is None and end_line is None:
+            if len(content) > MAX_CHARS:
+                # If the file is larger than the limit, append a truncation notice
+                return _cap(content, file_path, "use start_line/end_line or offset/length to read the rest")
+            if ledger is not None:
+                delivered = None if full else ledger.get(file_path)
+                ledger.record(file_path, content)
+                if delivered is not None:
+                    delta = delta_since(file_path, delivered, content)
+                    if delta is not None:
+                        return delta
+            return content
+
+        lines = content.split("\n")
+        if content.endswith("\n"):
+            lines.pop()
+        start, end = _clamp_lines(start_line, end_line, len(lines))
+        if start > end:
+            return f'Error: "{file_path}" has only {len(lines)} lines.'
+        text = "\n".join(lines[start - 1:end])
+        return _line_header(file_path, start, end, len(lines)) + _cap(
+            text, file_path, "request a smaller line range"
+        )
 
     except Exception as e:
-        return f'Error reading file "{file_path}": {e}'
\ No newline at end of file
+        return f'Error reading file "{file_path}": {e}'
+
+
+def _read_bytes(abs_file_path: str, file_path: str, size: int, offset: int, length: Optional[int]) -> str:
+    """Reads and decodes a byte range of the file."""
+    if offset >= size and size:
+        return f'Error: offset {offset} is beyond the end of "{file_path}" ({size} bytes).'
+    # Never read more bytes than MAX_CHARS characters can occupy in UTF-8
+    length = min(size - offset, length if length is not None else MAX_CHARS, (MAX_CHARS + 1) * 4)
+    with open(abs_file_path, "rb") as f:
+        data = os.pread(f.fileno(), length, offset)
+    if is_binary(data[:BINARY_SNIFF_BYTES]):
+        return f'Error: bytes {offset}-{offset + len(data)} of "{file_path}" appear to be binary data.'
+    # errors='replace' also covers a multi-byte character cut at either edge
+    text = data.decode("utf-8", errors="replace")
+    header = f'[Bytes {offset}-{offset + len(data)} of {size} in "{file_path}"]\n'
+    return header + _cap(text, file_path, "request a smaller length")
+
+
+def _read_large(
+    abs_file_path: str,
+    real_path: str,
+    signature,
+    file_path: str,
+    start_line: Optional[int],
+    end_line: Optional[int],
+) -> str:
+    """Serves a read of a large file from a memory map and its line index."""
+    with open(abs_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if is_binary(mm[:BINARY_SNIFF_BYTES]):
+            return f'Error: "{file_path}" appears to be a binary file ({len(mm)} bytes) and cannot be displayed as text.'
+
+        if start_line is None and end_line is None:
+            # UTF-8 needs at most 4 bytes per character, so this decodes at
+            # least MAX_CHARS + 1 characters and the notice is always added
+            text = mm[:(MAX_CHARS + 1) * 4].decode("utf-8", errors="replace")
+            return _cap(
+                text,
+                file_path,
+                f"the file has {len(mm)} bytes; use start_line/end_line or offset/length to read the rest",
+            )
+
+        index = line_index_cache.get(real_path, signature, mm)
+        start, end = _clamp_lines(start_line, end_line, index.line_count)
+        if start > end:
+            return f'Error: "{file_path}" has only {index.line_count} lines.'
+        byte_start, byte_end = index.byte_range(start, end)
+        # Never decode more than MAX_CHARS characters can occupy
+        byte_end = min(byte_end, byte_start + (MAX_CHARS + 1) * 4)
+        text = mm[byte_start:byte_end].decode("utf-8", errors="replace").removesuffix("\n")
+        return _line_header(file_path, start, end, index.line_count) + _cap(
+            text, file_path, "request a smaller line range"
+        )
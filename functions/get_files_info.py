@@ -1,114 +1,46 @@
+import fnmatch
 import os
-from google.genai import types
-
-# ==========================================
-# Tool Definitions (Schemas)
-# These schemas tell the AI model how to use the functions.
-# ==========================================
-
-schema_get_files_info = types.FunctionDeclaration(
-    name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "directory": types.Schema(
-                type=types.Type.STRING,
-                description=(
-                    "The directory to list files from, relative to the working "
-                    "directory. If not provided, lists files in the working "
-                    "directory itself."
-                ),
-            ),
-        },
-    ),
-)
-
-schema_get_file_content = types.FunctionDeclaration(
-    name="get_file_content",
-    description="Reads the contents of a file in the working directory.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description=(
-                    "Path to the file to read, relative to the working directory."
-                ),
-            ),
-        },
-    ),
-)
-
-schema_run_python_file = types.FunctionDeclaration(
-    name="run_python_file",
-    description=(
-        "Executes a Python file in the working directory with optional "
-        "command-line arguments and returns its output."
-    ),
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description=(
-                    "Python file to run, relative to the working directory."
-                ),
-            ),
-            "args": types.Schema(
-                type=types.Type.ARRAY,
-                description=(
-                    "Optional list of arguments to pass to the Python file."
-                ),
-                items=types.Schema(type=types.Type.STRING),
-            ),
-        },
-    ),
-)
-
-schema_write_file = types.FunctionDeclaration(
-    name="write_file",
-    description="Writes or overwrites a file in the working directory with the provided content.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="File path to write to, relative to the working directory.",
-            ),
-            "content": types.Schema(
-                type=types.Type.STRING,
-                description="The content to write into the file.",
-            ),
-        },
-    ),
-)
-
-# Collection of all available tools to be passed to the model
-available_functions = types.Tool(
-    function_declarations=[
-        schema_get_files_info,
-        schema_get_file_content,
-        schema_run_python_file,
-        schema_write_file,
-    ],
-)
-
-
-# ==========================================
-# Function Implementation
-# ==========================================
-
-def get_files_info(working_directory: str, directory: str = ".") -> str:
+from typing import List, Optional
+
+from config import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT
+from functions.workspace import walk_workspace
+
+
+def get_files_info(
+    working_directory: str,
+    directory: str = ".",
+    max_depth: int = 0,
+    pattern: Optional[str] = None,
+    extensions: Optional[List[str]] = None,
+    limit: int = LIST_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> str:
     """
     Lists files and directories within a specified path, showing size and type.
+    Can descend into subdirectories and filter by glob pattern or extension;
+    ignored paths (.gitignore, .venv, __pycache__, ...) are skipped.
 
     Security:
         - Prevents accessing directories outside the 'working_directory' (Path Traversal).
 
+    Performance:
+        - Built on os.scandir: the entry type comes from the directory read
+          itself, and each entry is stat()ed at most once.
+        - Whole trees can be listed in one call (max_depth), in a sorted,
+          deterministic order that makes the continuation cursor stable.
+
     Args:
         working_directory (str): The root permitted directory.
         directory (str): The sub-directory to list (relative to working_directory).
+        max_depth (int): Levels of subdirectories to descend into (0 = no recursion;
+            use a large value to list the whole tree in one call).
+        pattern (str, optional): Glob matched against the file name (e.g. "*.py"),
+            or against the relative path if it contains '/' (e.g. "pkg/*.py").
+            Directories are omitted when filtering.
+        extensions (List[str], optional): File extensions to keep, e.g. [".py", ".md"].
+        limit (int): Maximum number of entries to return.
+        cursor (str, optional): Number of entries to skip, as returned by a
+            previous truncated call.
 
     Returns:
         str: A formatted list of files/folders or an error message.
@@ -127,22 +59,60 @@ def get_files_info(working_directory: str, directory: str = ".") -> str:
         if not os.path.isdir(abs_target):
             return f'Error: "{directory}" is not a directory'
 
-        entries = os.listdir(abs_target)
-        lines = []
+        try:
+            skip = int(cursor) if cursor else 0
+        except ValueError:
+            return f'Error: Invalid cursor "{cursor}"'
+        limit = max(1, min(limit or LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT))
+        suffixes = tuple(
+            ext if ext.startswith(".") else f".{ext}" for ext in (extensions or [])
+        )
+        filtering = bool(pattern or suffixes)
+
+        # Paths are reported relative to the listed directory
+        start = os.path.relpath(abs_target, abs_working)
+        prefix_length = 0 if start == "." else len(start.replace(os.sep, "/")) + 1
 
-        for entry in entries:
-            entry_path = os.path.join(abs_target, entry)
-            
-            # Gather file stats
-            is_dir = os.path.isdir(entry_path)
-            size = os.path.getsize(entry_path)
+        lines = []
+        matched = 0
+        for rel_path, entry, _ in walk_workspace(abs_working, start, max_depth=max(0, max_depth or 0)):
+            # A symlink is listed as itself, as the walk does not follow it
+            is_dir = entry.is_dir(follow_symlinks=False)
+            display = rel_path[prefix_length:]
+
+            if filtering:
+                if is_dir:
+                    continue
+                if suffixes and not entry.name.endswith(suffixes):
+                    continue
+                if pattern and not fnmatch.fnmatch(display if "/" in pattern else entry.name, pattern):
+                    continue
+
+            matched += 1
+            if matched <= skip:
+                continue
+            if len(lines) == limit:
+                # One entry past the page proves there is more to fetch
+                lines.append(
+                    f'[...Listing truncated at {limit} entries. Call again with '
+                    f'cursor="{skip + limit}" to continue...]'
+                )
+                break
+
+            # Gather file stats (cached on the DirEntry)
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                size = 0
 
             # Format the output line (e.g., "- main.py: file_size=1024 bytes, is_dir=False")
             lines.append(
-                f"- {entry}: file_size={size} bytes, is_dir={str(is_dir)}"
+                f"- {display}: file_size={size} bytes, is_dir={str(is_dir)}"
             )
 
+        if not lines and filtering:
+            return f'No files in "{directory}" match the given filters.'
         return "\n".join(lines)
 
     except Exception as e:
-        return f"Error listing files: {e}"
\ No newline at end of file
+        return f"Error listing files: {e}"
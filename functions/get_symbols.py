@@ -0,0 +1,252 @@
+import ast
+import os
+import stat
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import SYMBOL_CACHE_ENTRIES
+from functions.file_cache import Signature, file_signature
+from functions.get_file_content import get_file_content
+from functions.workspace import walk_workspace
+
+
+class Symbol:
+    """A class or function definition found in a module."""
+
+    def __init__(self, kind: str, name: str, signature: str, start_line: int, end_line: int, depth: int):
+        self.kind = kind  # "class", "def" or "async def"
+        # Dotted path from the module level, e.g. "Calculator._evaluate_infix"
+        self.name = name
+        self.signature = signature
+        # Line span including decorators (1-based, inclusive)
+        self.start_line = start_line
+        self.end_line = end_line
+        self.depth = depth
+
+
+class FileOutline:
+    """The imports and definitions of one Python file."""
+
+    def __init__(self, line_count: int, imports: List[str], symbols: List[Symbol], error: Optional[str] = None):
+        self.line_count = line_count
+        self.imports = imports
+        self.symbols = symbols
+        # Set instead of symbols when the file does not parse
+        self.error = error
+
+    def find(self, name: str) -> List[Symbol]:
+        """Returns the symbols matching a dotted name, or a bare name if that is unique."""
+        exact = [symbol for symbol in self.symbols if symbol.name == name]
+        if exact:
+            return exact
+        return [symbol for symbol in self.symbols if symbol.name.rsplit(".", 1)[-1] == name]
+
+
+def parse_outline(source: str) -> FileOutline:
+    """Builds the outline of Python source code."""
+    line_count = source.count("\n") + (0 if source.endswith("\n") or not source else 1)
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return FileOutline(line_count, [], [], error=f"{type(e).__name__}: {e}")
+
+    imports = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.append(f"{module}: {', '.join(alias.name for alias in node.names)}")
+
+    symbols: List[Symbol] = []
+    _collect(tree.body, "", 0, symbols)
+    return FileOutline(line_count, imports, symbols)
+
+
+def _collect(body: List[ast.stmt], prefix: str, depth: int, symbols: List[Symbol]) -> None:
+    """Adds the classes and functions of a module or class body, recursing into classes."""
+    for node in body:
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+            bases = [ast.unparse(base) for base in node.bases]
+            bases += [ast.unparse(keyword) for keyword in node.keywords]
+            signature = f"({', '.join(bases)})" if bases else ""
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            kind = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            signature = f"({ast.unparse(node.args)})"
+            if node.returns is not None:
+                signature += f" -> {ast.unparse(node.returns)}"
+        else:
+            continue
+
+        start_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        name = prefix + node.name
+        symbols.append(Symbol(kind, name, signature, start_line, node.end_lineno or node.lineno, depth))
+        # Methods and nested classes; functions nested in functions are implementation details
+        if kind == "class":
+            _collect(node.body, name + ".", depth + 1, symbols)
+
+
+class OutlineCache:
+    """
+    Keeps parsed outlines of Python files, validated by the same
+    (mtime_ns, size, inode) signature as the file content cache, so asking
+    again for the outline of an unchanged package costs one stat per file.
+    """
+
+    def __init__(self, max_entries: int = SYMBOL_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Signature, FileOutline]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, real_path: str, signature: Signature) -> FileOutline:
+        """Returns the outline of the file, parsing it on a miss."""
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(real_path)
+                return entry[1]
+
+        with open(real_path, "rb") as f:
+            outline = parse_outline(f.read().decode("utf-8", errors="replace"))
+
+        with self._lock:
+            self._entries[real_path] = (signature, outline)
+            self._entries.move_to_end(real_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return outline
+
+    def clear(self) -> None:
+        """Drops every cached outline."""
+        with self._lock:
+            self._entries.clear()
+
+
+outline_cache = OutlineCache()
+
+
+def _format_outline(rel_path: str, outline: FileOutline) -> str:
+    """Renders one file's outline as indented text."""
+    lines = [f"{rel_path} ({outline.line_count} lines)"]
+    if outline.error:
+        lines.append(f"  [Could not parse: {outline.error}]")
+        return "\n".join(lines)
+    if outline.imports:
+        lines.append(f"  imports: {'; '.join(outline.imports)}")
+    for symbol in outline.symbols:
+        indent = "  " * (symbol.depth + 1)
+        short_name = symbol.name.rsplit(".", 1)[-1]
+        lines.append(f"{indent}{symbol.kind} {short_name}{symbol.signature}  [{symbol.start_line}-{symbol.end_line}]")
+    return "\n".join(lines)
+
+
+def get_symbols(working_directory: str, path: str = ".") -> str:
+    """
+    Outlines the Python code in a file or directory without reading it whole:
+    imports, classes, methods and functions with their signatures and line
+    ranges.
+
+    Security:
+        - Prevents Path Traversal attacks by validating that the target
+          remains within the 'working_directory'.
+
+    Performance:
+        - Parsed outlines are cached per file and reused while the file's
+          (mtime, size, inode) signature is unchanged.
+
+    Args:
+        working_directory (str): The root permitted directory.
+        path (str): A .py file, or a directory whose .py files (recursively)
+            are outlined. Defaults to the whole working directory.
+
+    Returns:
+        str: Imports, classes and functions with signatures and line ranges,
+        or an error message starting with 'Error:'.
+    """
+    abs_working_dir = os.path.abspath(working_directory)
+    abs_path = os.path.abspath(os.path.join(working_directory, path))
+
+    # Security Check: Ensure we are not reading outside the sandbox
+    if not abs_path.startswith(abs_working_dir):
+        return f'Error: Cannot outline "{path}" as it is outside the permitted working directory.'
+
+    try:
+        if os.path.isfile(abs_path):
+            if not abs_path.endswith(".py"):
+                return f'Error: "{path}" is not a Python file.'
+            files = [(os.path.normpath(path).replace(os.sep, "/"), abs_path)]
+        elif os.path.isdir(abs_path):
+            # Walked from the root so its .gitignore rules apply to the subdirectory
+            files = [
+                (rel_path, entry.path)
+                for rel_path, entry, _ in walk_workspace(abs_working_dir, os.path.relpath(abs_path, abs_working_dir))
+                if entry.name.endswith(".py") and entry.is_file(follow_symlinks=False)
+            ]
+            if not files:
+                return f'No Python files found in "{path}".'
+        else:
+            return f'Error: "{path}" does not exist.'
+
+        # Long outlines are shortened to the tool's token budget on their way
+        # into the history (see output_shaping.py)
+        sections = []
+        for rel_path, file_abs_path in files:
+            st = os.stat(file_abs_path)
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            sections.append(_format_outline(rel_path, outline_cache.get(os.path.realpath(file_abs_path), file_signature(st))))
+        return "\n\n".join(sections)
+
+    except Exception as e:
+        return f"Error outlining symbols: {e}"
+
+
+def get_symbol_source(working_directory: str, file_path: str, symbol: str) -> str:
+    """
+    Returns the source of one class or function, found by name, instead of
+    the whole file.
+
+    Security:
+        - Same sandboxing as get_file_content, which serves the lines.
+
+    Args:
+        working_directory (str): The root permitted directory.
+        file_path (str): The relative path of the Python file.
+        symbol (str): A dotted name such as "Calculator._evaluate_infix", or a
+            bare name such as "evaluate" if it is unique in the file.
+
+    Returns:
+        str: The symbol's lines (with decorators), or an error message starting with 'Error:'.
+    """
+    abs_working_dir = os.path.abspath(working_directory)
+    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+
+    # Security Check: Ensure we are not reading outside the sandbox
+    if not abs_file_path.startswith(abs_working_dir):
+        return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory.'
+
+    try:
+        st = os.stat(abs_file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return f'Error: File not found or is not a regular file: "{file_path}"'
+
+    try:
+        outline = outline_cache.get(os.path.realpath(abs_file_path), file_signature(st))
+    except Exception as e:
+        return f'Error reading file "{file_path}": {e}'
+    if outline.error:
+        return f'Error: Could not parse "{file_path}": {outline.error}'
+
+    matches = outline.find(symbol)
+    if not matches:
+        return f'Error: No class or function named "{symbol}" in "{file_path}". Use get_symbols to list them.'
+    if len(matches) > 1:
+        names = ", ".join(f"{match.name} (line {match.start_line})" for match in matches)
+        return f'Error: "{symbol}" is ambiguous in "{file_path}": {names}. Use the dotted name.'
+
+    match = matches[0]
+    return get_file_content(working_directory, file_path, start_line=match.start_line, end_line=match.end_line)
@@ -0,0 +1,82 @@
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Tuple
+
+from config import LINE_INDEX_CACHE_ENTRIES
+from functions.file_cache import Signature
+
+
+class LineIndex:
+    """
+    Byte offsets of the start of every line of a file.
+
+    Built once with a linear scan of a memory-mapped file; afterwards the
+    byte range of any line span is found in O(1).
+    """
+
+    def __init__(self, mm: mmap.mmap):
+        self.size = len(mm)
+        offsets = array("Q", [0])
+        find = mm.find
+        position = find(b"\n")
+        while position != -1:
+            offsets.append(position + 1)
+            position = find(b"\n", position + 1)
+        # A trailing newline does not start another line.
+        if len(offsets) > 1 and offsets[-1] == self.size:
+            offsets.pop()
+        self.offsets = offsets
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines in the file (0 for an empty file)."""
+        return len(self.offsets) if self.size else 0
+
+    def byte_range(self, start_line: int, end_line: int) -> Tuple[int, int]:
+        """
+        Returns the [start, end) byte range of lines start_line..end_line.
+
+        Lines are 1-based and inclusive; callers clamp them to line_count.
+        """
+        start = self.offsets[start_line - 1]
+        end = self.offsets[end_line] if end_line < len(self.offsets) else self.size
+        return start, end
+
+
+class LineIndexCache:
+    """
+    Keeps the line indexes of recently read large files, validated by the
+    same (mtime_ns, size, inode) signature as the file content cache.
+    """
+
+    def __init__(self, max_entries: int = LINE_INDEX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Signature, LineIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, real_path: str, signature: Signature, mm: mmap.mmap) -> LineIndex:
+        """Returns the index for the mapped file, building it on a miss."""
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(real_path)
+                return entry[1]
+
+        index = LineIndex(mm)
+
+        with self._lock:
+            self._entries[real_path] = (signature, index)
+            self._entries.move_to_end(real_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, real_path: str) -> None:
+        """Drops the index of the given path."""
+        with self._lock:
+            self._entries.pop(real_path, None)
+
+
+line_index_cache = LineIndexCache()
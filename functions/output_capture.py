@@ -0,0 +1,157 @@
+import codecs
+import os
+import selectors
+import time
+from typing import Callable, Dict, Optional
+
+from config import OUTPUT_HEAD_BYTES, OUTPUT_MAX_BYTES_PER_STREAM, OUTPUT_TAIL_BYTES
+
+# Receives ("stdout" | "stderr", decoded text) as output arrives.
+OutputCallback = Callable[[str, str], None]
+
+
+class BoundedCapture:
+    """
+    Keeps the first `head_bytes` and the last `tail_bytes` of a stream.
+
+    Memory use is fixed no matter how much the process prints: the head is
+    filled once, and everything after it goes through a ring buffer that
+    only ever holds the most recent `tail_bytes`.
+    """
+
+    def __init__(self, head_bytes: int = OUTPUT_HEAD_BYTES, tail_bytes: int = OUTPUT_TAIL_BYTES):
+        self.head = bytearray()
+        self.head_bytes = head_bytes
+        self._ring = bytearray(tail_bytes)
+        self._ring_pos = 0
+        self._ring_len = 0
+        self.total_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """Appends a chunk of output."""
+        self.total_bytes += len(chunk)
+
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+
+        size = len(self._ring)
+        if not chunk or not size:
+            return
+        if len(chunk) >= size:
+            # Only the last `size` bytes can survive
+            self._ring[:] = chunk[-size:]
+            self._ring_pos = 0
+            self._ring_len = size
+            return
+
+        end = self._ring_pos + len(chunk)
+        if end <= size:
+            self._ring[self._ring_pos:end] = chunk
+        else:
+            split = size - self._ring_pos
+            self._ring[self._ring_pos:] = chunk[:split]
+            self._ring[:end - size] = chunk[split:]
+        self._ring_pos = end % size
+        self._ring_len = min(size, self._ring_len + len(chunk))
+
+    def _tail(self) -> bytes:
+        """Returns the ring buffer contents in stream order."""
+        if self._ring_len < len(self._ring):
+            return bytes(self._ring[:self._ring_len])
+        return bytes(self._ring[self._ring_pos:] + self._ring[:self._ring_pos])
+
+    @property
+    def kept_bytes(self) -> int:
+        """Number of bytes that will appear in `text()`."""
+        return len(self.head) + self._ring_len
+
+    @property
+    def truncated(self) -> bool:
+        """True if some of the output was dropped."""
+        return self.total_bytes > self.kept_bytes
+
+    def text(self) -> str:
+        """Decodes the kept output, marking the omitted middle if there is one."""
+        head = bytes(self.head).decode("utf-8", errors="replace")
+        tail = self._tail().decode("utf-8", errors="replace")
+        if not self.truncated:
+            return head + tail
+        omitted = self.total_bytes - self.kept_bytes
+        return f"{head}\n[...{omitted} bytes omitted...]\n{tail}"
+
+
+class CaptureResult:
+    """What `capture_streams` collected, and why it stopped."""
+
+    def __init__(self, stdout: BoundedCapture, stderr: BoundedCapture):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = False
+        # Name of the stream whose byte cap stopped the process, if any
+        self.capped_stream: Optional[str] = None
+
+
+def capture_streams(
+    stdout_fd: int,
+    stderr_fd: int,
+    deadline: float,
+    kill: Callable[[], None],
+    max_bytes: int = OUTPUT_MAX_BYTES_PER_STREAM,
+    on_output: Optional[OutputCallback] = None,
+) -> CaptureResult:
+    """
+    Reads a process's stdout and stderr pipes incrementally until both close.
+
+    Closes both file descriptors before returning.
+
+    Args:
+        stdout_fd (int): Read end of the process's stdout pipe.
+        stderr_fd (int): Read end of the process's stderr pipe.
+        deadline (float): `time.monotonic()` value at which the process is killed.
+        kill: Kills the process (and its children).
+        max_bytes (int): Per-stream byte cap; the process is killed once a
+            stream produces more than this. 0 disables the cap.
+        on_output (OutputCallback, optional): Receives output live.
+
+    Returns:
+        CaptureResult: Bounded captures of both streams.
+    """
+    result = CaptureResult(BoundedCapture(), BoundedCapture())
+    streams: Dict[int, str] = {stdout_fd: "stdout", stderr_fd: "stderr"}
+    decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in streams.values()}
+
+    selector = selectors.DefaultSelector()
+    for fd in streams:
+        selector.register(fd, selectors.EVENT_READ)
+    try:
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.timed_out = True
+                kill()
+                break
+            for key, _ in selector.select(timeout=remaining):
+                chunk = os.read(key.fd, 65536)
+                if not chunk:
+                    selector.unregister(key.fd)
+                    continue
+
+                name = streams[key.fd]
+                capture = getattr(result, name)
+                capture.feed(chunk)
+                if on_output is not None:
+                    on_output(name, decoders[name].decode(chunk))
+
+                if max_bytes and capture.total_bytes > max_bytes and result.capped_stream is None:
+                    result.capped_stream = name
+                    kill()
+            if result.capped_stream is not None:
+                break
+    finally:
+        selector.close()
+        for fd in streams:
+            os.close(fd)
+
+    return result
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import TOOL_OUTPUT_STORE_MAX_BYTES
+
+
+class OutputStore:
+    """
+    The full text of tool outputs that were shaped before entering a
+    session's history (see output_shaping.py), kept so the model can page
+    through them with `read_tool_output`.
+
+    One store belongs to one session. Outputs are numbered in the order
+    they arrive; once the stored text exceeds `max_bytes`, the oldest
+    outputs are dropped first.
+    """
+
+    def __init__(self, max_bytes: int = TOOL_OUTPUT_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._outputs: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """Stores an output and returns its id."""
+        with self._lock:
+            output_id = f"out-{self._next_id}"
+            self._next_id += 1
+            self._outputs[output_id] = text
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes and len(self._outputs) > 1:
+                _, dropped = self._outputs.popitem(last=False)
+                self._bytes -= len(dropped)
+            return output_id
+
+    def get(self, output_id: str) -> Optional[str]:
+        """Returns a stored output, or None if it is unknown or was dropped."""
+        with self._lock:
+            return self._outputs.get(output_id)
+
+    def since(self, next_id: int) -> Tuple[Dict[str, str], int]:
+        """
+        Returns the outputs stored since the store's next id was `next_id`
+        (those not dropped yet), and the store's next id now, so a session
+        checkpoint can save only the new ones.
+        """
+        with self._lock:
+            outputs = {
+                output_id: text for output_id, text in self._outputs.items() if int(output_id[4:]) >= next_id
+            }
+            return outputs, self._next_id
+
+    def restore(self, outputs: Dict[str, str], next_id: int) -> None:
+        """Puts back outputs saved with `since`, oldest first, when a session is resumed."""
+        with self._lock:
+            for output_id, text in outputs.items():
+                self._outputs[output_id] = text
+                self._bytes += len(text)
+            while self._bytes > self.max_bytes and len(self._outputs) > 1:
+                _, dropped = self._outputs.popitem(last=False)
+                self._bytes -= len(dropped)
+            self._next_id = max(self._next_id, next_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._outputs)
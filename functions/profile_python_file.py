@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+from config import (
+    PROFILE_DEFAULT_ROWS,
+    PROFILE_MAX_ROWS,
+    PROFILE_STOP_MARGIN_SECONDS,
+    PYTHON_EXEC_MODE,
+    RUN_TIMEOUT_SECONDS,
+)
+from functions.run_python_file import DEFAULT_RESOURCE_LIMITS, check_script_path, execute_script
+
+# Runs the script under the profilers; see that file for its options
+_RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_runner.py")
+
+
+def profile_python_file(
+    working_directory: str,
+    file_path: str,
+    args: Optional[List[str]] = None,
+    sort: str = "own",
+    top: int = PROFILE_DEFAULT_ROWS,
+    memory: bool = False,
+    *,
+    exec_mode: str = PYTHON_EXEC_MODE,
+    limits: Optional[Dict[str, Optional[int]]] = None,
+) -> str:
+    """
+    Runs a Python script under a profiler and returns where its time goes,
+    as the top functions with call counts, own time and cumulative time.
+    Use it to find out why code is slow before changing it, and again
+    afterwards to measure the improvement. A script that runs too long is
+    stopped and the profile of what it did so far is returned.
+
+    Security:
+        - Same sandbox as run_python_file: the script must be inside
+          'working_directory' and runs with the same timeout and resource
+          limits.
+
+    Performance:
+        - Profiling makes the script itself slower (tracemalloc much more
+          so), so compare timings only between profiled runs.
+
+    Args:
+        working_directory (str): The root directory where execution is allowed.
+        file_path (str): The relative path to the .py file.
+        args (List[str], optional): A list of command-line arguments for the script.
+        sort (str): "own" to rank functions by the time spent in their own
+            code (hotspots), or "cumulative" to include the functions they call.
+        top (int): Number of rows per table (at most 50).
+        memory (bool): Also trace memory allocations and list the source
+            lines holding the most memory at exit, with the peak.
+        exec_mode (str): "subprocess" or "forkserver" (set by the host, not the model).
+        limits (dict, optional): Resource limits overriding
+            DEFAULT_RESOURCE_LIMITS (set by the host).
+
+    Returns:
+        str: The profile tables followed by the script's output, or an error message.
+    """
+    if args is None:
+        args = []
+    if sort not in ("own", "cumulative"):
+        return 'Error: sort must be "own" or "cumulative".'
+    # JSON numbers may arrive as floats; 8.0 is fine, 8.5 or "8" are not
+    if isinstance(top, bool) or not (isinstance(top, int) or isinstance(top, float) and top.is_integer()):
+        return "Error: top must be a whole number."
+
+    error = check_script_path(working_directory, file_path)
+    if error:
+        return error
+
+    # A fresh directory only this user can enter (mode 0700), so no one else
+    # can read the report or put a file or symlink at its path
+    report_dir = tempfile.mkdtemp(prefix="ai-agent-profile-")
+    report_path = os.path.join(report_dir, "report.txt")
+    try:
+        options = {
+            "report": report_path,
+            "top": max(1, min(int(top), PROFILE_MAX_ROWS)),
+            "sort": sort,
+            "memory": bool(memory),
+            "stop_after": max(1, RUN_TIMEOUT_SECONDS - PROFILE_STOP_MARGIN_SECONDS),
+        }
+        output, _ = execute_script(
+            working_directory,
+            file_path,
+            args,
+            exec_mode,
+            None,
+            {**DEFAULT_RESOURCE_LIMITS, **(limits or {})},
+            runner=[_RUNNER, json.dumps(options)],
+        )
+        try:
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = f.read()
+        except FileNotFoundError:
+            report = ""
+    except OSError as e:
+        return f"Error profiling Python file: {e}"
+    finally:
+        shutil.rmtree(report_dir, ignore_errors=True)
+
+    if not report:
+        # Killed before the profiler could write anything
+        return f"[No profile: the script did not finish profiling]\n{output}"
+    return f"{report}\n\nOUTPUT:\n{output}"
@@ -0,0 +1,175 @@
+"""
+Runs a script under cProfile (and optionally tracemalloc) and writes a
+compact report of its hotspots. Started by `profile_python_file` in place
+of the script itself, either as a new interpreter or through the fork
+server:
+
+    python functions/profile_runner.py <options JSON> <script> <args...>
+
+Options: {"report": path to write the report to, "top": rows per table,
+"sort": "own" | "cumulative", "memory": bool, "stop_after": seconds}.
+
+Like functions/forkserver.py, it must only depend on the standard library:
+everything it imports is visible to the script it runs.
+"""
+
+import builtins
+import cProfile
+import json
+import linecache
+import os
+import pstats
+import signal
+import sys
+import traceback
+import tracemalloc
+import types
+from typing import Any, Dict, List, Tuple
+
+# Key of a function in `pstats.Stats.stats`: (file, line, name)
+FunctionKey = Tuple[str, int, str]
+
+# The runner's own calls around the script
+_RUNNER_FUNCTIONS = {
+    ("~", 0, "<built-in method builtins.exec>"),
+    ("~", 0, "<method 'disable' of '_lsprof.Profiler' objects>"),
+}
+
+
+class _StopProfiling(BaseException):
+    """Raised in the script when the profiling time is up."""
+
+
+def _location(file_name: str, line: int, cwd: str) -> str:
+    """Shortens a code location: relative inside the workspace, else the file name."""
+    if file_name.startswith(cwd + os.sep):
+        return f"{os.path.relpath(file_name, cwd)}:{line}"
+    if file_name.startswith("<"):
+        # Frozen modules, e.g. <frozen importlib._bootstrap>
+        return f"{file_name}:{line}"
+    return f".../{os.path.basename(file_name)}:{line}"
+
+
+def _label(key: FunctionKey, cwd: str) -> str:
+    file_name, line, name = key
+    if file_name == "~":
+        # Built-in functions have no location
+        return name
+    return f"{_location(file_name, line, cwd)}({name})"
+
+
+def format_profile(stats: pstats.Stats, top: int, sort: str, cwd: str) -> str:
+    """Formats the `top` functions by own or cumulative time as a table."""
+    rows: List[Tuple[FunctionKey, Any]] = [
+        (key, value)
+        for key, value in stats.stats.items()
+        if key not in _RUNNER_FUNCTIONS and key[0] != __file__
+    ]
+    column = 3 if sort == "cumulative" else 2
+    rows.sort(key=lambda row: row[1][column], reverse=True)
+
+    total_calls = sum(value[1] for _, value in rows)
+    lines = [
+        f"PROFILE (top {min(top, len(rows))} of {len(rows)} functions by {sort} time; "
+        f"{stats.total_tt:.3f}s total, {total_calls} calls):",
+        f"{'calls':>12} {'own s':>8} {'cumul s':>8}  function",
+    ]
+    for key, (primitive_calls, calls, own, cumulative, _) in rows[:top]:
+        # "total/primitive" for recursive functions, as pstats does
+        count = str(calls) if calls == primitive_calls else f"{calls}/{primitive_calls}"
+        lines.append(f"{count:>12} {own:>8.3f} {cumulative:>8.3f}  {_label(key, cwd)}")
+    return "\n".join(lines)
+
+
+def format_allocations(snapshot: tracemalloc.Snapshot, peak: int, top: int, cwd: str) -> str:
+    """Formats the `top` source lines by memory still allocated at the end."""
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ]
+    )
+    statistics = snapshot.statistics("lineno")
+    lines = [
+        f"MEMORY (top {min(top, len(statistics))} allocation sites still held at exit; "
+        f"peak {peak / 1024 / 1024:.1f} MB traced):",
+        f"{'KB':>10} {'blocks':>8}  location",
+    ]
+    for statistic in statistics[:top]:
+        frame = statistic.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        if len(source) > 60:
+            source = source[:57] + "..."
+        location = _location(frame.filename, frame.lineno, cwd)
+        lines.append(f"{statistic.size / 1024:>10.1f} {statistic.count:>8}  {location}  {source}")
+    return "\n".join(lines)
+
+
+def main(options: Dict[str, Any], script_path: str, argv: List[str]) -> int:
+    """Runs the script like `python <script> <args...>` and writes the report."""
+    cwd = os.getcwd()
+    script = os.path.abspath(script_path)
+    sys.argv = [script_path] + argv
+    sys.path[0] = os.path.dirname(script)
+
+    # A fresh __main__ module, like the interpreter creates for a script
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = script
+    main_module.__builtins__ = builtins
+    sys.modules["__main__"] = main_module
+
+    def stop(signum, frame):
+        raise _StopProfiling()
+
+    # Stop a little before the host's timeout, so a slow run still gets a report
+    signal.signal(signal.SIGALRM, stop)
+    signal.signal(signal.SIGXCPU, stop)
+    signal.setitimer(signal.ITIMER_REAL, options["stop_after"])
+
+    with open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+    if options["memory"]:
+        tracemalloc.start()
+
+    profiler = cProfile.Profile()
+    exit_code = 0
+    stopped = False
+    profiler.enable()
+    try:
+        exec(code, main_module.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except _StopProfiling:
+        stopped = True
+    except BaseException as e:
+        # Skip this frame so the traceback starts in the script itself
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+    finally:
+        profiler.disable()
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    if options["memory"]:
+        # Before building the report, whose own allocations would show up
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    sections = []
+    if stopped:
+        sections.append("[Profiling stopped before the script finished; the tables cover the run so far]")
+    sections.append(format_profile(pstats.Stats(profiler), options["top"], options["sort"], cwd))
+    if options["memory"]:
+        sections.append(format_allocations(snapshot, peak, options["top"], cwd))
+    with open(options["report"], "w", encoding="utf-8") as f:
+        f.write("\n\n".join(sections))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main(json.loads(sys.argv[1]), sys.argv[2], sys.argv[3:]))
@@ -0,0 +1,103 @@
+import difflib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from config import DELTA_READ_MAX_DIFF_RATIO, READ_LEDGER_MAX_BYTES
+
+# How a re-read that is answered without the full content begins, so the
+# history compaction can tell these results from full file contents.
+UNCHANGED_PREFIX = "[Unchanged: "
+CHANGES_PREFIX = "[Changes to "
+DELTA_PREFIXES = (UNCHANGED_PREFIX, CHANGES_PREFIX)
+
+
+def ledger_key(file_path: str) -> str:
+    """Normalizes a model-supplied relative path so equal paths share an entry."""
+    return os.path.normpath(file_path or ".")
+
+
+class ReadLedger:
+    """
+    The version of each file the model last received in full, per session.
+
+    `get_file_content` answers a re-read of a file recorded here with
+    "unchanged" or a unified diff instead of the whole content, and
+    `write_file` records what the model wrote itself. Entries must be
+    forgotten whenever the history loses the content they stand for (see
+    `HistoryManager`), or the model would be sent a diff against text it no
+    longer has. Least recently used entries are dropped beyond `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = READ_LEDGER_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._versions: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> Optional[str]:
+        """Returns the content last delivered for a file, if any."""
+        with self._lock:
+            key = ledger_key(file_path)
+            content = self._versions.get(key)
+            if content is not None:
+                self._versions.move_to_end(key)
+            return content
+
+    def record(self, file_path: str, content: str) -> None:
+        """Notes that the model now has `content` as the file's full text."""
+        with self._lock:
+            key = ledger_key(file_path)
+            previous = self._versions.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._versions[key] = content
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes and len(self._versions) > 1:
+                _, dropped = self._versions.popitem(last=False)
+                self._bytes -= len(dropped)
+
+    def forget(self, file_path: str) -> None:
+        """Drops a file's entry, so its next read is delivered in full."""
+        with self._lock:
+            previous = self._versions.pop(ledger_key(file_path), None)
+            if previous is not None:
+                self._bytes -= len(previous)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._versions)
+
+
+def delta_since(file_path: str, delivered: str, content: str) -> Optional[str]:
+    """
+    Describes how `content` differs from the `delivered` version.
+
+    Returns:
+        str: An "unchanged" notice, or a unified diff, or None if the diff
+        would not be much smaller than the content itself.
+    """
+    line_count = content.count("\n") + (0 if content.endswith("\n") or not content else 1)
+    if content == delivered:
+        return (
+            f'{UNCHANGED_PREFIX}"{file_path}" ({line_count} lines) is exactly as you last saw it. '
+            "Call get_file_content with full=true if you need the text again.]"
+        )
+
+    diff = "\n".join(
+        difflib.unified_diff(
+            delivered.splitlines(),
+            content.splitlines(),
+            fromfile=f"a/{file_path}",
+            tofile=f"b/{file_path}",
+            n=2,
+            lineterm="",
+        )
+    )
+    if not diff:
+        # Only the final newline changed
+        return None
+    if len(diff) > len(content) * DELTA_READ_MAX_DIFF_RATIO:
+        return None
+    return f'{CHANGES_PREFIX}"{file_path}" ({line_count} lines) since you last saw it]\n{diff}'
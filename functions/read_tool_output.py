@@ -0,0 +1,63 @@
+from typing import Optional
+
+from config import MAX_CHARS
+from functions.output_store import OutputStore
+
+
+def read_tool_output(
+    working_directory: str,
+    output_id: str,
+    start_line: int = 1,
+    end_line: Optional[int] = None,
+    *,
+    store: Optional[OutputStore] = None,
+) -> str:
+    """
+    Reads lines of the full, unshortened output of an earlier tool call.
+    Long tool results are shortened before you see them and say which
+    output_id holds the original.
+
+    Security:
+        - Only serves outputs recorded in the calling session's own store
+          (injected by the host); the working directory is not touched.
+
+    Args:
+        working_directory (str): Unused; every tool receives it.
+        output_id (str): The id named in the shortened result, e.g. "out-3".
+        start_line (int): First line to read (1-based, inclusive).
+        end_line (int, optional): Last line to read (1-based, inclusive).
+            Defaults to as many lines as fit in one result.
+        store (OutputStore): The session's output store (host-supplied).
+
+    Returns:
+        str: The requested lines with a header, or an error message starting with 'Error:'.
+    """
+    if store is None:
+        return "Error: No stored tool outputs in this session."
+    text = store.get(output_id)
+    if text is None:
+        return f'Error: Unknown output_id "{output_id}" (stored outputs are dropped when the session restarts or grows too large).'
+    if start_line < 1 or end_line is not None and end_line < start_line:
+        return "Error: start_line must be at least 1 and not after end_line."
+
+    lines = text.split("\n")
+    if start_line > len(lines):
+        return f'Error: Output "{output_id}" has only {len(lines)} lines.'
+    end = min(len(lines), end_line or len(lines))
+
+    # Return whole lines up to MAX_CHARS, and say where to continue
+    selected = []
+    size = 0
+    for number in range(start_line, end + 1):
+        line = lines[number - 1]
+        if selected and size + len(line) + 1 > MAX_CHARS:
+            end = number - 1
+            break
+        selected.append(line[:MAX_CHARS])
+        size += len(line) + 1
+
+    header = f'[Lines {start_line}-{end} of {len(lines)} in output "{output_id}"]\n'
+    footer = ""
+    if end < len(lines):
+        footer = f"\n[...Continue with start_line={end + 1}...]"
+    return header + "\n".join(selected) + footer
@@ -0,0 +1,198 @@
+"""
+The tool registry: which functions the model may call, and their schemas.
+
+Schemas are derived from each tool's signature and Google-style docstring
+instead of being written by hand next to it:
+
+    - The description is the docstring text before its first section
+      (Security:, Args:, ...; see _SECTIONS).
+    - Every parameter except `working_directory` (always injected by the
+      host) and keyword-only parameters (host-side options such as
+      `exec_mode`) becomes a property, typed from its annotation and
+      described by its "Args:" entry. Parameters without a default are
+      required.
+    - A `TypedDict` item type (e.g. `EditBlock`) becomes a nested object.
+
+The schema is also what the model is held to: `model_arguments` drops
+every argument of a call that its tool does not declare, so the model can
+never set a host-side option (`limits`, `exec_mode`, `store`, ...).
+
+Declarations are derived once and cached. The Gemini SDK is only imported
+when `available_functions()` is first called, so importing the tools (for
+instance from the test scripts) does not pay for it.
+"""
+
+import inspect
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints, is_typeddict
+
+from functions.bulk_files import read_files, write_files
+from functions.edit_file import edit_file
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.get_symbols import get_symbol_source, get_symbols
+from functions.profile_python_file import profile_python_file
+from functions.read_tool_output import read_tool_output
+from functions.run_python_file import run_python_file
+from functions.search_code import search_code
+from functions.write_file import write_file
+
+# The tools offered to the model, in the order they are declared
+TOOLS: List[Callable[..., str]] = [
+    get_files_info,
+    get_file_content,
+    read_files,
+    run_python_file,
+    profile_python_file,
+    write_file,
+    write_files,
+    edit_file,
+    search_code,
+    get_symbols,
+    get_symbol_source,
+    read_tool_output,
+]
+
+# Map string names to actual Python functions
+function_map: Dict[str, Callable[..., str]] = {tool.__name__: tool for tool in TOOLS}
+
+# Parameters supplied by the host rather than the model
+_HOST_PARAMETERS = {"working_directory"}
+
+_SECTION_HEADER = re.compile(r"^([A-Z][A-Za-z ]*):$")
+
+# Docstring sections; any other line ending in a colon is ordinary text
+_SECTIONS = {
+    "Args",
+    "Attributes",
+    "Example",
+    "Examples",
+    "Note",
+    "Notes",
+    "Performance",
+    "Raises",
+    "Returns",
+    "Security",
+    "Yields",
+}
+_ARG_LINE = re.compile(r"^(\w+)\s*(?:\([^)]*\))?:\s*(.*)$")
+
+_JSON_TYPES = {str: "STRING", int: "INTEGER", float: "NUMBER", bool: "BOOLEAN"}
+
+
+def parse_docstring(docstring: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Splits a Google-style docstring into its summary and its argument
+    descriptions (from an "Args:" or "Attributes:" section).
+    """
+    lines = inspect.cleandoc(docstring or "").splitlines()
+    summary: List[str] = []
+    arguments: Dict[str, str] = {}
+    section = None
+    current = None
+    for line in lines:
+        stripped = line.strip()
+        header = _SECTION_HEADER.match(stripped) if not line.startswith(" ") else None
+        if header and header.group(1) in _SECTIONS:
+            section = header.group(1)
+            current = None
+            continue
+        if section is None:
+            summary.append(stripped)
+        elif section in ("Args", "Attributes") and stripped:
+            match = _ARG_LINE.match(stripped) if line.startswith("    ") and not line.startswith("     ") else None
+            if match:
+                current = match.group(1)
+                arguments[current] = match.group(2)
+            elif current:
+                arguments[current] += " " + stripped
+
+    # Paragraphs are kept; line breaks inside a paragraph are not
+    paragraphs = " ".join(line or "\n\n" for line in summary).split("\n\n")
+    text = "\n\n".join(" ".join(paragraph.split()) for paragraph in paragraphs if paragraph.strip())
+    return text, arguments
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    """Turns Optional[X] into X."""
+    if get_origin(annotation) is Union:
+        members = [member for member in get_args(annotation) if member is not type(None)]
+        if len(members) == 1:
+            return members[0]
+    return annotation
+
+
+def type_schema(annotation: Any) -> Dict[str, Any]:
+    """Translates a type annotation into a Gemini schema dict."""
+    annotation = _unwrap_optional(annotation)
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation]}
+    if get_origin(annotation) in (list, List):
+        (item,) = get_args(annotation) or (str,)
+        return {"type": "ARRAY", "items": type_schema(item)}
+    if is_typeddict(annotation):
+        _, descriptions = parse_docstring(annotation.__doc__)
+        properties = {}
+        for name, field_type in get_type_hints(annotation).items():
+            properties[name] = type_schema(field_type)
+            if descriptions.get(name):
+                properties[name]["description"] = descriptions[name]
+        return {"type": "OBJECT", "properties": properties, "required": sorted(annotation.__required_keys__)}
+    if get_origin(annotation) in (dict, Dict):
+        return {"type": "OBJECT"}
+    raise TypeError(f"No schema type for annotation {annotation!r}")
+
+
+def function_declaration(function: Callable[..., Any]) -> Dict[str, Any]:
+    """Derives the declaration of one tool from its signature and docstring."""
+    summary, descriptions = parse_docstring(function.__doc__)
+    hints = get_type_hints(function)
+    properties: Dict[str, Any] = {}
+    required = []
+    for name, parameter in inspect.signature(function).parameters.items():
+        if name in _HOST_PARAMETERS or parameter.kind is not inspect.Parameter.POSITIONAL_OR_KEYWORD:
+            continue
+        schema = type_schema(hints.get(name, str))
+        description = descriptions.get(name, "")
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+        elif parameter.default is not None and "Defaults to" not in description:
+            description = f"{description} Defaults to {json.dumps(parameter.default)}.".strip()
+        if description:
+            schema["description"] = description
+        properties[name] = schema
+
+    parameters: Dict[str, Any] = {"type": "OBJECT", "properties": properties}
+    if required:
+        parameters["required"] = required
+    return {"name": function.__name__, "description": summary, "parameters": parameters}
+
+
+@lru_cache(maxsize=None)
+def tool_declarations() -> Tuple[Dict[str, Any], ...]:
+    """Returns the declarations of all tools, derived once."""
+    return tuple(function_declaration(tool) for tool in TOOLS)
+
+
+@lru_cache(maxsize=None)
+def declared_parameters(function_name: str) -> FrozenSet[str]:
+    """Returns the names of the arguments the model may pass to a tool."""
+    return frozenset(function_declaration(function_map[function_name])["parameters"]["properties"])
+
+
+def model_arguments(function_name: str, args: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Returns the arguments of a model's call to a tool that its schema declares."""
+    declared = declared_parameters(function_name)
+    return {key: value for key, value in (args or {}).items() if key in declared}
+
+
+@lru_cache(maxsize=None)
+def available_functions():
+    """Returns all tool declarations as a `types.Tool` for the model config."""
+    from google.genai import types
+
+    return types.Tool(
+        function_declarations=[types.FunctionDeclaration.model_validate(declaration) for declaration in tool_declarations()]
+    )
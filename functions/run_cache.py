@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import RUN_CACHE_DIR
+from functions.file_cache import Signature, file_signature
+from functions.workspace import walk_workspace
+
+
+class WorkspaceFingerprint:
+    """
+    Content fingerprint of a working directory, maintained incrementally.
+
+    Each file's SHA-256 is remembered together with its (mtime_ns, size,
+    inode) signature, so recomputing the fingerprint only re-hashes files
+    that changed since the last time; everything else costs one stat
+    (served from the directory scan). `write_file` reports the content it
+    wrote through `note_write`, which avoids even that re-hash.
+    Ignored paths (see functions/workspace.py) are not part of the fingerprint.
+    """
+
+    def __init__(self, working_directory: str):
+        self.abs_root = os.path.abspath(working_directory)
+        self._files: Dict[str, Tuple[Signature, str]] = {}
+        self._lock = threading.Lock()
+
+    def note_write(self, rel_path: str, content: bytes) -> None:
+        """Records the hash of content just written to `rel_path`."""
+        abs_path = os.path.join(self.abs_root, rel_path)
+        try:
+            signature = file_signature(os.stat(abs_path))
+        except OSError:
+            return
+        with self._lock:
+            self._files[rel_path] = (signature, hashlib.sha256(content).hexdigest())
+
+    def compute(self) -> str:
+        """Returns a hex digest covering every file path and its content."""
+        files: Dict[str, Tuple[Signature, str]] = {}
+        digest = hashlib.sha256()
+        for rel_path, entry, _ in walk_workspace(self.abs_root):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                signature = file_signature(entry.stat(follow_symlinks=False))
+            except OSError:
+                continue
+            with self._lock:
+                known = self._files.get(rel_path)
+            if known is not None and known[0] == signature:
+                content_hash = known[1]
+            else:
+                content_hash = _hash_file(entry.path)
+                if content_hash is None:
+                    continue
+            files[rel_path] = (signature, content_hash)
+            digest.update(f"{rel_path}\0{content_hash}\n".encode("utf-8"))
+
+        with self._lock:
+            # Deleted files drop out of the map here
+            self._files = files
+        return digest.hexdigest()
+
+
+def _hash_file(path: str) -> Optional[str]:
+    """Returns the SHA-256 of a file's content, or None if it is unreadable."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+_fingerprints: Dict[str, WorkspaceFingerprint] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def workspace_fingerprint(working_directory: str) -> WorkspaceFingerprint:
+    """Returns the shared fingerprint tracker for a working directory."""
+    abs_root = os.path.abspath(working_directory)
+    with _fingerprints_lock:
+        tracker = _fingerprints.get(abs_root)
+        if tracker is None:
+            tracker = _fingerprints[abs_root] = WorkspaceFingerprint(abs_root)
+        return tracker
+
+
+class RunCache:
+    """
+    On-disk cache of `run_python_file` results.
+
+    Keyed on the script path, its arguments and the workspace fingerprint,
+    so a hit means the exact same run over the exact same files. One JSON
+    file per key, written atomically, so concurrent sessions and processes
+    can share the directory.
+    """
+
+    def __init__(self, directory: str = RUN_CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def key(working_directory: str, file_path: str, args: List[str], fingerprint: str) -> str:
+        """Builds the cache key for one run."""
+        payload = json.dumps(
+            [os.path.abspath(working_directory), os.path.normpath(file_path), args, fingerprint]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached output for `key`, if there is one."""
+        try:
+            with open(os.path.join(self.directory, f"{key}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)["output"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, output: str) -> None:
+        """Stores the output of a run."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"output": output}, f)
+            os.replace(temp_path, os.path.join(self.directory, f"{key}.json"))
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+
+run_cache = RunCache()
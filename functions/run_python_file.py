@@ -1,28 +1,124 @@
 import os
+import resource
+import shutil
+import signal
 import subprocess
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional, Sequence
 
-def run_python_file(working_directory: str, file_path: str, args: Optional[List[str]] = None) -> str:
+from config import (
+    FORKSERVER_PRELOAD_MODULES,
+    OUTPUT_MAX_BYTES_PER_STREAM,
+    PYTHON_EXEC_MODE,
+    RUN_CACHE_ENABLED,
+    RUN_MAX_CPU_SECONDS,
+    RUN_MAX_MEMORY_BYTES,
+    RUN_MAX_OPEN_FILES,
+    RUN_MAX_PROCESSES,
+    RUN_TIMEOUT_SECONDS,
+)
+from functions.forkserver import ForkServerClient, apply_resource_limits, resource_limit_values, usage_from_rusage
+from functions.output_capture import OutputCallback, capture_streams
+from functions.run_cache import RunCache, run_cache, workspace_fingerprint
+
+# Started lazily on the first run in "forkserver" mode
+_forkserver = ForkServerClient(FORKSERVER_PRELOAD_MODULES)
+
+# Per-run limits, by the names of functions/forkserver.py's RESOURCE_LIMITS
+DEFAULT_RESOURCE_LIMITS = {
+    "cpu_seconds": RUN_MAX_CPU_SECONDS,
+    "memory_bytes": RUN_MAX_MEMORY_BYTES,
+    "open_files": RUN_MAX_OPEN_FILES,
+    "processes": RUN_MAX_PROCESSES,
+}
+
+# How the measurements line of a run begins; it differs between otherwise
+# identical runs, so comparisons of results can leave it out.
+RUN_STATS_PREFIX = "[Run stats: "
+
+
+def strip_run_stats(text: str) -> str:
+    """Removes the measurements lines from a result."""
+    return "\n".join(line for line in text.split("\n") if not line.startswith(RUN_STATS_PREFIX))
+
+
+def run_python_file(
+    working_directory: str,
+    file_path: str,
+    args: Optional[List[str]] = None,
+    *,
+    exec_mode: str = PYTHON_EXEC_MODE,
+    on_output: Optional[OutputCallback] = None,
+    use_cache: bool = RUN_CACHE_ENABLED,
+    limits: Optional[Dict[str, Optional[int]]] = None,
+) -> str:
     """
-    Executes a Python script located within the working directory.
+    Executes a Python script located within the working directory and
+    returns its output.
 
     Security:
         - Restricts execution to files inside 'working_directory'.
         - Enforces a 30-second timeout to prevent infinite loops.
+        - Caps CPU time, address space, open files and processes with
+          setrlimit in the child, so a runaway script cannot starve other
+          sessions on the host.
         - Captures stdout and stderr to return feedback to the Agent.
+        - Output is read incrementally into a fixed-size head + tail buffer;
+          a script that floods a stream past its byte cap is killed early.
+
+    Performance:
+        - In "forkserver" mode the script runs in a child forked from a warm
+          interpreter with common stdlib modules already imported, instead of
+          a freshly started `python` process. Output format, argv, cwd and
+          timeout behave the same in both modes.
+        - With `use_cache`, a run whose script, args and workspace content
+          match an earlier run returns the stored output without executing.
+          Only runs that completed and left the workspace unchanged are stored.
 
     Args:
         working_directory (str): The root directory where execution is allowed.
         file_path (str): The relative path to the .py file.
         args (List[str], optional): A list of command-line arguments for the script.
+        exec_mode (str): "subprocess" or "forkserver" (set by the host, not the model).
+        on_output (OutputCallback, optional): Receives output live, e.g. to
+            stream it to the terminal in verbose mode (set by the host).
+        use_cache (bool): Whether to memoize results (set by the host).
+        limits (dict, optional): Resource limits overriding
+            DEFAULT_RESOURCE_LIMITS (set by the host).
 
     Returns:
-        str: The combined output (STDOUT + STDERR) or an error message.
+        str: The combined output (STDOUT + STDERR) followed by the run's wall
+        time, CPU time and peak RSS, or an error message.
     """
     # Fix mutable default argument anti-pattern
     if args is None:
         args = []
 
+    error = check_script_path(working_directory, file_path)
+    if error:
+        return error
+
+    limits = {**DEFAULT_RESOURCE_LIMITS, **(limits or {})}
+    if not use_cache:
+        return execute_script(working_directory, file_path, args, exec_mode, on_output, limits)[0]
+
+    tracker = workspace_fingerprint(working_directory)
+    fingerprint = tracker.compute()
+    key = RunCache.key(working_directory, file_path, args, fingerprint)
+    cached = run_cache.get(key)
+    if cached is not None:
+        return f"{cached}\n[Cached result: same script, args and workspace as an earlier run; not re-executed]"
+
+    output, completed = execute_script(working_directory, file_path, args, exec_mode, on_output, limits)
+    # A run that changed the workspace has side effects a replay would skip.
+    # The measurements are left out: they describe this run, not a replay.
+    if completed and tracker.compute() == fingerprint:
+        run_cache.put(key, strip_run_stats(output))
+    return output
+
+
+def check_script_path(working_directory: str, file_path: str) -> Optional[str]:
+    """Returns an error message if `file_path` is not a script that may be run, else None."""
     # Resolve absolute paths for security checks
     abs_working_dir = os.path.abspath(working_directory)
     abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
@@ -38,38 +134,214 @@ def run_python_file(working_directory: str, file_path: str, args: Optional[List[
     # Security Check 3: Ensure it is a Python file
     if not abs_file_path.endswith(".py"):
         return f'Error: "{file_path}" is not a Python file.'
+    return None
 
-    try:
-        # Run the script using the system's 'python' interpreter.
-        # cwd=working_directory ensures relative paths inside the script work correctly.
-        result = subprocess.run(
-            ["python", file_path] + args,
-            cwd=working_directory,
-            capture_output=True,
-            text=True,
-            timeout=30  # Safety mechanism: Kill process if it takes too long
-        )
 
-        stdout = result.stdout.strip()
-        stderr = result.stderr.strip()
+def execute_script(
+    working_directory: str,
+    file_path: str,
+    args: List[str],
+    exec_mode: str,
+    on_output: Optional[OutputCallback],
+    limits: Dict[str, Optional[int]],
+    runner: Sequence[str] = (),
+):
+    """
+    Executes the script and formats its output.
 
-        output_parts = []
+    Args:
+        runner (Sequence[str]): A Python file and leading arguments to run
+            instead, with the script path and its args appended (e.g. the
+            profiler in functions/profile_runner.py).
 
-        if stdout:
-            output_parts.append(f"STDOUT:\n{stdout}")
-        if stderr:
-            output_parts.append(f"STDERR:\n{stderr}")
-        
-        # If the script crashed (non-zero exit code), report it
-        if result.returncode != 0:
-            output_parts.append(f"Process exited with code {result.returncode}")
+    Returns:
+        tuple: (result, completed), where `completed` is False for timeouts,
+        runs killed for flooding their output or for exceeding a resource
+        limit, and execution errors.
+    """
+    started = time.monotonic()
+    deadline = started + RUN_TIMEOUT_SECONDS
+    process = None
+    try:
+        command = list(runner) + [file_path] + args
+        if exec_mode == "forkserver":
+            process = _forkserver.spawn(command[0], command[1:], cwd=working_directory, limits=limits)
+        else:
+            # Run the script using the system's 'python' interpreter.
+            # cwd=working_directory ensures relative paths inside the script work correctly.
+            process = _SubprocessRun(["python"] + command, cwd=working_directory, limits=limits)
 
-        if not output_parts:
-            return "No output produced."
+        # Read output as it is produced, keeping only a bounded head and tail
+        capture = capture_streams(
+            process.stdout_fd,
+            process.stderr_fd,
+            deadline,  # Safety mechanism: Kill process if it takes too long
+            kill=process.kill,
+            on_output=on_output,
+        )
+        if capture.timed_out:
+            process.wait(5)
+            raise subprocess.TimeoutExpired(file_path, RUN_TIMEOUT_SECONDS)
+        returncode = process.wait(max(0.0, deadline - time.monotonic()))
+        wall_seconds = time.monotonic() - started
 
-        return "\n".join(output_parts)
+        output = format_run_output(capture.stdout.text(), capture.stderr.text(), returncode)
+        notes = [
+            f"[{name}: {stream.total_bytes} bytes produced, {stream.kept_bytes} kept]"
+            for name, stream in (("stdout", capture.stdout), ("stderr", capture.stderr))
+            if stream.truncated
+        ]
+        if capture.capped_stream:
+            notes.append(
+                f"[Process killed early: {capture.capped_stream} exceeded "
+                f"{OUTPUT_MAX_BYTES_PER_STREAM} bytes]"
+            )
+        cpu_limited = _hit_cpu_limit(returncode, process.usage, limits.get("cpu_seconds"))
+        if cpu_limited:
+            notes.append(f"[Process killed: CPU time limit of {limits['cpu_seconds']} seconds reached]")
+        notes.append(format_run_stats(wall_seconds, process.usage))
+        return "\n".join([output] + notes), capture.capped_stream is None and not cpu_limited
 
     except subprocess.TimeoutExpired:
-        return f"Error: The script '{file_path}' timed out after 30 seconds."
+        if process is not None:
+            process.kill()
+        return f"Error: The script '{file_path}' timed out after {RUN_TIMEOUT_SECONDS} seconds.", False
     except Exception as e:
-        return f"Error executing Python file: {e}"
\ No newline at end of file
+        return f"Error executing Python file: {e}", False
+
+
+# A preexec_fn makes Popen start the interpreter with fork, copying the
+# agent's memory, which takes several milliseconds for a large agent
+# process. Where util-linux's prlimit(1) is installed, the script is started
+# through it instead: it sets the limits on itself and execs the interpreter,
+# so Popen can use vfork and the limits are in place before the script runs.
+_PRLIMIT = shutil.which("prlimit")
+
+# prlimit(1) options for the resources of RESOURCE_LIMITS
+_PRLIMIT_OPTIONS = {
+    resource.RLIMIT_CPU: "--cpu",
+    resource.RLIMIT_AS: "--as",
+    resource.RLIMIT_NOFILE: "--nofile",
+    resource.RLIMIT_NPROC: "--nproc",
+}
+
+
+def _limits_wrapper(limits: Dict[str, Optional[int]]) -> List[str]:
+    """Returns the prlimit(1) command line that runs a command under `limits`."""
+    values = resource_limit_values(limits)
+    if _PRLIMIT is None or not values:
+        return []
+    return [_PRLIMIT] + [f"{_PRLIMIT_OPTIONS[which]}={soft}:{hard}" for which, (soft, hard) in values.items()] + ["--"]
+
+
+class _SubprocessRun:
+    """
+    A script started as a new interpreter, exposing the same interface as
+    the fork server's `ForkedProcess`.
+    """
+
+    def __init__(self, command: List[str], cwd: str, limits: Dict[str, Optional[int]]):
+        # The kernel counts the agent's own peak RSS (the memory the child
+        # started out sharing) towards the child's peak
+        self._inherited_rss_kb = usage_from_rusage(resource.getrusage(resource.RUSAGE_SELF))["max_rss_kb"]
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        wrapper = _limits_wrapper(limits)
+        try:
+            # A new session makes the script a process group leader, so a
+            # timeout can kill the script together with its children
+            self._popen = subprocess.Popen(
+                wrapper + command,
+                cwd=cwd,
+                stdout=stdout_w,
+                stderr=stderr_w,
+                start_new_session=True,
+                # Only getrlimit/setrlimit calls (no imports, no locks), so
+                # it is safe although tools run in threads
+                preexec_fn=None if wrapper else lambda: apply_resource_limits(limits),
+            )
+        except Exception:
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise
+        finally:
+            os.close(stdout_w)
+            os.close(stderr_w)
+        self.pid = self._popen.pid
+        self.stdout_fd = stdout_r
+        self.stderr_fd = stderr_r
+        self.usage: Optional[Dict[str, float]] = None
+
+    def kill(self) -> None:
+        """Kills the script's process group, ignoring processes that are gone."""
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def wait(self, timeout: float) -> int:
+        """
+        Waits for the script to exit and returns its exit code. The script
+        is reaped with `wait4`, which also reports its resource usage.
+
+        Raises:
+            subprocess.TimeoutExpired: If the script has not exited in time.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            pid, status, rusage = os.wait4(self.pid, os.WNOHANG)
+            if pid:
+                # Tell Popen the process is reaped, so it never waits for it again
+                self._popen.returncode = os.waitstatus_to_exitcode(status)
+                self.usage = usage_from_rusage(rusage)
+                # At or below the inherited value, only an upper bound is known
+                self.usage["max_rss_is_bound"] = self.usage["max_rss_kb"] <= self._inherited_rss_kb
+                return self._popen.returncode
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self._popen.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+
+def _hit_cpu_limit(returncode: int, usage: Optional[Dict[str, float]], cpu_seconds: Optional[int]) -> bool:
+    """Returns True if a run was killed for using up its CPU time."""
+    if returncode == -signal.SIGXCPU:
+        return True
+    if returncode != -signal.SIGKILL or usage is None or cpu_seconds is None:
+        return False
+    return usage["user_seconds"] + usage["system_seconds"] >= cpu_seconds
+
+
+def format_run_stats(wall_seconds: float, usage: Optional[Dict[str, float]]) -> str:
+    """Formats what a run cost, so its expense is visible in the result."""
+    if usage is None:
+        return f"{RUN_STATS_PREFIX}wall {wall_seconds:.2f}s]"
+    rss = f"{'at most ' if usage.get('max_rss_is_bound') else ''}{usage['max_rss_kb'] / 1024:.1f} MB"
+    return (
+        f"{RUN_STATS_PREFIX}wall {wall_seconds:.2f}s, CPU {usage['user_seconds']:.2f}s user + "
+        f"{usage['system_seconds']:.2f}s sys, peak RSS {rss}]"
+    )
+
+
+def format_run_output(stdout: str, stderr: str, returncode: int) -> str:
+    """Formats a finished run the way the Agent expects to read it."""
+    stdout = stdout.strip()
+    stderr = stderr.strip()
+
+    output_parts = []
+
+    if stdout:
+        output_parts.append(f"STDOUT:\n{stdout}")
+    if stderr:
+        output_parts.append(f"STDERR:\n{stderr}")
+
+    # If the script crashed (non-zero exit code), report it
+    if returncode != 0:
+        output_parts.append(f"Process exited with code {returncode}")
+
+    if not output_parts:
+        return "No output produced."
+
+    return "\n".join(output_parts)
@@ -0,0 +1,431 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from config import (
+    BINARY_SNIFF_BYTES,
+    SEARCH_INDEX_DIR,
+    SEARCH_MAX_FILE_BYTES,
+    SEARCH_RESCAN_INTERVAL_SECONDS,
+)
+from functions.file_cache import Signature, file_signature
+from functions.get_file_content import is_binary
+from functions.workspace import walk_workspace
+
+# Bumped whenever the on-disk format changes; older indexes are rebuilt.
+_INDEX_VERSION = 3
+
+# One row per file; `trigrams` is NULL for files that are binary or too large
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    trigrams BLOB
+);
+"""
+
+# A file's new (signature, absolute path) for `_apply`, or None once it is gone
+FileChange = Optional[Tuple[Signature, str]]
+
+# A file's row to write back: (signature, its sorted trigrams joined), or None to delete it
+IndexRow = Optional[Tuple[Signature, Optional[bytes]]]
+
+
+# The only non-ASCII characters re.IGNORECASE matches with ASCII letters:
+# dotted and dotless I, long S and the Kelvin sign
+_ASCII_FOLDS = [
+    ("\u0130".encode("utf-8"), b"i"),
+    ("\u0131".encode("utf-8"), b"i"),
+    ("\u017f".encode("utf-8"), b"s"),
+    ("\u212a".encode("utf-8"), b"k"),
+]
+
+
+def _trigrams(data: bytes) -> FrozenSet[bytes]:
+    """Returns the set of case-folded 3-byte sequences in `data`."""
+    # bytes.lower() only folds ASCII letters
+    data = data.lower()
+    for char, letter in _ASCII_FOLDS:
+        if char in data:
+            data = data.replace(char, letter)
+    return frozenset(data[i:i + 3] for i in range(len(data) - 2))
+
+
+class TrigramIndex:
+    """
+    Trigram index over the text files of one working directory.
+
+    For every file the index remembers its (mtime_ns, size, inode) signature
+    and whether its text was indexed; a posting list maps each trigram to
+    the files containing it. A query only has to open the files that contain
+    every trigram of its required literal text. The trigrams of each file are
+    not kept a second time in memory: files that changed are dropped from the
+    posting lists in a single pass over them.
+
+    The index is persisted in SQLite, one row per file, and loaded from disk
+    on first use. It is refreshed incrementally: files reported through
+    `note_write` are re-indexed right away, and a stat-only rescan of the
+    tree (at most every few seconds) catches files changed by scripts or
+    other tools. Only the rows of changed files are written back, after the
+    lock is released, so searches never wait on the disk.
+    """
+
+    def __init__(self, working_directory: str, index_dir: str = SEARCH_INDEX_DIR):
+        self.abs_root = os.path.abspath(working_directory)
+        digest = hashlib.sha256(self.abs_root.encode("utf-8")).hexdigest()[:16]
+        self.index_path = os.path.join(index_dir, f"{digest}.sqlite3")
+        self.files: Dict[str, Tuple[Signature, bool]] = {}
+        self.postings: Dict[bytes, Set[str]] = {}
+        self._dirty: Set[str] = set()
+        # Changes not yet written back to the index file
+        self._unsaved: Dict[str, IndexRow] = {}
+        self._loaded = False
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+        # Held by the one thread writing rows back
+        self._save_lock = threading.Lock()
+
+    def note_write(self, rel_path: str) -> None:
+        """Marks a file written by the agent for re-indexing."""
+        with self._lock:
+            self._dirty.add(rel_path)
+
+    def refresh(self) -> None:
+        """Brings the index up to date with the working directory."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+                self._last_scan = 0.0
+
+            now = time.monotonic()
+            if now - self._last_scan >= SEARCH_RESCAN_INTERVAL_SECONDS:
+                self._apply(self._rescan())
+                self._last_scan = now
+            else:
+                changes: Dict[str, FileChange] = {}
+                for rel_path in sorted(self._dirty):
+                    abs_path = os.path.join(self.abs_root, rel_path)
+                    try:
+                        signature = file_signature(os.stat(abs_path))
+                    except OSError:
+                        if rel_path in self.files:
+                            changes[rel_path] = None
+                        continue
+                    if rel_path not in self.files or self.files[rel_path][0] != signature:
+                        changes[rel_path] = (signature, abs_path)
+                self._apply(changes)
+            self._dirty.clear()
+
+        self._flush()
+
+    def candidates(self, required: List[str], ignore_case: bool = False) -> List[Tuple[str, bool]]:
+        """
+        Returns the files that may contain every required literal, in sorted
+        order, as (path, indexed) pairs: indexed files holding all of their
+        trigrams (every text file with no usable literal), and every file too
+        large to be indexed, which was never checked for binary data.
+        Indexed binary files are never candidates.
+
+        Trigrams are only folded for ASCII case, so with `ignore_case` the
+        trigrams of non-ASCII text are not required.
+
+        Taken under the lock, so a concurrent `refresh` cannot change the
+        index halfway through.
+        """
+        trigrams: Set[bytes] = set()
+        for literal in required:
+            trigrams |= _trigrams(literal.encode("utf-8"))
+        if ignore_case:
+            trigrams = {trigram for trigram in trigrams if trigram.isascii()}
+
+        with self._lock:
+            large = {rel_path for rel_path, (signature, _) in self.files.items() if signature[1] > SEARCH_MAX_FILE_BYTES}
+            result: Optional[Set[str]] = None
+            if not trigrams:
+                result = {rel_path for rel_path, (_, indexed) in self.files.items() if indexed}
+            # Intersect starting from the rarest trigram
+            for trigram in sorted(trigrams, key=lambda t: len(self.postings.get(t, ()))):
+                files = self.postings.get(trigram)
+                if not files:
+                    result = set()
+                    break
+                result = set(files) if result is None else result & files
+                if not result:
+                    break
+            return sorted([(rel_path, True) for rel_path in result or ()] + [(rel_path, False) for rel_path in large])
+
+    def _rescan(self) -> Dict[str, FileChange]:
+        """Stats every file; returns the ones that changed or disappeared."""
+        changes: Dict[str, FileChange] = {}
+        seen = set()
+        for rel_path, entry, _ in walk_workspace(self.abs_root):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            seen.add(rel_path)
+            try:
+                signature = file_signature(entry.stat(follow_symlinks=False))
+            except OSError:
+                continue
+            known = self.files.get(rel_path)
+            if known is None or known[0] != signature:
+                changes[rel_path] = (signature, entry.path)
+        for rel_path in set(self.files) - seen:
+            changes[rel_path] = None
+        return changes
+
+    def _apply(self, changes: Dict[str, FileChange]) -> None:
+        """Re-indexes changed files and drops the ones that are gone."""
+        stale = {rel_path for rel_path in changes if rel_path in self.files}
+        if stale:
+            for trigram in [trigram for trigram, files in self.postings.items() if not files.isdisjoint(stale)]:
+                files = self.postings[trigram]
+                files -= stale
+                if not files:
+                    del self.postings[trigram]
+
+        for rel_path, change in changes.items():
+            if change is None:
+                self.files.pop(rel_path, None)
+                self._unsaved[rel_path] = None
+                continue
+            signature, abs_path = change
+            trigrams = self._read_trigrams(abs_path, signature)
+            # Files that are too large or binary are remembered, but never indexed
+            self.files[rel_path] = (signature, trigrams is not None)
+            for trigram in trigrams or ():
+                self.postings.setdefault(trigram, set()).add(rel_path)
+            self._unsaved[rel_path] = (signature, None if trigrams is None else b"".join(sorted(trigrams)))
+
+    @staticmethod
+    def _read_trigrams(abs_path: str, signature: Signature) -> Optional[FrozenSet[bytes]]:
+        """Returns the trigrams of a text file, or None if it cannot be indexed."""
+        if signature[1] > SEARCH_MAX_FILE_BYTES:
+            return None
+        try:
+            with open(abs_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if is_binary(data[:BINARY_SNIFF_BYTES]):
+            return None
+        return _trigrams(data)
+
+    def _load(self) -> None:
+        """Loads the persisted index, if there is a compatible one."""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with closing(sqlite3.connect(self.index_path, timeout=5.0)) as db:
+                meta = dict(db.execute("SELECT key, value FROM meta"))
+                if meta.get("version") != str(_INDEX_VERSION) or meta.get("root") != self.abs_root:
+                    raise ValueError("incompatible search index")
+                for path, mtime_ns, size, inode, trigrams in db.execute(
+                    "SELECT path, mtime_ns, size, inode, trigrams FROM files"
+                ):
+                    self.files[path] = ((mtime_ns, size, inode), trigrams is not None)
+                    for i in range(0, len(trigrams or b""), 3):
+                        self.postings.setdefault(trigrams[i:i + 3], set()).add(path)
+        except (sqlite3.Error, ValueError):
+            # Unreadable or from an older version: start over
+            self.files, self.postings = {}, {}
+            try:
+                os.unlink(self.index_path)
+            except OSError:
+                pass
+
+    def _flush(self) -> None:
+        """Writes the unsaved changes back, unless another thread already is."""
+        if not self._save_lock.acquire(blocking=False):
+            # That thread picks up these changes too, or the next refresh does
+            return
+        try:
+            while True:
+                with self._lock:
+                    rows, self._unsaved = self._unsaved, {}
+                if not rows:
+                    return
+                self._save(rows)
+        finally:
+            self._save_lock.release()
+
+    def _save(self, rows: Dict[str, IndexRow]) -> None:
+        """Persists the rows of changed files in one transaction."""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with closing(sqlite3.connect(self.index_path, timeout=5.0)) as db, db:
+                db.executescript(_SCHEMA)
+                db.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("version", str(_INDEX_VERSION)), ("root", self.abs_root)],
+                )
+                db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path, row in rows.items() if row is None])
+                db.executemany(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, inode, trigrams) VALUES (?, ?, ?, ?, ?)",
+                    [(path, *row[0], row[1]) for path, row in rows.items() if row is not None],
+                )
+        except (OSError, sqlite3.Error):
+            # The index on disk is only a head start: a later load rescans
+            pass
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def search_index(working_directory: str) -> TrigramIndex:
+    """Returns the shared (lazily loaded) index for a working directory."""
+    abs_root = os.path.abspath(working_directory)
+    with _indexes_lock:
+        index = _indexes.get(abs_root)
+        if index is None:
+            index = _indexes[abs_root] = TrigramIndex(abs_root)
+        return index
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Extracts literal fragments that every match of a regex must contain.
+
+    Conservative: anything inside groups, character classes or optional
+    parts is skipped, and a pattern with alternation yields nothing (every
+    file is then a candidate). Returning too little only costs speed; it
+    never hides a match.
+    """
+    fragments = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if not escaped.isalnum() and depth == 0:
+                current += escaped
+                continue
+            # \d, \w, \b, ... match classes, not literal text
+            fragments.append(current)
+            current = ""
+            continue
+        if char == "|":
+            return []
+        if char in "*?{":
+            # The previous character is optional (or repeated an unknown number of times)
+            current = current[:-1]
+            if char == "{":
+                close = pattern.find("}", i)
+                i = close if close != -1 else i
+        elif char == "[":
+            close = pattern.find("]", i + 2)
+            i = close if close != -1 else len(pattern)
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char not in ".^$+" and depth == 0:
+            current += char
+            i += 1
+            continue
+        fragments.append(current)
+        current = ""
+        i += 1
+    fragments.append(current)
+    return [fragment for fragment in fragments if len(fragment) >= 3]
+
+
+def search_code(
+    working_directory: str,
+    query: str,
+    regex: bool = False,
+    ignore_case: bool = False,
+    directory: str = ".",
+    max_results: int = 50,
+) -> str:
+    """
+    Searches the files of the working directory for a literal string or regex
+    and returns the matching lines. Use it to find definitions and usages
+    instead of reading files one by one.
+
+    Security:
+        - Restricts the search to the 'working_directory' (Path Traversal).
+
+    Performance:
+        - Answered from a persisted trigram index: only files containing all
+          trigrams of the query's literal text are opened and scanned.
+          Files too large to index are always scanned.
+
+    Args:
+        working_directory (str): The root permitted directory.
+        query (str): The text or regular expression to search for.
+        regex (bool): Treat `query` as a Python regular expression.
+        ignore_case (bool): Match case-insensitively.
+        directory (str): Only search below this directory (relative path).
+        max_results (int): Maximum number of matching lines to return.
+
+    Returns:
+        str: Matches formatted as "path:line: text", or an error message.
+    """
+    abs_working = os.path.abspath(working_directory)
+    abs_target = os.path.abspath(os.path.join(working_directory, directory))
+    if not abs_target.startswith(abs_working):
+        return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+    if not query:
+        return "Error: query must not be empty."
+
+    try:
+        matcher = re.compile(query if regex else re.escape(query), re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        return f"Error: Invalid regular expression: {e}"
+
+    max_results = max(1, min(max_results or 50, 500))
+    prefix = os.path.relpath(abs_target, abs_working).replace(os.sep, "/")
+    prefix = "" if prefix == "." else prefix + "/"
+
+    try:
+        index = search_index(working_directory)
+        index.refresh()
+        candidates = index.candidates(required_literals(query) if regex else [query], ignore_case)
+
+        results = []
+        for rel_path, indexed in candidates:
+            if prefix and not rel_path.startswith(prefix):
+                continue
+            abs_path = os.path.join(abs_working, rel_path)
+            try:
+                if not indexed:
+                    # Files too large to index were never checked for binary data
+                    with open(abs_path, "rb") as f:
+                        if is_binary(f.read(BINARY_SNIFF_BYTES)):
+                            continue
+                with open(abs_path, "r", encoding="utf-8", errors="replace") as f:
+                    for number, line in enumerate(f, start=1):
+                        if matcher.search(line):
+                            text = line.rstrip("\n").strip()
+                            if len(text) > 200:
+                                text = text[:200] + "..."
+                            results.append(f"{rel_path}:{number}: {text}")
+                            if len(results) > max_results:
+                                break
+            except OSError:
+                continue
+            if len(results) > max_results:
+                break
+
+        if not results:
+            return f'No matches for "{query}".'
+        if len(results) > max_results:
+            results = results[:max_results]
+            results.append(f"[...Results truncated at {max_results} matches; narrow the query or directory...]")
+        return "\n".join(results)
+
+    except Exception as e:
+        return f"Error searching files: {e}"
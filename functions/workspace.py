@@ -0,0 +1,128 @@
+import fnmatch
+import os
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from config import DEFAULT_IGNORE_PATTERNS
+
+
+class IgnoreRules:
+    """
+    A simplified `.gitignore` matcher.
+
+    Supported syntax: blank lines and `#` comments are skipped, a trailing
+    `/` matches directories only, a pattern containing `/` is anchored to
+    the directory of the file that declared it, anything else matches the
+    entry name at any depth. Negation (`!pattern`) is not supported and such
+    lines are ignored.
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None):
+        # (base directory, compiled pattern matcher, directories only, anchored)
+        self.rules: List[Tuple[str, Callable, bool, bool]] = []
+        for pattern in patterns if patterns is not None else DEFAULT_IGNORE_PATTERNS:
+            self.add(pattern, base=".")
+
+    def add(self, pattern: str, base: str = ".") -> None:
+        """Adds one pattern declared in the directory `base` (relative path)."""
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith(("#", "!")):
+            return
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        matcher = re.compile(fnmatch.translate(pattern.lstrip("/"))).match
+        self.rules.append((base, matcher, dir_only, anchored))
+
+    def load_gitignore(self, abs_dir: str, rel_dir: str) -> None:
+        """Adds the patterns of `<abs_dir>/.gitignore`, if there is one."""
+        try:
+            with open(os.path.join(abs_dir, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    self.add(line, base=rel_dir)
+        except OSError:
+            pass
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Checks a path (relative to the workspace root) against every rule."""
+        name = os.path.basename(rel_path)
+        for base, matches, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if anchored:
+                if base != ".":
+                    if not rel_path.startswith(base + "/"):
+                        continue
+                    candidate = rel_path[len(base) + 1:]
+                else:
+                    candidate = rel_path
+                if matches(candidate):
+                    return True
+            elif matches(name):
+                if base == "." or rel_path.startswith(base + "/"):
+                    return True
+        return False
+
+
+def _relative(parent: str, name: str) -> str:
+    """Joins workspace-relative paths using '/' and without a './' prefix."""
+    return name if parent == "." else f"{parent}/{name}"
+
+
+def walk_workspace(
+    abs_root: str,
+    start: str = ".",
+    max_depth: Optional[int] = None,
+    ignore: Optional[IgnoreRules] = None,
+) -> Iterator[Tuple[str, os.DirEntry, int]]:
+    """
+    Walks a directory tree with `os.scandir`, in sorted, deterministic order.
+
+    Entries are produced depth-first in pre-order (a directory comes right
+    before its contents) and sorted by name within each directory. Symbolic
+    links to directories are reported but not descended into. Ignored
+    entries (and everything below ignored directories) are skipped, and
+    `.gitignore` files are honored as they are encountered.
+
+    Args:
+        abs_root (str): Absolute path of the workspace root.
+        start (str): Directory to walk, relative to the root.
+        max_depth (int, optional): Levels of subdirectories to descend into;
+            0 lists only `start` itself, None walks the whole tree.
+        ignore (IgnoreRules, optional): Rules to apply. Defaults to the
+            built-in ignore patterns plus the workspace's `.gitignore`.
+
+    Yields:
+        tuple: (path relative to the root using '/', DirEntry, depth).
+    """
+    start = os.path.normpath(start).replace(os.sep, "/")
+    if ignore is None:
+        ignore = IgnoreRules()
+        # .gitignore files from the root down to the start directory
+        ignore.load_gitignore(abs_root, ".")
+        rel = "."
+        for part in ([] if start == "." else start.split("/")):
+            rel = _relative(rel, part)
+            ignore.load_gitignore(os.path.join(abs_root, rel), rel)
+
+    def walk(rel_dir: str, depth: int) -> Iterator[Tuple[str, os.DirEntry, int]]:
+        abs_dir = os.path.join(abs_root, rel_dir)
+        if depth > 0:
+            ignore.load_gitignore(abs_dir, rel_dir)
+        try:
+            with os.scandir(abs_dir) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        for entry in entries:
+            rel_path = _relative(rel_dir, entry.name)
+            # d_type from the directory read; no extra stat() call
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore.is_ignored(rel_path, is_dir):
+                continue
+            yield rel_path, entry, depth
+            if is_dir and (max_depth is None or depth < max_depth):
+                yield from walk(rel_path, depth + 1)
+
+    yield from walk(start, 0)
@@ -1,6 +1,92 @@
 import os
+import secrets
+import stat
+from typing import Optional, Tuple
+from config import MAX_CHARS
+from functions.file_cache import file_cache, file_signature
+from functions.read_ledger import ReadLedger
+from functions.run_cache import workspace_fingerprint
+from functions.search_code import search_index
 
-def write_file(working_directory: str, file_path: str, content: str) -> str:
+
+def stage_text(abs_file_path: str, content: str, temp_name: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Writes `content` to a temporary file next to the target, with the
+    target's permission bits (or the usual ones for a new file).
+
+    Args:
+        abs_file_path (str): The file the content is meant for.
+        content (str): The text to write.
+        temp_name (str): The temporary file's name, which must not exist;
+            a random ".tmp-*.part" name by default.
+
+    Returns:
+        tuple: (target, temp_path). `os.replace(temp_path, target)` puts the
+        content in place atomically.
+    """
+    # Write through symlinks to the file they point at, like open() does
+    target = os.path.realpath(abs_file_path)
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = None
+
+    # A new file is created 0666 and the kernel applies the umask, as open()
+    # would; an existing file's bits are copied once the content is written
+    while True:
+        temp_path = os.path.join(os.path.dirname(target), temp_name or f".tmp-{secrets.token_hex(8)}.part")
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666 if mode is None else 0o600)
+            break
+        except FileExistsError:
+            if temp_name is not None:
+                raise
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return target, temp_path
+
+
+def atomic_write_text(abs_file_path: str, content: str) -> None:
+    """
+    Writes a UTF-8 text file atomically: the content goes to a temporary file
+    in the same directory, which then replaces the target with a rename.
+    Readers see either the old or the new file, never a partial one. An
+    existing file's permission bits are preserved.
+    """
+    target, temp_path = stage_text(abs_file_path, content)
+    try:
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def record_write(working_directory: str, abs_file_path: str, content: str) -> None:
+    """Updates the shared caches after the agent wrote `content` to a file."""
+    # Keep the shared read cache in sync with what is now on disk
+    real_path = os.path.realpath(abs_file_path)
+    try:
+        file_cache.put(real_path, file_signature(os.stat(real_path)), content)
+    except OSError:
+        file_cache.invalidate(real_path)
+    rel_path = os.path.relpath(abs_file_path, os.path.abspath(working_directory)).replace(os.sep, "/")
+    workspace_fingerprint(working_directory).note_write(rel_path, content.encode("utf-8"))
+    search_index(working_directory).note_write(rel_path)
+
+
+def write_file(working_directory: str, file_path: str, content: str, *, ledger: Optional[ReadLedger] = None) -> str:
     """
     Writes content to a file, creating any necessary parent directories.
     
@@ -8,11 +94,15 @@ def write_file(working_directory: str, file_path: str, content: str) -> str:
         - Prevents Path Traversal attacks by validating that the target file
           remains within the 'working_directory'.
         - Overwrites existing files without warning (Agent behavior).
+        - Replaces the file atomically, so it is never left half-written.
 
     Args:
         working_directory (str): The root permitted directory.
         file_path (str): The relative path where the file should be written.
         content (str): The text content to write.
+        ledger (ReadLedger, optional): The session's record of delivered
+            file versions (host-supplied). The model knows what it wrote, so
+            a later read of the file only reports changes since.
 
     Returns:
         str: A success message with character count, or an error message.
@@ -33,8 +123,14 @@ def write_file(working_directory: str, file_path: str, content: str) -> str:
             os.makedirs(dir_name, exist_ok=True)
 
         # Write the content to the file using UTF-8 encoding
-        with open(abs_file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        atomic_write_text(abs_file_path, content)
+        record_write(working_directory, abs_file_path, content)
+        if ledger is not None:
+            # Files beyond MAX_CHARS are never read whole, so they are not worth remembering
+            if len(content) <= MAX_CHARS:
+                ledger.record(file_path, content)
+            else:
+                ledger.forget(file_path)
 
         return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
 
@@ -0,0 +1,354 @@
+"""
+Token-budgeted compaction of the conversation history.
+
+Every model call re-sends the whole `messages` list, so old file dumps and
+script outputs are paid for again on every iteration. `HistoryManager`
+keeps the history under a token budget by rewriting old turns, cheapest
+loss first:
+
+    1. Superseded file contents: a `get_file_content` result (or a content
+       argument of a `write_file` or `write_files` call) for a path that was read or written
+       again later is replaced with a short stub. Only a later write or
+       whole-file read supersedes; a ranged read or a symbol's source does not.
+    2. Stale tool outputs: large results of old tool calls are cut down to
+       their first lines.
+    3. Old reasoning: the model's old text parts are cut down to their last
+       sentences, where it usually states what it concluded, and labeled
+       as truncated.
+
+Delta reads ("unchanged" or a diff, see functions/read_ledger.py) and
+back-references to an identical earlier call (see call_ledger.py) do not
+supersede the earlier read they refer to. Whenever a file's content is
+elided, `on_file_elided` is told, so the session's read ledger stops
+answering re-reads of that file with diffs against text that is gone.
+Likewise, `on_output_elided` is told about every call whose result is
+stubbed or cut, so the session's call ledger (see call_ledger.py) stops
+referring repeated calls back to it.
+
+The first message (the user's task) and the most recent turns are never
+touched. Compaction never modifies a `Content` or `Part` in place, since the
+checkpoint or the response cache may still hold it: rewritten copies are
+put into the history list instead. Token counts come from a local estimator, so deciding what to drop
+costs no API round trip.
+"""
+
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from call_ledger import REFERENCE_PREFIX
+from config import HISTORY_KEEP_RECENT_MESSAGES, HISTORY_TOKEN_BUDGET
+from functions.read_ledger import DELTA_PREFIXES
+
+# Average number of characters per token for code and English text.
+CHARS_PER_TOKEN = 4
+
+# Tool outputs smaller than this are cheap enough to keep verbatim.
+STALE_OUTPUT_MIN_CHARS = 800
+
+# How much of a stale tool output or old reasoning text survives compaction.
+STALE_OUTPUT_KEEP_CHARS = 300
+REASONING_KEEP_CHARS = 200
+TRUNCATED_REASONING_PREFIX = "[Earlier reasoning truncated to its last sentences]"
+
+# Tools whose results are the content of the file named by an argument,
+# mapped to that argument's name.
+FILE_READ_TOOLS = {"get_file_content": "file_path", "get_symbol_source": "file_path"}
+FILE_WRITE_TOOLS = {"write_file": "file_path", "edit_file": "file_path"}
+
+# Tools that read or write several files, mapped to the argument listing
+# them (entries with a "file_path" and, for writes, a "content").
+MULTI_FILE_READ_TOOLS = {"read_files": "files"}
+MULTI_FILE_WRITE_TOOLS = {"write_files": "files"}
+
+# Arguments of get_file_content that select part of the file
+RANGE_ARGUMENTS = ("offset", "length", "start_line", "end_line")
+
+
+def _is_whole_file_read(name: str, args: Dict[str, Any], text: Optional[str]) -> bool:
+    """Returns True for a read whose result is a whole file's current content."""
+    if name != "get_file_content" or text is None:
+        return False
+    if any(args.get(argument) is not None for argument in RANGE_ARGUMENTS):
+        return False
+    return not text.startswith(DELTA_PREFIXES + (REFERENCE_PREFIX, "Error"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in a string without calling the API."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _part_chars(part: types.Part) -> int:
+    """Returns the approximate serialized size of a single part."""
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def estimate_history_tokens(messages: List[types.Content]) -> int:
+    """Estimates the prompt tokens needed to send the given history."""
+    chars = sum(_part_chars(part) for content in messages for part in (content.parts or []))
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _normalize(path: Optional[str]) -> str:
+    """Normalizes a model-supplied relative path so equal paths compare equal."""
+    return os.path.normpath(path or ".")
+
+
+def _file_entries(args: Dict[str, Any], argument: str) -> List[Dict[str, Any]]:
+    """Returns the per-file entries of a multi-file tool call."""
+    return [dict(entry) for entry in args.get(argument) or [] if isinstance(entry, dict)]
+
+
+def _response_text(part: types.Part) -> Optional[str]:
+    """Returns the string result of a function response part, if it has one."""
+    response = part.function_response.response or {}
+    result = response.get("result")
+    return result if isinstance(result, str) else None
+
+
+def _replace_part(messages: List[types.Content], message_index: int, part_index: int, part: types.Part) -> None:
+    """Puts a copy of a message with one of its parts swapped into `messages`."""
+    content = messages[message_index]
+    parts = list(content.parts or [])
+    parts[part_index] = part
+    messages[message_index] = content.model_copy(update={"parts": parts})
+
+
+def _replace_response(messages: List[types.Content], message_index: int, part_index: int, text: str) -> None:
+    """Swaps a function response part for one carrying `text` as its result."""
+    part = messages[message_index].parts[part_index]
+    response = part.function_response.model_copy(update={"response": {"result": text}})
+    _replace_part(messages, message_index, part_index, part.model_copy(update={"function_response": response}))
+
+
+def _replace_args(messages: List[types.Content], message_index: int, part_index: int, args: Dict[str, Any]) -> None:
+    """Swaps a function call part for one with the given arguments."""
+    part = messages[message_index].parts[part_index]
+    call = part.function_call.model_copy(update={"args": args})
+    _replace_part(messages, message_index, part_index, part.model_copy(update={"function_call": call}))
+
+
+def _last_sentences(text: str, limit: int) -> str:
+    """Returns at most `limit` characters from the end of `text`, from a sentence or line start."""
+    tail = text.rstrip()[-limit:]
+    boundary = re.search(r"[.!?:]\s+|\n", tail)
+    if boundary is not None and boundary.end() < len(tail):
+        tail = tail[boundary.end():]
+    return tail.strip()
+
+
+class HistoryManager:
+    """
+    Keeps the conversation history within a token budget.
+
+    Args:
+        token_budget (int): Target upper bound for the estimated prompt tokens.
+        keep_recent (int): Number of trailing messages that are never compacted.
+        on_file_elided (callable, optional): Called with the path of every
+            file whose content (read or written) is elided from the history.
+        on_output_elided (callable, optional): Called with the tool name and
+            call arguments of every result that is elided or cut.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent: int = HISTORY_KEEP_RECENT_MESSAGES,
+        on_file_elided: Optional[Callable[[str], None]] = None,
+        on_output_elided: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.on_file_elided = on_file_elided
+        self.on_output_elided = on_output_elided
+
+    def _file_elided(self, path: str) -> None:
+        if self.on_file_elided is not None:
+            self.on_file_elided(path)
+
+    def _output_elided(self, name: str, args: Dict[str, Any]) -> None:
+        if self.on_output_elided is not None:
+            self.on_output_elided(name, args)
+
+    def compact(self, messages: List[types.Content]) -> int:
+        """
+        Compacts `messages` in place until it fits the token budget, or until
+        nothing compactable is left.
+
+        Returns:
+            int: The estimated token count of the history after compaction.
+        """
+        tokens = estimate_history_tokens(messages)
+        if tokens <= self.token_budget:
+            return tokens
+
+        # Never touch the task itself or the turns the model is working on.
+        end = len(messages) - self.keep_recent
+        if end <= 1:
+            return tokens
+
+        for compaction_pass in (
+            self._stub_superseded_files,
+            self._trim_stale_outputs,
+            self._truncate_reasoning,
+        ):
+            for saved in compaction_pass(messages, end):
+                tokens -= saved
+                if tokens <= self.token_budget:
+                    return tokens
+
+        return tokens
+
+    @staticmethod
+    def _tool_calls(messages: List[types.Content], end: int) -> List[Tuple[int, int, str, Dict[str, Any]]]:
+        """
+        Pairs every function response before `end` with its call arguments.
+
+        Returns:
+            list: (message index, part index, tool name, call args) for each
+            function response, in history order.
+        """
+        pairs = []
+        pending: List[types.FunctionCall] = []
+        for message_index, content in enumerate(messages[:end]):
+            parts = content.parts or []
+            calls = [part.function_call for part in parts if part.function_call]
+            if calls:
+                pending = calls
+                continue
+            for part_index, part in enumerate(parts):
+                if not part.function_response:
+                    continue
+                name = part.function_response.name
+                # Responses come back in call order; match each to the next
+                # pending call of the same name.
+                for call_index, call in enumerate(pending):
+                    if call.name == name:
+                        pairs.append((message_index, part_index, name, dict(call.args or {})))
+                        del pending[call_index]
+                        break
+        return pairs
+
+    def _stub_superseded_files(self, messages: List[types.Content], end: int):
+        """Replaces file contents that a later read or write made obsolete."""
+        # Every (message index, path) at which a file was written or read
+        # whole, including turns inside the protected tail. A ranged read, a
+        # symbol's source, a delta read or a back-reference only shows part
+        # of the file or leans on the earlier content, so it does not count.
+        touched: List[Tuple[int, str]] = []
+        for message_index, content in enumerate(messages):
+            for part in content.parts or []:
+                call = part.function_call
+                if call and call.name in FILE_WRITE_TOOLS:
+                    touched.append((message_index, _normalize((call.args or {}).get(FILE_WRITE_TOOLS[call.name]))))
+                elif call and call.name in MULTI_FILE_WRITE_TOOLS:
+                    for entry in _file_entries(call.args or {}, MULTI_FILE_WRITE_TOOLS[call.name]):
+                        touched.append((message_index, _normalize(entry.get("file_path"))))
+        for message_index, part_index, name, args in self._tool_calls(messages, len(messages)):
+            text = _response_text(messages[message_index].parts[part_index])
+            if _is_whole_file_read(name, args, text):
+                # Indexed by the call, which sits in the message before its response
+                touched.append((message_index - 1, _normalize(args.get(FILE_READ_TOOLS[name]))))
+
+        def superseded(call_index: int, path: str) -> bool:
+            # Calls in the same turn run together, so only later turns count.
+            return any(index > call_index and other == path for index, other in touched)
+
+        # Contents the model wrote itself, carried in old write_file(s) calls.
+        for message_index, content in enumerate(messages[:end]):
+            for part_index, part in enumerate(content.parts or []):
+                call = part.function_call
+                if call and call.name in MULTI_FILE_WRITE_TOOLS:
+                    yield from self._elide_written_entries(messages, message_index, part_index, superseded)
+                if not call or call.name not in FILE_WRITE_TOOLS:
+                    continue
+                args = dict(call.args or {})
+                path = _normalize(args.get(FILE_WRITE_TOOLS[call.name]))
+                text = args.get("content")
+                if isinstance(text, str) and len(text) > STALE_OUTPUT_KEEP_CHARS and superseded(message_index, path):
+                    args["content"] = f'[Elided {len(text)} characters written to "{path}"; a later call touched this file]'
+                    _replace_args(messages, message_index, part_index, args)
+                    self._file_elided(path)
+                    yield (len(text) - len(args["content"])) // CHARS_PER_TOKEN
+
+        # Results of old reads.
+        for message_index, part_index, name, args in self._tool_calls(messages, end):
+            if name not in FILE_READ_TOOLS:
+                continue
+            path = _normalize(args.get(FILE_READ_TOOLS[name]))
+            text = _response_text(messages[message_index].parts[part_index])
+            if text is None or len(text) <= STALE_OUTPUT_KEEP_CHARS:
+                continue
+            # The call sits in the message before its response.
+            if superseded(message_index - 1, path):
+                stub = f'[Superseded: "{path}" was read or written again later in this conversation]'
+                _replace_response(messages, message_index, part_index, stub)
+                self._file_elided(path)
+                self._output_elided(name, args)
+                yield (len(text) - len(stub)) // CHARS_PER_TOKEN
+
+    def _elide_written_entries(
+        self,
+        messages: List[types.Content],
+        message_index: int,
+        part_index: int,
+        superseded: Callable[[int, str], bool],
+    ):
+        """Elides the superseded contents of one write_files call."""
+        call = messages[message_index].parts[part_index].function_call
+        args = dict(call.args or {})
+        argument = MULTI_FILE_WRITE_TOOLS[call.name]
+        entries = _file_entries(args, argument)
+        saved = 0
+        for entry in entries:
+            path = _normalize(entry.get("file_path"))
+            text = entry.get("content")
+            if isinstance(text, str) and len(text) > STALE_OUTPUT_KEEP_CHARS and superseded(message_index, path):
+                entry["content"] = f'[Elided {len(text)} characters written to "{path}"; a later call touched this file]'
+                saved += len(text) - len(entry["content"])
+                self._file_elided(path)
+        if saved:
+            args[argument] = entries
+            _replace_args(messages, message_index, part_index, args)
+            yield saved // CHARS_PER_TOKEN
+
+    def _trim_stale_outputs(self, messages: List[types.Content], end: int):
+        """Cuts large results of old tool calls down to their beginning."""
+        for message_index, part_index, name, args in self._tool_calls(messages, end):
+            text = _response_text(messages[message_index].parts[part_index])
+            if text is None or len(text) <= STALE_OUTPUT_MIN_CHARS:
+                continue
+            head = text[:STALE_OUTPUT_KEEP_CHARS]
+            stub = f"{head}\n[...{len(text) - len(head)} characters of old {name} output elided...]"
+            _replace_response(messages, message_index, part_index, stub)
+            self._output_elided(name, args)
+            if name in FILE_READ_TOOLS:
+                self._file_elided(_normalize(args.get(FILE_READ_TOOLS[name])))
+            elif name in MULTI_FILE_READ_TOOLS:
+                for entry in _file_entries(args, MULTI_FILE_READ_TOOLS[name]):
+                    self._file_elided(_normalize(entry.get("file_path")))
+            yield (len(text) - len(stub)) // CHARS_PER_TOKEN
+
+    def _truncate_reasoning(self, messages: List[types.Content], end: int):
+        """Cuts the model's old free-text reasoning down to its last sentences."""
+        for message_index, content in enumerate(messages[1:end], start=1):
+            if content.role != "model":
+                continue
+            for part_index, part in enumerate(content.parts or []):
+                if not part.text or part.text.startswith(TRUNCATED_REASONING_PREFIX):
+                    continue
+                text = f"{TRUNCATED_REASONING_PREFIX} ...{_last_sentences(part.text, REASONING_KEEP_CHARS)}"
+                if len(text) >= len(part.text):
+                    continue
+                _replace_part(messages, message_index, part_index, part.model_copy(update={"text": text}))
+                yield (len(part.text) - len(text)) // CHARS_PER_TOKEN
@@ -1,90 +1,32 @@
 import os
 import argparse
 import sys
-from typing import Dict, Any, Optional
+import uuid
 
 # Third-party imports
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
-# Local imports
-from prompts import system_prompt
-from functions.get_files_info import available_functions, get_files_info
-from functions.get_file_content import get_file_content
-from functions.run_python_file import run_python_file
-from functions.write_file import write_file
+# Local imports (the modules built on the Gemini SDK are imported in main(),
+# after argument parsing, so --help and usage errors do not wait for it)
+from functions.file_cache import file_cache
+from config import (
+    HISTORY_TOKEN_BUDGET,
+    MAX_TOOL_WORKERS,
+    PYTHON_EXEC_MODE,
+    RESPONSE_CACHE_MODE,
+    RUN_CACHE_ENABLED,
+    WORKING_DIR,
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configuration
-# The directory where the agent is allowed to work (sandbox)
-WORKING_DIRECTORY = "./calculator"
-MODEL_NAME = "gemini-2.0-flash-exp" # or "gemini-2.0-flash" depending on availability
 
-# Map string names to actual Python functions
-function_map = {
-    "get_files_info": get_files_info,
-    "get_file_content": get_file_content,
-    "run_python_file": run_python_file,
-    "write_file": write_file,
-}
-
-def call_function(function_call_part: types.Part, verbose: bool = False) -> types.Content:
-    """
-    Executes a specific tool (function) requested by the model.
-
-    Args:
-        function_call_part: The part of the response containing the function call details.
-        verbose (bool): Whether to print detailed logs.
-
-    Returns:
-        types.Content: The output of the tool wrapped in a format the model understands.
-    """
-    function_name = function_call_part.name
-    original_args = function_call_part.args
-    
-    # Create a copy of args to inject the secure working directory
-    new_args = dict(original_args)
-    new_args["working_directory"] = WORKING_DIRECTORY
-    
-    target_function = function_map.get(function_name)
-
-    if target_function is None:
-        # Handle case where model hallucinates a non-existent function
-        return types.Content(
-            role="tool",
-            parts=[
-                types.Part.from_function_response(
-                    name=function_name,
-                    response={"error": f"Unknown function: {function_name}"},
-                )
-            ],
-        )
-
-    # Logging
-    if verbose:
-        print(f"Calling function: {function_name}({original_args})")
-    else:
-        print(f" - Calling function: {function_name}...")
-
-    # Execute the actual Python function
-    try:
-        function_result = target_function(**new_args)
-    except Exception as e:
-        function_result = f"Error executing tool: {e}"
-
-    # Return the result back to the model
-    return types.Content(
-        role="tool",
-        parts=[
-            types.Part.from_function_response(
-                name=function_name,
-                response={"result": function_result},
-            )
-        ],
-    )
+def stream_script_output(stream: str, text: str) -> None:
+    """Echoes a running script's output live to the terminal (verbose mode)."""
+    target = sys.stderr if stream == "stderr" else sys.stdout
+    target.write(text)
+    target.flush()
 
 
 def main():
@@ -98,111 +40,145 @@ def main():
     4. If no tool needed -> Model gives final answer -> Exit.
     """
     
-    # 1. API Key Validation
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if api_key is None:
-        raise RuntimeError("GEMINI_API_KEY not found. Please create a .env file with your key.")
-
-    # 2. Argument Parsing
+    # 1. Argument Parsing
     parser = argparse.ArgumentParser(description="AI Agent with Python Execution Capabilities")
-    parser.add_argument("user_prompt", type=str, help="The instruction for the agent")
+    parser.add_argument(
+        "user_prompt",
+        type=str,
+        nargs="?",
+        help="The instruction for the agent (optional with --resume, where it becomes a follow-up)",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable detailed logging")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_TOOL_WORKERS,
+        help="Maximum number of tool calls from one model turn to run concurrently",
+    )
+    parser.add_argument(
+        "--history-budget",
+        type=int,
+        default=HISTORY_TOKEN_BUDGET,
+        help="Estimated token budget for the conversation history; older turns are compacted beyond it",
+    )
+    parser.add_argument(
+        "--exec-mode",
+        choices=["subprocess", "forkserver"],
+        default=PYTHON_EXEC_MODE,
+        help="How run_python_file starts scripts: a new interpreter each time, or forked from a warm one",
+    )
+    parser.add_argument(
+        "--cache-runs",
+        action="store_true",
+        default=RUN_CACHE_ENABLED,
+        help="Reuse the output of identical script runs over an unchanged workspace",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write per-iteration timings and token counts to PATH (Chrome trace if it ends in .json, JSONL otherwise)",
+    )
+    parser.add_argument(
+        "--response-cache",
+        choices=["passthrough", "record", "replay"],
+        default=RESPONSE_CACHE_MODE,
+        help="Record model responses to disk, or replay recorded ones without calling the API",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help="Stop the agent loop after SECONDS of wall-clock time (default: no limit)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION",
+        help="Continue a checkpointed session from its last completed step",
+    )
     args = parser.parse_args()
+    if not args.user_prompt and not args.resume:
+        parser.error("a prompt is required unless --resume is given")
 
-    # 3. Client Initialization
-    client = genai.Client(api_key=api_key)
-    
-    # Initialize conversation history with the user's prompt
-    messages = [
-        types.Content(
-            role="user",
-            parts=[types.Part(text=args.user_prompt)],
-        )
-    ]
+    from google import genai
+
+    from agent import AgentSession
+    from checkpoint import SessionCheckpoint
+    from response_cache import CachingClient, ResponseCache
+    from scheduler import shared_scheduler
 
-    max_iterations = 20
-    response = None
+    # 2. API Key Validation (replaying recorded responses needs no key)
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key is None and args.response_cache != "replay":
+        raise RuntimeError("GEMINI_API_KEY not found. Please create a .env file with your key.")
 
-    print(f"🤖 Agent started. Goal: '{args.user_prompt}'")
+    # 3. Client Initialization
+    client = genai.Client(api_key=api_key) if api_key else None
+    if args.response_cache != "passthrough":
+        client = CachingClient(client, ResponseCache(args.response_cache))
+    
+    # Every step is checkpointed so an interrupted run can be resumed
+    checkpoint = SessionCheckpoint(args.resume or uuid.uuid4().hex[:12])
+    if args.resume:
+        state = checkpoint.load()
+        working_directory = state["working_directory"]
+    else:
+        working_directory = WORKING_DIR
+        checkpoint.create(working_directory)
+
+    session = AgentSession(
+        working_directory=working_directory,
+        verbose=args.verbose,
+        max_workers=args.max_workers,
+        history_token_budget=args.history_budget,
+        tool_options={
+            "run_python_file": {
+                "exec_mode": args.exec_mode,
+                "on_output": stream_script_output if args.verbose else None,
+                "use_cache": args.cache_runs,
+            },
+        },
+        # Replayed responses never reach the API, so they need no pacing
+        scheduler=shared_scheduler() if args.response_cache != "replay" else None,
+        deadline_seconds=args.deadline,
+        checkpoint=checkpoint,
+    )
+    if args.resume:
+        session.restore(state)
+        print(f"🔁 Resuming session {checkpoint.session_id} at iteration {session.iteration}")
+    if args.user_prompt:
+        session.add_user_prompt(args.user_prompt)
+        print(f"🤖 Agent started. Goal: '{args.user_prompt}'")
+    print(f"Session: {checkpoint.session_id} (continue with --resume {checkpoint.session_id})")
 
     # 4. Main Reasoning Loop
-    for i in range(max_iterations):
-        try:
-            # Step 1: Send history to the model and get a response
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=messages,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    tools=[available_functions],
-                    temperature=0.0, # Keep it deterministic for code generation
-                ),
-            )
-
-            if not response.candidates:
-                print("Error: No candidates returned from model.")
-                break
-
-            # Add the model's response (thoughts/function calls) to history
-            for candidate in response.candidates:
-                messages.append(candidate.content)
-
-            function_call_results = []
-
-            # Step 2: Check if the model wants to call functions
-            if response.function_calls:
-                # Execute each function call
-                for call in response.function_calls:
-                    result = call_function(call, verbose=args.verbose)
-                    
-                    # Validate the structure of the result
-                    if (
-                        not hasattr(result, "parts")
-                        or not result.parts
-                        or not hasattr(result.parts[0], "function_response")
-                    ):
-                        raise RuntimeError("Function call returned invalid format.")
-
-                    part = result.parts[0]
-                    function_call_results.append(part)
-
-                    if args.verbose:
-                        print(f"   -> Tool Output: {part.function_response.response}")
-
-                # Step 3: Append tool results to history so the model can see them
-                if function_call_results:
-                    tool_message = types.Content(
-                        role="user", # In GenAI SDK, tool outputs often come as user role
-                        parts=function_call_results,
-                    )
-                    messages.append(tool_message)
-
-                # Continue the loop to let the model process the tool results
-                continue  
-
-            # Step 4: No function calls? We have the final answer.
-            if response.text:
-                print("\n✅ Final Response:")
-                print(response.text)
-                break
-            else:
-                print("Model returned no text and no function calls. Stopping.")
-                break
-
-        except Exception as e:
-            print(f"\n❌ Error during agent loop: {e}")
-            break
+    if session.final_text is not None:
+        # Resumed a finished session without a follow-up prompt
+        final_text = session.final_text
+    else:
+        final_text = session.run(client)
+    if final_text:
+        print("\n✅ Final Response:")
+        print(final_text)
 
     # 5. Usage Statistics
-    if response and response.usage_metadata:
-        prompt_tokens = response.usage_metadata.prompt_token_count
-        resp_tokens = response.usage_metadata.candidates_token_count
-        
-        if args.verbose:
-            print("\n--- Usage Stats ---")
-            print(f"Prompt tokens: {prompt_tokens}")
-            print(f"Response tokens: {resp_tokens}")
+    if args.verbose:
+        print("\n--- Usage Stats ---")
+        print(session.tracer.format_summary())
+        cache_stats = file_cache.stats()
+        print(
+            f"File cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['entries']} files ({cache_stats['bytes']} bytes) cached"
+        )
+        if session.call_ledger is not None:
+            print(f"Duplicate tool calls answered by reference: {session.call_ledger.duplicates}")
+        if isinstance(client, CachingClient):
+            response_stats = client.cache.stats()
+            print(f"Response cache: {response_stats['hits']} hits, {response_stats['misses']} misses")
+
+    if args.trace:
+        session.tracer.export(args.trace)
+        print(f"Trace written to {args.trace}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,219 @@
+"""
+Shaping of tool outputs before they enter the conversation history.
+
+Whatever a tool returns is re-sent to the model on every later call, so a
+deep recursion traceback or a loop that logs the same line a thousand times
+is paid for again and again. `shape_output` rewrites a tool result into a
+compact form before it is added to the history:
+
+    1. Repeated stack frames: frames that repeat in a cycle (deep or mutual
+       recursion) are kept once, followed by a count.
+    2. Repeated lines: a run of identical lines is kept once, with a count.
+    3. Only if the result is still over its tool's token budget:
+       a. Similar lines: a run of lines that differ only in their numbers
+          (counters, timings, ids) keeps its first and last line.
+       b. Head and tail: the start and the end of the result are kept and
+          the middle is replaced by a marker naming the omitted lines.
+
+Whenever a result is changed, the original is put in the session's
+`OutputStore` and the result says which `output_id` to page through with
+`read_tool_output`. Line numbers in markers refer to the original output.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from config import (
+    REPEATED_LINES_MIN_RUN,
+    TOOL_OUTPUT_HEAD_FRACTION,
+    TOOL_OUTPUT_TOKEN_BUDGET,
+    TOOL_OUTPUT_TOKEN_BUDGETS,
+    UNSHAPED_TOOLS,
+)
+from functions.output_store import OutputStore
+from history import CHARS_PER_TOKEN, estimate_tokens
+
+# Longest cycle of stack frames (e.g. a -> b -> c -> a) that is recognized.
+MAX_FRAME_CYCLE = 4
+
+# '  File "x.py", line 3, in f' in a Python traceback
+_FRAME = re.compile(r'^(\s*)File ".*", line \d+')
+# Deletes digits, so lines that differ only in their numbers compare equal
+_DROP_DIGITS = str.maketrans("", "", "0123456789")
+
+# A line of the output: (line number in the original output, text)
+Line = Tuple[int, str]
+
+
+def output_budget(tool_name: str) -> int:
+    """Returns the token budget for one result of a tool."""
+    return TOOL_OUTPUT_TOKEN_BUDGETS.get(tool_name, TOOL_OUTPUT_TOKEN_BUDGET)
+
+
+def _split_frames(lines: List[Line]) -> List[List[Line]]:
+    """Groups lines into items: a stack frame with its source lines, or a single other line."""
+    items: List[List[Line]] = []
+    index = 0
+    while index < len(lines):
+        match = _FRAME.match(lines[index][1])
+        item = [lines[index]]
+        index += 1
+        if match:
+            # The source line and caret markers are indented deeper than "File"
+            indent = len(match.group(1))
+            while index < len(lines) and len(lines[index][1]) - len(lines[index][1].lstrip()) > indent:
+                item.append(lines[index])
+                index += 1
+        items.append(item)
+    return items
+
+
+def _is_frame(item: List[Line]) -> bool:
+    return _FRAME.match(item[0][1]) is not None
+
+
+def dedupe_stack_frames(lines: List[Line]) -> List[Line]:
+    """Keeps one copy of each cycle of stack frames that repeats back to back."""
+    items = _split_frames(lines)
+    texts = [tuple(text for _, text in item) for item in items]
+    shaped: List[Line] = []
+    index = 0
+    while index < len(items):
+        best_period, best_repeats = 0, 1
+        for period in range(1, MAX_FRAME_CYCLE + 1):
+            cycle = items[index:index + period]
+            if len(cycle) < period or not all(_is_frame(item) for item in cycle):
+                break
+            repeats = 1
+            while texts[index + repeats * period:index + (repeats + 1) * period] == texts[index:index + period]:
+                repeats += 1
+            if repeats > 1 and period * repeats > best_period * best_repeats:
+                best_period, best_repeats = period, repeats
+
+        if best_period:
+            for item in items[index:index + best_period]:
+                shaped.extend(item)
+            indent = _FRAME.match(items[index][0][1]).group(1)
+            frames = "frame" if best_period == 1 else f"{best_period} frames"
+            shaped.append(
+                (items[index + best_period][0][0], f"{indent}[Previous {frames} repeated {best_repeats - 1} more times]")
+            )
+            index += best_period * best_repeats
+        else:
+            shaped.extend(items[index])
+            index += 1
+    return shaped
+
+
+def collapse_repeated_lines(lines: List[Line], similar: bool = False) -> List[Line]:
+    """
+    Collapses runs of at least REPEATED_LINES_MIN_RUN identical lines into
+    one line with a count. With `similar`, runs of lines that differ only in
+    their numbers keep their first and last line instead.
+    """
+    keys = [text for _, text in lines]
+    if similar:
+        # One pass over the joined text is much cheaper than one per line
+        keys = "\n".join(keys).translate(_DROP_DIGITS).split("\n")
+    shaped: List[Line] = []
+    index = 0
+    while index < len(lines):
+        number, text = lines[index]
+        end = index + 1
+        while end < len(lines) and keys[end] == keys[index]:
+            end += 1
+        run = end - index
+
+        if run < REPEATED_LINES_MIN_RUN:
+            shaped.append(lines[index])
+            index += 1
+            continue
+        if not text.strip():
+            shaped.append((number, text))
+        elif all(line[1] == text for line in lines[index:end]):
+            shaped.append((number, f"{text}  [line repeated {run} times]"))
+        else:
+            shaped.append(lines[index])
+            first, last = lines[index + 1][0], lines[end - 1][0] - 1
+            shaped.append((first, f"[... {run - 2} similar lines omitted (lines {first}-{last}) ...]"))
+            shaped.append(lines[end - 1])
+        index = end
+    return shaped
+
+
+def _size(lines: List[Line]) -> int:
+    return sum(len(text) + 1 for _, text in lines)
+
+
+def keep_head_and_tail(lines: List[Line], total_lines: int, max_chars: int, output_id: Optional[str]) -> List[Line]:
+    """Keeps the first and last lines within `max_chars`, with a marker for the rest."""
+    # No single line may take more than a quarter of the budget
+    line_cap = max(1, max_chars // 4)
+    lines = [
+        (number, text if len(text) <= line_cap else f"{text[:line_cap]} [... {len(text) - line_cap} more characters]")
+        for number, text in lines
+    ]
+    if _size(lines) <= max_chars:
+        return lines
+
+    head_budget = int(max_chars * TOOL_OUTPUT_HEAD_FRACTION)
+    head: List[Line] = []
+    size = 0
+    for line in lines:
+        if size + len(line[1]) + 1 > head_budget:
+            break
+        head.append(line)
+        size += len(line[1]) + 1
+
+    tail: List[Line] = []
+    for line in reversed(lines[len(head):]):
+        if size + len(line[1]) + 1 > max_chars:
+            break
+        tail.append(line)
+        size += len(line[1]) + 1
+    tail.reverse()
+
+    first_omitted = lines[len(head)][0]
+    last_omitted = (tail[0][0] if tail else total_lines + 1) - 1
+    where = f'; read_tool_output(output_id="{output_id}", start_line={first_omitted}) shows them' if output_id else ""
+    marker = f"[... lines {first_omitted}-{last_omitted} of {total_lines} omitted{where} ...]"
+    return head + [(first_omitted, marker)] + tail
+
+
+def shape_output(tool_name: str, text: str, store: Optional[OutputStore] = None) -> str:
+    """
+    Returns the form of a tool result that enters the history.
+
+    Args:
+        tool_name (str): The tool that produced the result.
+        text (str): The tool's result.
+        store (OutputStore, optional): Where the original is kept if the
+            result is shortened. Without a store the original is lost.
+
+    Returns:
+        str: The result itself if it needs no shaping, otherwise the shaped
+        result followed by a note naming the stored original.
+    """
+    if tool_name in UNSHAPED_TOOLS:
+        return text
+
+    original = text.split("\n")
+    lines: List[Line] = list(enumerate(original, start=1))
+    budget_chars = output_budget(tool_name) * CHARS_PER_TOKEN
+
+    # Lossless apart from line identity: counts are kept
+    shaped = collapse_repeated_lines(dedupe_stack_frames(lines) if 'File "' in text else lines)
+    if _size(shaped) > budget_chars:
+        shaped = collapse_repeated_lines(shaped, similar=True)
+    if len(shaped) == len(lines) and _size(shaped) <= budget_chars:
+        return text
+
+    # Only store (and spend a note on) results that really changed
+    output_id = store.put(text) if store is not None else None
+    if _size(shaped) > budget_chars:
+        shaped = keep_head_and_tail(shaped, len(original), budget_chars, output_id)
+
+    note = f"[Output shortened from {len(original)} lines (~{estimate_tokens(text)} tokens)"
+    if output_id:
+        note += f'; the full output is "{output_id}", readable with read_tool_output'
+    return "\n".join(line for _, line in shaped) + f"\n{note}]"
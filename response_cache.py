@@ -0,0 +1,172 @@
+"""
+Record/replay cache for model responses.
+
+The agent calls the model with `temperature=0.0`, so the same request is
+expected to produce the same response. `CachingClient` wraps a
+`genai.Client` and stores each response on disk, keyed on a canonical hash
+of the whole request: model name, config (system prompt, tool schemas,
+temperature) and the serialized conversation, less the measurements lines
+of script runs, which differ between otherwise identical runs. Modes:
+
+    passthrough  Always call the model; the cache is not used.
+    record       Serve cached responses; call the model on a miss and store
+                 the response. Re-running a task only pays for new turns.
+    replay       Serve cached responses only; a miss raises
+                 `ResponseCacheMiss`. No API key or network is needed, so
+                 reproducing and bisecting a recorded session is instant.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from config import RESPONSE_CACHE_DIR
+from functions.run_python_file import strip_run_stats
+
+MODES = ("passthrough", "record", "replay")
+
+
+class ResponseCacheMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def _canonical_content(content: types.Content) -> Dict[str, Any]:
+    """Serializes one message, without the run measurements in tool results."""
+    data = content.model_dump(mode="json", exclude_none=True)
+    for part in data.get("parts") or []:
+        response = (part.get("function_response") or {}).get("response") or {}
+        if isinstance(response.get("result"), str):
+            response["result"] = strip_run_stats(response["result"])
+    return data
+
+
+def request_key(model: str, contents: List[types.Content], config: Optional[types.GenerateContentConfig] = None) -> str:
+    """Returns the canonical SHA-256 of a `generate_content` request."""
+    payload = {
+        "model": model,
+        "config": config.model_dump(mode="json", exclude_none=True) if config is not None else None,
+        "contents": [_canonical_content(content) for content in contents],
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk store of model responses, one JSON file per request key, written
+    atomically so concurrent sessions and processes can share the directory.
+    """
+
+    def __init__(self, mode: str = "record", directory: str = RESPONSE_CACHE_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Unknown response cache mode: {mode!r} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[types.GenerateContentResponse]:
+        """Returns the recorded response for `key`, if there is one."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return types.GenerateContentResponse.model_validate(json.load(f)["response"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, model: str, response: types.GenerateContentResponse) -> None:
+        """Records a response."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"model": model, "response": response.model_dump(mode="json", exclude_none=True)}, f)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def lookup(self, request: Dict[str, Any]) -> Tuple[Optional[str], Optional[types.GenerateContentResponse]]:
+        """
+        Resolves a request against the cache.
+
+        Returns:
+            tuple: (key, cached response or None). The key is None in
+            passthrough mode.
+
+        Raises:
+            ResponseCacheMiss: In replay mode, if nothing was recorded.
+        """
+        if self.mode == "passthrough":
+            return None, None
+        key = request_key(request["model"], request["contents"], request.get("config"))
+        response = self.get(key)
+        if response is not None:
+            self.hits += 1
+            return key, response
+        self.misses += 1
+        if self.mode == "replay":
+            raise ResponseCacheMiss(
+                f"No recorded response for this request (key {key[:12]}); "
+                "record the session first or use --response-cache record"
+            )
+        return key, None
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class _CachingModels:
+    def __init__(self, models: Any, cache: ResponseCache):
+        self._models = models
+        self._cache = cache
+
+    def generate_content(self, **request: Any) -> types.GenerateContentResponse:
+        key, response = self._cache.lookup(request)
+        if response is None:
+            response = self._models.generate_content(**request)
+            if key is not None:
+                self._cache.put(key, request["model"], response)
+        return response
+
+
+class _AsyncCachingModels:
+    def __init__(self, models: Any, cache: ResponseCache):
+        self._models = models
+        self._cache = cache
+
+    async def generate_content(self, **request: Any) -> types.GenerateContentResponse:
+        key, response = self._cache.lookup(request)
+        if response is None:
+            response = await self._models.generate_content(**request)
+            if key is not None:
+                self._cache.put(key, request["model"], response)
+        return response
+
+
+class _CachingAio:
+    def __init__(self, aio: Any, cache: ResponseCache):
+        self.models = _AsyncCachingModels(aio.models if aio is not None else None, cache)
+
+
+class CachingClient:
+    """
+    Wraps a `genai.Client` (or anything with `.models` and `.aio.models`)
+    so `generate_content` goes through a `ResponseCache`. In replay mode the
+    wrapped client may be None.
+    """
+
+    def __init__(self, client: Any, cache: ResponseCache):
+        self.client = client
+        self.cache = cache
+        self.models = _CachingModels(client.models if client is not None else None, cache)
+        self.aio = _CachingAio(client.aio if client is not None else None, cache)
@@ -0,0 +1,241 @@
+"""
+Rate limiting and retries for model calls.
+
+A transient 429 or 5xx from the API used to end the whole session, wasting
+every token spent so far. `ModelScheduler` sits between a session and
+`generate_content`:
+
+    - A token bucket per limit (requests/minute and tokens/minute) paces
+      calls. Buckets are shared by every session in the process, so
+      concurrent sessions (e.g. under server.py) split one quota instead of
+      each assuming it owns it.
+    - Retryable errors (429, 500, 502, 503, 504 and transport failures) are
+      retried with exponential backoff and full jitter, honoring a server
+      supplied retry delay when there is one.
+    - Every wait respects the session's deadline: if the call cannot start
+      (or be retried) before it, `SessionDeadlineExceeded` is raised.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from google.genai import errors
+
+from config import (
+    MODEL_MAX_RETRIES,
+    MODEL_REQUESTS_PER_MINUTE,
+    MODEL_RETRY_BASE_DELAY_SECONDS,
+    MODEL_RETRY_MAX_DELAY_SECONDS,
+    MODEL_TOKENS_PER_MINUTE,
+)
+from history import estimate_history_tokens
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# "retryDelay": "31s" in the RetryInfo detail of a 429
+_RETRY_DELAY = re.compile(r"'retryDelay':\s*'(\d+(?:\.\d+)?)s'|\"retryDelay\":\s*\"(\d+(?:\.\d+)?)s\"")
+
+
+class SessionDeadlineExceeded(TimeoutError):
+    """Raised when a model call cannot complete before the session deadline."""
+
+
+class TokenBucket:
+    """
+    A token bucket with reserve-then-wait semantics.
+
+    `reserve` always takes the tokens, letting the balance go negative, and
+    returns how long the caller must wait before using them. Callers are
+    therefore served in reservation order, and a request larger than the
+    bucket's capacity is still admitted (after a proportionally long wait).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Returns tokens (or, with a negative amount, charges extra ones)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requests/minute and tokens/minute limits; a limit of 0 disables it."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def reserve(self, tokens: int) -> float:
+        """Reserves one request of `tokens` tokens; returns the seconds to wait."""
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(min(tokens, self.tokens.capacity)))
+        return delay
+
+    def cancel(self, tokens: int) -> None:
+        """Gives back a reservation of `tokens` tokens that will not be used."""
+        if self.requests is not None:
+            self.requests.refund(1)
+        if self.tokens is not None:
+            self.tokens.refund(min(tokens, self.tokens.capacity))
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Corrects the token bucket once the real usage of a call is known."""
+        if self.tokens is not None and actual is not None:
+            self.tokens.refund(min(estimated, self.tokens.capacity) - actual)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Returns True for errors worth retrying: rate limits, server errors, network failures."""
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+def _server_retry_delay(error: BaseException) -> Optional[float]:
+    """Returns the retry delay requested by the server, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_DELAY.search(str(getattr(error, "details", "")))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return None
+
+
+class ModelScheduler:
+    """
+    Paces and retries `generate_content` calls.
+
+    Args:
+        limiter (RateLimiter): The (usually shared) rate limits.
+        max_retries (int): Retries after the first attempt of a call.
+        base_delay (float): Backoff before the first retry, in seconds.
+        max_delay (float): Upper bound of a single backoff, in seconds.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        max_retries: int = MODEL_MAX_RETRIES,
+        base_delay: float = MODEL_RETRY_BASE_DELAY_SECONDS,
+        max_delay: float = MODEL_RETRY_MAX_DELAY_SECONDS,
+    ):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, or the server's delay if it asked for one."""
+        server_delay = _server_retry_delay(error)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _check_deadline(delay: float, deadline: Optional[float], what: str) -> None:
+        if deadline is not None and time.monotonic() + delay > deadline:
+            raise SessionDeadlineExceeded(f"Session deadline reached before the model call could {what}")
+
+    def _reserve(self, estimated: int, deadline: Optional[float]) -> float:
+        """Reserves one attempt and returns the wait before it, unless it cannot start in time."""
+        delay = self.limiter.reserve(estimated)
+        try:
+            self._check_deadline(delay, deadline, "start")
+        except SessionDeadlineExceeded:
+            # Never sent, so the capacity goes back to the other callers
+            self.limiter.cancel(estimated)
+            raise
+        return delay
+
+    def _on_error(self, error: BaseException, attempt: int, deadline: Optional[float]) -> float:
+        """Returns the backoff before the next attempt, or re-raises the error."""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            raise error
+        delay = self._backoff(attempt, error)
+        self._check_deadline(delay, deadline, "be retried")
+        self.retries += 1
+        print(f"⚠️ Model call failed ({error}); retrying in {delay:.1f}s")
+        return delay
+
+    def _usage_tokens(self, response: Any) -> Optional[int]:
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", None) if usage is not None else None
+
+    def generate(self, call: Callable[..., Any], request: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+        """Runs `call(**request)` (a synchronous `generate_content`) under the limits."""
+        estimated = estimate_history_tokens(request["contents"])
+        attempt = 0
+        while True:
+            delay = self._reserve(estimated, deadline)
+            if delay:
+                time.sleep(delay)
+            try:
+                response = call(**request)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, deadline))
+                attempt += 1
+                continue
+            self.limiter.settle(estimated, self._usage_tokens(response))
+            return response
+
+    async def agenerate(self, call: Callable[..., Any], request: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+        """Async variant of `generate` for `client.aio.models.generate_content`."""
+        estimated = estimate_history_tokens(request["contents"])
+        attempt = 0
+        while True:
+            delay = self._reserve(estimated, deadline)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                response = await call(**request)
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, deadline))
+                attempt += 1
+                continue
+            self.limiter.settle(estimated, self._usage_tokens(response))
+            return response
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler() -> ModelScheduler:
+    """Returns a scheduler using the process-wide rate limits from config."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(MODEL_REQUESTS_PER_MINUTE, MODEL_TOKENS_PER_MINUTE)
+    return ModelScheduler(_shared_limiter)
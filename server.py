@@ -0,0 +1,331 @@
+"""
+Long-running agent server.
+
+Starting `python main.py "<prompt>"` for every task re-imports the SDK and
+builds a fresh client each time. The server keeps a single warm
+`genai.Client` (and its pooled HTTP connections) alive and runs many
+independent agent sessions on it as asyncio tasks.
+
+Protocol:
+    Clients connect to a Unix domain socket (or TCP "host:port") and send
+    one JSON object per line. Each request is answered with one JSON line,
+    in completion order, so a client may pipeline several requests.
+
+    Request:
+        {"id": "...", "session": "...", "prompt": "...", "working_directory": "..."}
+
+        - "id" (optional) is echoed back to match responses to requests.
+        - "session" (optional) continues an existing conversation; if it is
+          missing or unknown, a new session is created under that name.
+        - "working_directory" (optional) is only used when the session is
+          created. It must lie inside the server's allowed root (relative
+          paths are taken from there), which is also the default.
+        - {"op": "close", "session": "..."} forgets a session.
+
+    Response:
+        {"id": "...", "session": "...", "status": "ok", "result": "...", "iterations": 3}
+        {"id": "...", "session": "...", "status": "error", "error": "..."}
+
+Security:
+    A Unix socket is created in a directory only the server's user may
+    enter; the server refuses to listen in a directory that others can
+    reach. A TCP address has no such protection and should stay on
+    localhost.
+
+Usage:
+    python server.py [--address /run/user/1000/ai-agent.sock | 127.0.0.1:8765] [--allowed-root DIR]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import stat
+import uuid
+from typing import Any, Dict, Optional
+
+# Third-party imports
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+# Local imports
+from agent import AgentSession
+from scheduler import shared_scheduler
+from response_cache import MODES as RESPONSE_CACHE_MODES, CachingClient, ResponseCache
+from config import (
+    MAX_TOOL_WORKERS,
+    PYTHON_EXEC_MODE,
+    RESPONSE_CACHE_MODE,
+    RUN_CACHE_ENABLED,
+    SERVER_ADDRESS,
+    SERVER_ALLOWED_ROOT,
+    SERVER_MAX_CONCURRENT_RUNS,
+    SESSION_DEADLINE_SECONDS,
+    SESSION_MAX_CONCURRENT_RUNS,
+)
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class ManagedSession:
+    """An `AgentSession` plus the lock that limits its concurrent runs."""
+
+    def __init__(self, session: AgentSession):
+        self.session = session
+        self.semaphore = asyncio.Semaphore(SESSION_MAX_CONCURRENT_RUNS)
+
+
+class AgentServer:
+    """
+    Serves agent sessions over a local socket using one shared async client.
+
+    Args:
+        client: A `genai.Client`; its `aio` interface is used for all sessions.
+        max_concurrent_runs (int): Global limit on agent loops running at once.
+        max_workers (int): Tool-call concurrency within a single model turn.
+        exec_mode (str): How run_python_file starts scripts.
+        cache_runs (bool): Whether run_python_file reuses identical runs.
+        verbose (bool): Whether sessions print detailed logs.
+        rate_limit (bool): Whether model calls go through the shared rate
+            limiter and retry scheduler (see scheduler.py).
+        deadline_seconds (float): Wall-clock budget for each run of a
+            session; None or 0 for no limit.
+        allowed_root (str): The directory clients' working directories
+            must lie in; also the default working directory.
+    """
+
+    def __init__(
+        self,
+        client: genai.Client,
+        max_concurrent_runs: int = SERVER_MAX_CONCURRENT_RUNS,
+        max_workers: int = MAX_TOOL_WORKERS,
+        exec_mode: str = PYTHON_EXEC_MODE,
+        cache_runs: bool = RUN_CACHE_ENABLED,
+        verbose: bool = False,
+        rate_limit: bool = True,
+        deadline_seconds: Optional[float] = SESSION_DEADLINE_SECONDS,
+        allowed_root: str = SERVER_ALLOWED_ROOT,
+    ):
+        self.client = client
+        self.allowed_root = os.path.realpath(allowed_root)
+        self.rate_limit = rate_limit
+        self.deadline_seconds = deadline_seconds
+        self.max_workers = max_workers
+        self.tool_options = {
+            "run_python_file": {"exec_mode": exec_mode, "use_cache": cache_runs},
+        }
+        self.verbose = verbose
+        self.sessions: Dict[str, ManagedSession] = {}
+        self.global_semaphore = asyncio.Semaphore(max_concurrent_runs)
+
+    def _get_session(self, session_id: str, working_directory: Optional[str]) -> ManagedSession:
+        """Returns the named session, creating it on first use."""
+        managed = self.sessions.get(session_id)
+        if managed is None:
+            requested = working_directory
+            # Symlinks are resolved so a link cannot lead out of the root
+            working_directory = os.path.realpath(os.path.join(self.allowed_root, working_directory or ""))
+            if os.path.commonpath([self.allowed_root, working_directory]) != self.allowed_root:
+                raise ValueError(f'"{requested}" is outside the allowed root directory')
+            if not os.path.isdir(working_directory):
+                raise ValueError(f'"{requested}" is not a directory')
+            managed = ManagedSession(
+                AgentSession(
+                    working_directory=working_directory,
+                    verbose=self.verbose,
+                    max_workers=self.max_workers,
+                    tool_options=self.tool_options,
+                    # All sessions share the process-wide rate limits
+                    scheduler=shared_scheduler() if self.rate_limit else None,
+                    deadline_seconds=self.deadline_seconds,
+                )
+            )
+            self.sessions[session_id] = managed
+        return managed
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Processes one decoded request and returns the response object."""
+        session_id = request.get("session") or uuid.uuid4().hex
+        reply = {"id": request.get("id"), "session": session_id}
+
+        if request.get("op") == "close":
+            self.sessions.pop(session_id, None)
+            return {**reply, "status": "ok"}
+
+        prompt = request.get("prompt")
+        if not prompt:
+            return {**reply, "status": "error", "error": 'Missing "prompt"'}
+
+        try:
+            managed = self._get_session(session_id, request.get("working_directory"))
+            # Per-session limit first, so queued follow-ups of a busy session
+            # do not hold global slots while they wait.
+            async with managed.semaphore:
+                async with self.global_semaphore:
+                    session = managed.session
+                    session.add_user_prompt(prompt)
+                    result = await session.run_async(self.client)
+            return {
+                **reply,
+                "status": "ok",
+                "result": result,
+                "iterations": session.iteration,
+            }
+        except Exception as e:
+            return {**reply, "status": "error", "error": str(e)}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads JSON lines from a client and answers each one as it completes."""
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def answer(line: bytes) -> None:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                response = {"status": "error", "error": f"Invalid request: {e}"}
+            else:
+                response = await self.handle_request(request)
+            async with write_lock:
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(answer(line))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str = SERVER_ADDRESS) -> None:
+        """Listens on a Unix socket path or a TCP "host:port" until cancelled."""
+        host, _, port = address.rpartition(":")
+        if port.isdigit() and host:
+            server = await asyncio.start_server(self.handle_connection, host, int(port))
+        else:
+            _check_private_directory(os.path.dirname(os.path.abspath(address)))
+            try:
+                if stat.S_ISSOCK(os.lstat(address).st_mode):
+                    os.unlink(address)  # left over from an earlier run
+            except FileNotFoundError:
+                pass
+            server = await asyncio.start_unix_server(self.handle_connection, address)
+            os.chmod(address, 0o600)
+
+        print(f"🤖 Agent server listening on {address}")
+        async with server:
+            await server.serve_forever()
+
+
+def _check_private_directory(directory: str) -> None:
+    """
+    Creates the socket's directory with mode 0700 if needed, and refuses a
+    directory that is not owned by this user or that others may enter.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(
+            f'"{directory}" must be owned by this user and not accessible to others (mode 0700) to hold the socket'
+        )
+
+
+def create_client(api_key: str, max_connections: int) -> genai.Client:
+    """Creates the shared client with a connection pool sized for the server."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+    )
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(async_client_args={"limits": limits}),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Agent server mode")
+    parser.add_argument("--address", default=SERVER_ADDRESS, help="Unix socket path or host:port")
+    parser.add_argument(
+        "--max-concurrent-runs",
+        type=int,
+        default=SERVER_MAX_CONCURRENT_RUNS,
+        help="Maximum number of agent loops running at once across all sessions",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_TOOL_WORKERS,
+        help="Maximum number of tool calls from one model turn to run concurrently",
+    )
+    parser.add_argument(
+        "--exec-mode",
+        choices=["subprocess", "forkserver"],
+        default="forkserver",
+        help="How run_python_file starts scripts (the server defaults to the warm fork server)",
+    )
+    parser.add_argument(
+        "--cache-runs",
+        action="store_true",
+        default=RUN_CACHE_ENABLED,
+        help="Reuse the output of identical script runs over an unchanged workspace",
+    )
+    parser.add_argument(
+        "--response-cache",
+        choices=RESPONSE_CACHE_MODES,
+        default=RESPONSE_CACHE_MODE,
+        help="Record model responses to disk, or replay recorded ones without calling the API",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        default=SESSION_DEADLINE_SECONDS,
+        help="Wall-clock budget for each run of a session; 0 for no limit",
+    )
+    parser.add_argument(
+        "--allowed-root",
+        default=SERVER_ALLOWED_ROOT,
+        help="Directory that clients' working directories must lie in (default: the sandbox)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable detailed logging")
+    args = parser.parse_args()
+
+    # Replaying recorded responses needs no key
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key is None and args.response_cache != "replay":
+        raise RuntimeError("GEMINI_API_KEY not found. Please create a .env file with your key.")
+
+    client = create_client(api_key, args.max_concurrent_runs) if api_key else None
+    if args.response_cache != "passthrough":
+        client = CachingClient(client, ResponseCache(args.response_cache))
+    server = AgentServer(
+        client,
+        max_concurrent_runs=args.max_concurrent_runs,
+        max_workers=args.max_workers,
+        exec_mode=args.exec_mode,
+        cache_runs=args.cache_runs,
+        verbose=args.verbose,
+        rate_limit=args.response_cache != "replay",
+        deadline_seconds=args.deadline,
+        allowed_root=args.allowed_root,
+    )
+
+    try:
+        asyncio.run(server.serve(args.address))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from functions.bulk_files import read_files, write_files
+
+def print_result(description: str, result: str) -> None:
+    """Helper to print test results with clear separation."""
+    print(f"--- TEST: {description} ---")
+    print(result)
+    print("\n" + "="*40 + "\n")
+
+def main():
+    """
+    Manual integration tests for 'read_files' and 'write_files'.
+    Verifies batched reads with line ranges, all-or-nothing writes and security constraints.
+    """
+
+    # Test 1: Read two files, one of them as a line range
+    # Expected: Both files under "=== path ===" headers; lines 1-5 of the calculator module only
+    print_result(
+        "Read main.py and lines 1-5 of pkg/calculator.py",
+        read_files("calculator", [{"file_path": "main.py"}, {"file_path": "pkg/calculator.py", "start_line": 1, "end_line": 5}]),
+    )
+
+    # Test 2: A missing file among existing ones
+    # Expected: Content of main.py, inline error for the missing file
+    print_result(
+        "Read with one missing file",
+        read_files("calculator", [{"file_path": "main.py"}, {"file_path": "missing.py"}]),
+    )
+
+    # Test 3: Write a module and a file in a new subdirectory together
+    # Expected: Success message listing both files
+    print_result(
+        "Write two files at once",
+        write_files(
+            "calculator",
+            [
+                {"file_path": "bulk_demo.py", "content": "VALUE = 1\n"},
+                {"file_path": "bulk_demo/notes.txt", "content": "written together\n"},
+            ],
+        ),
+    )
+
+    # Test 4: Security Check - One target outside the sandbox
+    # Expected: Error message; bulk_demo.py keeps "VALUE = 1"
+    print_result(
+        "Security Check: All or nothing with one path outside the sandbox",
+        write_files(
+            "calculator",
+            [{"file_path": "bulk_demo.py", "content": "VALUE = 2\n"}, {"file_path": "../escape.txt", "content": "no"}],
+        )
+        + "\n" + read_files("calculator", [{"file_path": "bulk_demo.py"}]),
+    )
+
+if __name__ == "__main__":
+    main()
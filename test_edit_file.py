@@ -0,0 +1,61 @@
+from functions.edit_file import edit_file
+from functions.write_file import write_file
+
+def print_result(description: str, result: str) -> None:
+    """Helper to print test results with clear separation."""
+    print(f"--- TEST: {description} ---")
+    print(result)
+    print("\n" + "="*40 + "\n")
+
+def main():
+    """
+    Manual integration tests for 'edit_file'.
+    Verifies search/replace edits, unified diffs, failure reporting and security constraints.
+    """
+
+    # Setup: a scratch file inside the sandbox
+    write_file("calculator", "edit_demo.py", "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n")
+
+    # Test 1: Search/replace block
+    # Expected: Success, 1 edit applied
+    print_result(
+        "Search/replace edit",
+        edit_file("calculator", "edit_demo.py", edits=[{"search": "return a + b", "replace": "return b + a"}])
+    )
+
+    # Test 2: Unified diff
+    # Expected: Success, 1 hunk applied
+    patch = (
+        "--- a/edit_demo.py\n"
+        "+++ b/edit_demo.py\n"
+        "@@ -5,2 +5,3 @@\n"
+        " def sub(a, b):\n"
+        "-    return a - b\n"
+        "+    result = a - b\n"
+        "+    return result\n"
+    )
+    print_result("Unified diff", edit_file("calculator", "edit_demo.py", patch=patch))
+
+    # Test 3: Search text that does not exist
+    # Expected: Error explaining that the search text was not found; file unchanged
+    print_result(
+        "Error: Missing search text",
+        edit_file("calculator", "edit_demo.py", edits=[{"search": "return a * b", "replace": "x"}])
+    )
+
+    # Test 4: Hunk whose context does not match
+    # Expected: Error naming the hunk, the line and the mismatching text
+    print_result(
+        "Error: Stale hunk",
+        edit_file("calculator", "edit_demo.py", patch="@@ -1,2 +1,2 @@\n def add(a, b):\n-    return a + b\n+    return a + b + 0\n")
+    )
+
+    # Test 5: Security Check - Attempt to edit outside the sandbox
+    # Expected: Error message
+    print_result(
+        "Security Check: Edit outside allowed directory",
+        edit_file("calculator", "../main.py", edits=[{"search": "import", "replace": "import"}])
+    )
+
+if __name__ == "__main__":
+    main()
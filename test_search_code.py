@@ -0,0 +1,41 @@
+import os
+
+from functions.search_code import search_code
+from functions.write_file import write_file
+
+def print_result(description: str, result: str) -> None:
+    """Helper to print test results with clear separation."""
+    print(f"--- TEST: {description} ---")
+    print(result)
+    print("\n" + "="*40 + "\n")
+
+def main():
+    """
+    Manual integration tests for 'search_code'.
+    Verifies literal and regex queries, incremental index updates, result caps and security constraints.
+    """
+
+    # Test 1: Literal search for a definition
+    # Expected: pkg/calculator.py with the line of the class definition
+    print_result("Literal search", search_code("calculator", "class Calculator"))
+
+    # Test 2: Regex search
+    # Expected: Every method definition in pkg/calculator.py
+    print_result("Regex search", search_code("calculator", r"def _?\w+\(self", regex=True))
+
+    # Test 3: Incremental update after write_file
+    # Expected: The new file is found immediately
+    write_file("calculator", "search_demo.py", "def freshly_written_helper():\n    return 42\n")
+    print_result("Search after write_file", search_code("calculator", "freshly_written_helper"))
+    os.remove(os.path.join("calculator", "search_demo.py"))
+
+    # Test 4: Result cap
+    # Expected: 3 matches followed by a truncation note
+    print_result("Result cap", search_code("calculator", "self", max_results=3))
+
+    # Test 5: Security Check - Attempt to search outside the sandbox
+    # Expected: Error message
+    print_result("Security Check: Search outside allowed directory", search_code("calculator", "import", directory="../"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from google.genai import types
+
+from agent import AgentSession, call_function
+from config import RUN_MAX_CPU_SECONDS
+
+
+class TestCallFunction(unittest.TestCase):
+    """
+    Tests how the host turns a function call of the model into a tool call.
+
+    These tests ensure that:
+    1. Arguments outside the tool's declared schema never reach the tool.
+    2. Host-side options still do.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a script that reports its CPU limit."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "limit.py"), "w") as f:
+            f.write("import resource\nprint('cpu', resource.getrlimit(resource.RLIMIT_CPU)[0])\n")
+
+    def call(self, name, args, tool_options=None):
+        part = types.Part.from_function_call(name=name, args=args)
+        content = call_function(part.function_call, working_directory=self.working_directory, tool_options=tool_options)
+        return content.parts[0].function_response.response
+
+    def test_undeclared_limits_are_ignored(self):
+        """The model cannot lift the resource limits of a run."""
+        response = self.call(
+            "run_python_file",
+            {"file_path": "limit.py", "limits": {"cpu_seconds": None}, "use_cache": False},
+        )
+        self.assertIn(f"cpu {RUN_MAX_CPU_SECONDS}", response["result"])
+
+    def test_undeclared_host_objects_are_ignored(self):
+        """Keyword-only parameters such as `store` cannot be set by the model."""
+        response = self.call("read_tool_output", {"output_id": "out-1", "store": "not a store"})
+        self.assertNotIn("Error executing tool", response["result"])
+
+    def test_tool_options_are_applied(self):
+        """The host's own options still reach the tool."""
+        response = self.call(
+            "run_python_file",
+            {"file_path": "limit.py"},
+            tool_options={"run_python_file": {"limits": {"cpu_seconds": 7}, "use_cache": False}},
+        )
+        self.assertIn("cpu 7", response["result"])
+
+
+class TestSessionDeadline(unittest.TestCase):
+    """
+    Tests the wall-clock budget of a session.
+
+    These tests ensure that:
+    1. A session has no deadline unless one is given.
+    2. A given deadline applies to each run.
+    """
+
+    def setUp(self):
+        """Creates an empty sandbox."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+
+    def test_no_deadline_by_default(self):
+        """Plain sessions (e.g. from main.py) are never cut off."""
+        self.assertIsNone(AgentSession(working_directory=self.working_directory)._deadline())
+
+    def test_deadline_when_given(self):
+        """Batch and server sessions opt in with `deadline_seconds`."""
+        session = AgentSession(working_directory=self.working_directory, deadline_seconds=60)
+        self.assertIsNotNone(session._deadline())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from batch import clone_workspace
+
+
+class TestCloneWorkspace(unittest.TestCase):
+    """
+    Tests copying the template workspace of a batch task.
+
+    These tests ensure that:
+    1. The clone holds the template's files, not a copy of the template directory.
+    2. An existing destination is refused and left as it was.
+    """
+
+    def setUp(self):
+        """Creates a template with a nested file."""
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.template = os.path.join(self.root, "template")
+        os.makedirs(os.path.join(self.template, "pkg"))
+        with open(os.path.join(self.template, "pkg", "module.py"), "w") as f:
+            f.write("x = 1\n")
+        self.destination = os.path.join(self.root, "task-1")
+
+    def test_clone(self):
+        """The template's contents end up directly in the destination."""
+        clone_workspace(self.template, self.destination)
+        self.assertEqual(os.listdir(self.destination), ["pkg"])
+        with open(os.path.join(self.destination, "pkg", "module.py")) as f:
+            self.assertEqual(f.read(), "x = 1\n")
+
+    def test_existing_destination(self):
+        """A destination that exists is neither copied into nor removed."""
+        os.mkdir(self.destination)
+        with open(os.path.join(self.destination, "result.txt"), "w") as f:
+            f.write("from an earlier batch\n")
+        with self.assertRaises(FileExistsError):
+            clone_workspace(self.template, self.destination)
+        self.assertEqual(os.listdir(self.destination), ["result.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
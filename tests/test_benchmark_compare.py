@@ -0,0 +1,73 @@
+import copy
+import unittest
+
+from benchmarks.run import compare
+
+BASELINE = {
+    "config": {"files": 200},
+    "machine": {"python": "3.12.1", "implementation": "CPython", "platform": "Linux", "calibration_seconds": 0.1},
+    "scenarios": {
+        "explore": {
+            "iterations_per_sec": 100.0,
+            "tools": {"search_code": {"calls": 5, "p50": 0.010, "p95": 0.020, "max": 0.020}},
+        },
+    },
+    "peak_rss_kb": 50_000,
+}
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    """
+    Tests comparing benchmark results with a recorded baseline.
+
+    These tests ensure that:
+    1. A slowdown beyond the tolerance is reported; one within it is not.
+    2. Timings from a slower machine are scaled by the calibration ratio.
+    3. Results from another Python version or workspace are not compared.
+    """
+
+    def setUp(self):
+        """Starts from results identical to the baseline."""
+        self.results = copy.deepcopy(BASELINE)
+
+    def tool(self):
+        return self.results["scenarios"]["explore"]["tools"]["search_code"]
+
+    def test_identical_results_pass(self):
+        """The baseline compared with itself has no regressions."""
+        self.assertEqual(compare(self.results, BASELINE, 0.5), [])
+
+    def test_slowdown_is_reported(self):
+        """Twice the p50 and half the iteration rate are both regressions."""
+        self.tool()["p50"] = 0.020
+        self.results["scenarios"]["explore"]["iterations_per_sec"] = 50.0
+        regressions = compare(self.results, BASELINE, 0.5)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("explore/search_code: p50 20.00 ms (baseline 10.00 ms)", regressions)
+
+    def test_small_slowdown_is_tolerated(self):
+        """A slowdown within the tolerance passes."""
+        self.tool()["p50"] = 0.014
+        self.assertEqual(compare(self.results, BASELINE, 0.5), [])
+
+    def test_slower_machine_is_scaled(self):
+        """On a machine twice as slow, twice the time is no regression, but three times is."""
+        self.results["machine"] = {**BASELINE["machine"], "platform": "Other", "calibration_seconds": 0.2}
+        self.tool()["p50"] = 0.020
+        self.results["scenarios"]["explore"]["iterations_per_sec"] = 50.0
+        self.assertEqual(compare(self.results, BASELINE, 0.5), [])
+        self.tool()["p50"] = 0.035
+        self.assertEqual(compare(self.results, BASELINE, 0.5), ["explore/search_code: p50 35.00 ms (baseline 20.00 ms)"])
+
+    def test_not_comparable(self):
+        """Another Python minor version or workspace configuration is refused outright."""
+        self.results["machine"]["python"] = "3.13.0"
+        self.assertIn("not comparable", compare(self.results, BASELINE, 0.5)[0])
+        self.results["machine"]["python"] = "3.12.7"
+        self.assertEqual(compare(self.results, BASELINE, 0.5), [])
+        self.results["config"] = {"files": 10}
+        self.assertIn("not comparable", compare(self.results, BASELINE, 0.5)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.bulk_files import WriteTransaction, _journal_dir, recover_interrupted_writes, write_files
+
+
+class TestWriteRecovery(unittest.TestCase):
+    """
+    Tests the recovery of write_files transactions cut short by a crash.
+
+    These tests ensure that:
+    1. A transaction that died while staging is rolled back completely.
+    2. A journal left empty is removed instead of being skipped forever.
+    3. The journal of a running transaction is left alone.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with one existing file."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.addCleanup(shutil.rmtree, _journal_dir(self.working_directory), True)
+        self.existing = os.path.join(self.working_directory, "a.py")
+        with open(self.existing, "w") as f:
+            f.write("old\n")
+        os.makedirs(_journal_dir(self.working_directory), exist_ok=True)
+
+    def journal_path(self, name):
+        return os.path.join(_journal_dir(self.working_directory), name)
+
+    def test_crash_while_staging(self):
+        """Staged files, backups and new directories are removed; targets are untouched."""
+        new_file = os.path.join(self.working_directory, "pkg", "b.py")
+        writes = [(self.existing, "new\n"), (new_file, "x = 1\n")]
+        transaction = WriteTransaction(self.working_directory)
+        transaction._make_plan(writes)
+        with open(self.journal_path(f"{transaction.transaction_id}.journal"), "w") as f:
+            f.write(json.dumps(transaction.plan) + "\n")
+        # Dies after staging the first file only
+        transaction._stage(writes[:1])
+
+        self.assertEqual(recover_interrupted_writes(self.working_directory), 1)
+        self.assertEqual(sorted(os.listdir(self.working_directory)), ["a.py"])
+        with open(self.existing) as f:
+            self.assertEqual(f.read(), "old\n")
+        self.assertEqual(os.listdir(_journal_dir(self.working_directory)), [])
+
+    def test_empty_journal_is_removed(self):
+        """A journal without a plan is from a transaction that staged nothing."""
+        open(self.journal_path("0123456789ab.journal"), "w").close()
+        self.assertEqual(recover_interrupted_writes(self.working_directory), 1)
+        self.assertEqual(os.listdir(_journal_dir(self.working_directory)), [])
+
+    def test_locked_journal_is_kept(self):
+        """A journal its transaction still holds is not recovered."""
+        with open(self.journal_path("0123456789ab.journal"), "w") as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            self.assertEqual(recover_interrupted_writes(self.working_directory), 0)
+        self.assertEqual(os.listdir(_journal_dir(self.working_directory)), ["0123456789ab.journal"])
+
+    def test_write_files_leaves_nothing_behind(self):
+        """A successful call leaves no journal, temporary file or backup."""
+        result = write_files(
+            self.working_directory,
+            [{"file_path": "a.py", "content": "new\n"}, {"file_path": "pkg/b.py", "content": "x = 1\n"}],
+        )
+        self.assertTrue(result.startswith("Successfully wrote 2 files"), result)
+        self.assertEqual(sorted(os.listdir(self.working_directory)), ["a.py", "pkg"])
+        self.assertEqual(os.listdir(os.path.join(self.working_directory, "pkg")), ["b.py"])
+        self.assertEqual(os.listdir(_journal_dir(self.working_directory)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from call_ledger import CallLedger
+from functions.write_file import write_file
+
+
+class TestCallLedger(unittest.TestCase):
+    """
+    Tests the detection of tool calls that make no progress.
+
+    These tests ensure that:
+    1. Rewriting a file with the content a write just gave it is no progress.
+    2. A write that changes a file is, as is any write after the file changed.
+    3. Repeated runs only make progress while their output changes.
+    """
+
+    def setUp(self):
+        """Creates an empty sandbox and a ledger for it."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.ledger = CallLedger(self.working_directory, max_duplicate_rounds=2)
+
+    def round(self, name, args, result=None):
+        """Runs one call as a model turn of its own; returns True if it made progress."""
+        self.ledger.start_round(0)
+        ticket = self.ledger.begin(name, args)
+        if result is None:
+            result = write_file(self.working_directory, **args)
+        self.ledger.finish(ticket, result)
+        self.ledger.end_round()
+        return self.ledger.stalled_rounds == 0
+
+    def test_identical_rewrite_is_no_progress(self):
+        """Writing the same content twice in a row only counts once."""
+        args = {"file_path": "a.py", "content": "x = 1\n"}
+        self.assertTrue(self.round("write_file", args))
+        self.assertFalse(self.round("write_file", args))
+        self.assertFalse(self.round("write_file", args))
+        self.assertTrue(self.ledger.stalled)
+
+    def test_changed_content_is_progress(self):
+        """A write with new content is progress, and so is going back."""
+        first = {"file_path": "a.py", "content": "x = 1\n"}
+        self.assertTrue(self.round("write_file", first))
+        self.assertTrue(self.round("write_file", {"file_path": "a.py", "content": "x = 2\n"}))
+        self.assertTrue(self.round("write_file", first))
+
+    def test_rewrite_after_outside_change_is_progress(self):
+        """A file changed by something else since is really rewritten."""
+        args = {"file_path": "a.py", "content": "x = 1\n"}
+        self.assertTrue(self.round("write_file", args))
+        with open(os.path.join(self.working_directory, "a.py"), "a") as f:
+            f.write("y = 2\n")
+        self.assertTrue(self.round("write_file", args))
+
+    def test_repeated_run_with_same_output(self):
+        """Runs only make progress while their output changes."""
+        args = {"file_path": "a.py"}
+        self.assertTrue(self.round("run_python_file", args, "STDOUT:\n1\n[Run stats: wall 0.10s]"))
+        self.assertFalse(self.round("run_python_file", args, "STDOUT:\n1\n[Run stats: wall 0.20s]"))
+        self.assertTrue(self.round("run_python_file", args, "STDOUT:\n2\n[Run stats: wall 0.10s]"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+import unittest
+
+from google.genai import types
+
+from agent import AgentSession
+from checkpoint import SessionCheckpoint
+from functions.read_tool_output import read_tool_output
+
+
+class TestResume(unittest.TestCase):
+    """
+    Tests resuming a session from its checkpoint.
+
+    These tests ensure that:
+    1. Stored tool outputs survive a resume, under the ids the history uses.
+    2. A follow-up prompt after an interrupted model turn leaves no call without a response.
+    """
+
+    def setUp(self):
+        """Creates a sandbox and a checkpoint directory."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def new_session(self):
+        checkpoint = SessionCheckpoint("test", self.directory)
+        return AgentSession(working_directory=self.working_directory, deadline_seconds=None, checkpoint=checkpoint)
+
+    def resume(self):
+        session = self.new_session()
+        session.restore(session.checkpoint.load())
+        return session
+
+    def test_stored_outputs_are_restored(self):
+        """An out-N id saved before the resume still pages its output."""
+        session = self.new_session()
+        session.checkpoint.create(self.working_directory)
+        session.add_user_prompt("Run the tests")
+        output_id = session.output_store.put("first\nsecond\n")
+        session.checkpoint.save(session.messages, session.iteration, None, session.output_store)
+
+        resumed = self.resume()
+        self.assertIn("second", read_tool_output(self.working_directory, output_id, store=resumed.output_store))
+        # New outputs do not reuse the ids of restored ones
+        self.assertNotEqual(resumed.output_store.put("third\n"), output_id)
+
+    def test_follow_up_answers_pending_calls(self):
+        """Calls of an interrupted model turn get a response before the next prompt."""
+        session = self.new_session()
+        session.checkpoint.create(self.working_directory)
+        session.add_user_prompt("Read a.py")
+        session.messages.append(
+            types.Content(
+                role="model",
+                parts=[types.Part.from_function_call(name="get_file_content", args={"file_path": "a.py"})],
+            )
+        )
+        session.checkpoint.save(session.messages, 1, None, session.output_store)
+
+        resumed = self.resume()
+        resumed.add_user_prompt("Read b.py instead")
+        response, prompt = resumed.messages[-2:]
+        self.assertEqual(response.parts[0].function_response.name, "get_file_content")
+        self.assertEqual(prompt.parts[0].text, "Read b.py instead")
+        self.assertIsNone(resumed.pending_tool_calls())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from executor import call_footprint, execute_function_calls
+
+
+def call(name, **args):
+    return SimpleNamespace(name=name, args=args)
+
+
+class TestCallFootprint(unittest.TestCase):
+    """
+    Tests which part of the workspace each tool call is said to touch.
+
+    These tests ensure that:
+    1. Reads and writes name their (normalized) path.
+    2. Multi-file calls stand for the deepest directory holding their files.
+    3. Session tools touch nothing; scripts and unknown tools touch everything.
+    """
+
+    def test_single_file_tools(self):
+        """Reads and writes of one file are reduced to that path."""
+        self.assertEqual(call_footprint("get_file_content", {"file_path": "./pkg//a.py"}), ("pkg/a.py", False))
+        self.assertEqual(call_footprint("get_files_info", {}), (".", False))
+        self.assertEqual(call_footprint("edit_file", {"file_path": "pkg/a.py"}), ("pkg/a.py", True))
+
+    def test_multi_file_tools(self):
+        """read_files and write_files cover the common directory of their files."""
+        files = [{"file_path": "pkg/a.py"}, {"file_path": "pkg/sub/b.py"}]
+        self.assertEqual(call_footprint("read_files", {"files": files}), ("pkg", False))
+        self.assertEqual(call_footprint("write_files", {"files": files[:1]}), ("pkg/a.py", True))
+        self.assertEqual(call_footprint("write_files", {"files": []}), (None, True))
+
+    def test_session_and_unknown_tools(self):
+        """read_tool_output touches no file; anything unknown may touch all of them."""
+        self.assertEqual(call_footprint("read_tool_output", {"output_id": "out-1"}), ("", False))
+        self.assertEqual(call_footprint("run_python_file", {"file_path": "main.py"}), (None, True))
+        self.assertEqual(call_footprint("made_up_tool", {}), (None, True))
+
+
+class TestExecuteFunctionCalls(unittest.TestCase):
+    """
+    Tests the scheduling of the tool calls of one model turn.
+
+    These tests ensure that:
+    1. Independent reads run at the same time.
+    2. A call conflicting with an earlier one starts after it has finished.
+    3. Scripts are barriers, and identical calls run one after the other.
+    4. Results come back in call order, with or without parallelism.
+    """
+
+    def setUp(self):
+        """Sets up an event log shared by the fake tools."""
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, event, index):
+        with self.lock:
+            self.events.append((event, index))
+
+    def run_calls(self, calls, max_workers=4):
+        """Runs `calls` with a fake tool that records its start and end and takes a moment."""
+
+        def call_fn(function_call):
+            # By identity: identical calls compare equal
+            index = next(index for index, other in enumerate(calls) if other is function_call)
+            self.record("start", index)
+            time.sleep(0.05)
+            self.record("end", index)
+            return index
+
+        return execute_function_calls(calls, call_fn, max_workers=max_workers)
+
+    def assertRunsAfter(self, later, earlier):
+        """Asserts that call `later` started only once call `earlier` had ended."""
+        self.assertLess(self.events.index(("end", earlier)), self.events.index(("start", later)))
+
+    def test_independent_reads_overlap(self):
+        """Two reads wait for each other at a barrier, which only works if both run at once."""
+        barrier = threading.Barrier(2, timeout=5)
+        calls = [call("get_file_content", file_path="a.py"), call("get_file_content", file_path="b.py")]
+        results = execute_function_calls(calls, lambda function_call: barrier.wait() is not None, max_workers=2)
+        self.assertEqual(results, [True, True])
+
+    def test_read_after_write_waits(self):
+        """A read of a file written earlier in the turn sees the write."""
+        calls = [
+            call("write_file", file_path="pkg/a.py", content="x"),
+            call("get_file_content", file_path="pkg/a.py"),
+            call("get_files_info", directory="pkg"),
+            call("get_file_content", file_path="other.py"),
+        ]
+        self.assertEqual(self.run_calls(calls), [0, 1, 2, 3])
+        self.assertRunsAfter(1, 0)
+        self.assertRunsAfter(2, 0)
+        # Unrelated to the write, so it does not wait for it
+        self.assertLess(self.events.index(("start", 3)), self.events.index(("end", 0)))
+
+    def test_write_waits_for_earlier_read(self):
+        """A write does not change a file under a read that came before it."""
+        calls = [call("get_file_content", file_path="a.py"), call("edit_file", file_path="a.py")]
+        self.run_calls(calls)
+        self.assertRunsAfter(1, 0)
+
+    def test_script_is_a_barrier(self):
+        """Running a script waits for every earlier call, and every later call waits for it."""
+        calls = [
+            call("get_file_content", file_path="a.py"),
+            call("run_python_file", file_path="main.py"),
+            call("get_file_content", file_path="b.py"),
+        ]
+        self.run_calls(calls)
+        self.assertRunsAfter(1, 0)
+        self.assertRunsAfter(2, 1)
+
+    def test_identical_calls_run_in_turn(self):
+        """The repeat of a read runs after the first, so the call ledger can answer it."""
+        calls = [call("get_files_info", directory="."), call("get_files_info", directory=".")]
+        self.run_calls(calls)
+        self.assertRunsAfter(1, 0)
+
+    def test_sequential_when_disabled(self):
+        """With one worker, calls run strictly in order."""
+        calls = [call("get_file_content", file_path=f"{name}.py") for name in "abc"]
+        self.assertEqual(self.run_calls(calls, max_workers=1), [0, 1, 2])
+        self.assertEqual(self.events, [(event, index) for index in range(3) for event in ("start", "end")])
+
+
+if __name__ == "__main__":
+    unittest.main()
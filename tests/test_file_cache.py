@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.file_cache import FileCache, file_signature
+
+
+class TestFileCacheBound(unittest.TestCase):
+    """
+    Tests the size bound and the eviction order of the file cache.
+
+    These tests ensure that:
+    1. The cached bytes never exceed the bound; the least recently used entries go first.
+    2. A hit makes an entry the most recently used one.
+    3. A file larger than the whole bound is never cached.
+    """
+
+    def setUp(self):
+        """Creates a cache that holds at most 100 bytes."""
+        self.cache = FileCache(max_bytes=100)
+
+    def put(self, name, size):
+        self.cache.put(name, (1, size, 1), "x" * size)
+
+    def test_least_recently_used_is_evicted(self):
+        """Adding past the bound drops the oldest entries."""
+        for name in "abc":
+            self.put(name, 40)
+        self.assertIsNone(self.cache.get("a", (1, 40, 1)))
+        self.assertIsNotNone(self.cache.get("b", (1, 40, 1)))
+        self.assertIsNotNone(self.cache.get("c", (1, 40, 1)))
+        self.assertEqual(self.cache.stats()["bytes"], 80)
+
+    def test_hit_refreshes_an_entry(self):
+        """An entry read since it was added outlives one that was not."""
+        self.put("a", 40)
+        self.put("b", 40)
+        self.cache.get("a", (1, 40, 1))
+        self.put("c", 40)
+        self.assertIsNotNone(self.cache.get("a", (1, 40, 1)))
+        self.assertIsNone(self.cache.get("b", (1, 40, 1)))
+
+    def test_oversized_file_is_not_cached(self):
+        """A file over the bound neither enters nor evicts anything."""
+        self.put("a", 40)
+        self.put("huge", 101)
+        self.assertIsNone(self.cache.get("huge", (1, 101, 1)))
+        self.assertIsNotNone(self.cache.get("a", (1, 40, 1)))
+        self.assertLessEqual(self.cache.stats()["bytes"], 100)
+
+    def test_replacing_an_entry_keeps_the_count(self):
+        """Storing a new version replaces the old one's bytes."""
+        self.put("a", 40)
+        self.put("a", 30)
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 0, "entries": 1, "bytes": 30})
+
+
+class TestFileCacheInvalidation(unittest.TestCase):
+    """
+    Tests that cached content is only served for the file version it came from.
+
+    These tests ensure that:
+    1. A change of mtime, size or inode makes the entry miss.
+    2. An unchanged file hits.
+    """
+
+    def setUp(self):
+        """Creates a file and caches its content."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "a.py")
+        self.write("x = 1\n")
+        self.cache = FileCache()
+        self.cache.put(self.path, self.signature(), "x = 1\n")
+
+    def write(self, content, path=None):
+        with open(path or self.path, "w") as f:
+            f.write(content)
+
+    def signature(self):
+        return file_signature(os.stat(self.path))
+
+    def test_unchanged_file_hits(self):
+        """The same version is served from the cache."""
+        self.assertEqual(self.cache.get(self.path, self.signature()), "x = 1\n")
+
+    def test_mtime_change_misses(self):
+        """Touching the file is enough to miss."""
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertIsNone(self.cache.get(self.path, self.signature()))
+
+    def test_size_change_misses(self):
+        """A rewrite of another length misses, even with the old mtime."""
+        st = os.stat(self.path)
+        self.write("x = 12\n")
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertIsNone(self.cache.get(self.path, self.signature()))
+
+    def test_inode_change_misses(self):
+        """A file replaced by another of the same size and mtime misses."""
+        st = os.stat(self.path)
+        replacement = os.path.join(self.directory, "a.py.new")
+        self.write("y = 2\n", replacement)
+        os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(replacement, self.path)
+        new = self.signature()
+        self.assertEqual(new[:2], (st.st_mtime_ns, st.st_size))
+        self.assertIsNone(self.cache.get(self.path, new))
+
+
+if __name__ == "__main__":
+    unittest.main()
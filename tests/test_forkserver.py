@@ -0,0 +1,34 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from functions.run_python_file import run_python_file
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "lists open descriptors through /proc")
+class TestForkServer(unittest.TestCase):
+    """
+    Tests what a script run through the fork server inherits.
+
+    These tests ensure that:
+    1. Only stdin, stdout and stderr are open when the script starts.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a script that lists its open descriptors."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "fds.py"), "w") as f:
+            # The listing itself holds one descriptor open, the lowest free one
+            f.write("import os\nprint('fds', sorted(int(fd) for fd in os.listdir('/proc/self/fd'))[:-1])\n")
+
+    def test_only_standard_streams_are_inherited(self):
+        """The server's sockets, pipes and selector are closed in the child."""
+        result = run_python_file(self.working_directory, "fds.py", exec_mode="forkserver", use_cache=False)
+        self.assertIn("fds [0, 1, 2]", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
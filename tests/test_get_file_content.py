@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from config import MMAP_THRESHOLD_BYTES
+from functions.get_file_content import get_file_content, is_binary
+
+
+class TestRangedReads(unittest.TestCase):
+    """
+    Tests reading part of a file with get_file_content.
+
+    These tests ensure that:
+    1. Line ranges return exactly the requested lines, with a header.
+    2. Ranges are clamped to the file, and impossible ones are errors.
+    3. Large (memory-mapped) files are read the same way.
+    4. Byte ranges return the requested bytes.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a ten-line file."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.write("lines.txt", "".join(f"line {number}\n" for number in range(1, 11)))
+
+    def write(self, name, content):
+        with open(os.path.join(self.working_directory, name), "w") as f:
+            f.write(content)
+
+    def read(self, name, **kwargs):
+        return get_file_content(self.working_directory, name, **kwargs)
+
+    def test_line_range(self):
+        """Lines 3 to 5 come back with a header naming them."""
+        result = self.read("lines.txt", start_line=3, end_line=5)
+        self.assertEqual(result, '[Lines 3-5 of 10 in "lines.txt"]\nline 3\nline 4\nline 5')
+
+    def test_open_ended_range(self):
+        """A range without an end runs to the last line."""
+        result = self.read("lines.txt", start_line=9)
+        self.assertEqual(result, '[Lines 9-10 of 10 in "lines.txt"]\nline 9\nline 10')
+
+    def test_range_is_clamped(self):
+        """An end past the last line stops at the last line."""
+        result = self.read("lines.txt", start_line=10, end_line=50)
+        self.assertEqual(result, '[Lines 10-10 of 10 in "lines.txt"]\nline 10')
+
+    def test_range_past_the_end(self):
+        """A start past the last line is an error."""
+        self.assertEqual(self.read("lines.txt", start_line=11), 'Error: "lines.txt" has only 10 lines.')
+
+    def test_invalid_ranges(self):
+        """Lines are 1-based, and line and byte ranges cannot be mixed."""
+        self.assertTrue(self.read("lines.txt", start_line=0).startswith("Error:"))
+        self.assertTrue(self.read("lines.txt", start_line=1, offset=0).startswith("Error:"))
+        self.assertTrue(self.read("lines.txt", offset=-1).startswith("Error:"))
+
+    def test_large_file_line_range(self):
+        """A memory-mapped file gives the same ranged result."""
+        line = "x" * 99 + "\n"
+        count = MMAP_THRESHOLD_BYTES // len(line) + 10
+        self.write("large.txt", "".join(f"{number:08d}{line[8:]}" for number in range(1, count + 1)))
+        result = self.read("large.txt", start_line=count - 1, end_line=count)
+        header, first, second = result.split("\n")
+        self.assertEqual(header, f'[Lines {count - 1}-{count} of {count} in "large.txt"]')
+        self.assertTrue(first.startswith(f"{count - 1:08d}"))
+        self.assertTrue(second.startswith(f"{count:08d}"))
+
+    def test_byte_range(self):
+        """offset/length return those bytes, with a header naming them."""
+        result = self.read("lines.txt", offset=7, length=6)
+        self.assertEqual(result, '[Bytes 7-13 of 71 in "lines.txt"]\nline 2')
+
+    def test_byte_range_past_the_end(self):
+        """An offset past the end of the file is an error."""
+        self.assertTrue(self.read("lines.txt", offset=1000).startswith("Error: offset 1000"))
+
+
+class TestBinaryDetection(unittest.TestCase):
+    """
+    Tests that binary files are refused instead of being decoded.
+
+    These tests ensure that:
+    1. NUL bytes, or mostly control bytes, mark data as binary.
+    2. Ordinary text, including tabs, escapes and invalid UTF-8, does not.
+    3. Whole-file, line-range and byte-range reads all refuse binary data.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a binary file."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "data.bin"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + bytes(range(256)))
+
+    def test_is_binary(self):
+        """The header sniff tells binary data from text."""
+        self.assertTrue(is_binary(b"abc\x00def"))
+        self.assertTrue(is_binary(bytes([1, 2, 3, 4, 5, 6]) + b"ab"))
+        self.assertFalse(is_binary(b"def main():\n\treturn '\x1b[1m'\r\n"))
+        self.assertFalse(is_binary("café".encode("utf-8") + b"\xff"))
+        self.assertFalse(is_binary(b""))
+
+    def test_binary_file_is_refused(self):
+        """Every kind of read refuses the binary file."""
+        for kwargs in ({}, {"start_line": 1, "end_line": 2}):
+            result = get_file_content(self.working_directory, "data.bin", **kwargs)
+            self.assertTrue(result.startswith('Error: "data.bin" appears to be a binary file'), result)
+        result = get_file_content(self.working_directory, "data.bin", offset=0, length=16)
+        self.assertTrue(result.startswith("Error: bytes 0-16"), result)
+
+    def test_invalid_utf8_text_is_read(self):
+        """A text file with a stray invalid byte is still readable."""
+        with open(os.path.join(self.working_directory, "latin.txt"), "wb") as f:
+            f.write(b"caf\xe9 au lait\n")
+        self.assertEqual(get_file_content(self.working_directory, "latin.txt"), "caf� au lait\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.get_files_info import get_files_info
+
+
+class TestGetFilesInfo(unittest.TestCase):
+    """
+    Tests listing the workspace with get_files_info.
+
+    These tests ensure that:
+    1. max_depth controls how far the listing descends.
+    2. Built-in ignore patterns and .gitignore files hide entries.
+    3. Patterns and extensions filter files.
+    4. A truncated listing continues exactly where it stopped with its cursor.
+    5. Symlinks are listed as links, not as what they point to.
+    """
+
+    def setUp(self):
+        """Creates a small tree with ignored entries."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        for rel_path in (
+            "main.py",
+            "README.md",
+            "pkg/__init__.py",
+            "pkg/core.py",
+            "pkg/sub/deep.py",
+            "pkg/__pycache__/core.cpython-312.pyc",
+            "build/out.txt",
+            "pkg/notes.log",
+        ):
+            self.write(rel_path, "x\n")
+        self.write(".gitignore", "build/\n*.log\n")
+
+    def write(self, rel_path, content):
+        path = os.path.join(self.working_directory, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def names(self, **kwargs):
+        """Returns the listed paths, without sizes."""
+        result = get_files_info(self.working_directory, **kwargs)
+        return [line[2:].split(":")[0] for line in result.splitlines() if line.startswith("- ")]
+
+    def test_top_level_only(self):
+        """Without max_depth only the directory itself is listed."""
+        self.assertEqual(self.names(), [".gitignore", "README.md", "main.py", "pkg"])
+
+    def test_max_depth(self):
+        """Each level of max_depth adds one level of subdirectories."""
+        self.assertEqual(
+            self.names(max_depth=1),
+            [".gitignore", "README.md", "main.py", "pkg", "pkg/__init__.py", "pkg/core.py", "pkg/sub"],
+        )
+        self.assertIn("pkg/sub/deep.py", self.names(max_depth=2))
+
+    def test_ignored_entries(self):
+        """__pycache__, and whatever .gitignore names, never show up."""
+        names = self.names(max_depth=10)
+        self.assertNotIn("build", names)
+        self.assertNotIn("pkg/notes.log", names)
+        self.assertFalse([name for name in names if "__pycache__" in name])
+
+    def test_subdirectory_paths(self):
+        """Paths are relative to the listed directory."""
+        self.assertEqual(self.names(directory="pkg"), ["__init__.py", "core.py", "sub"])
+
+    def test_filters(self):
+        """Extensions and patterns keep matching files only, without directories."""
+        self.assertEqual(self.names(max_depth=10, extensions=["md"]), ["README.md"])
+        self.assertEqual(self.names(max_depth=10, pattern="pkg/sub/*.py"), ["pkg/sub/deep.py"])
+        self.assertEqual(self.names(max_depth=10, pattern="c*.py"), ["pkg/core.py"])
+        result = get_files_info(self.working_directory, pattern="*.rs")
+        self.assertEqual(result, 'No files in "." match the given filters.')
+
+    def test_cursor(self):
+        """Pages follow each other without gaps or repeats."""
+        everything = self.names(max_depth=10)
+        first = get_files_info(self.working_directory, max_depth=10, limit=3)
+        self.assertIn('cursor="3"', first.splitlines()[-1])
+        pages = self.names(max_depth=10, limit=3)
+        cursor = 3
+        while cursor < len(everything):
+            pages += self.names(max_depth=10, limit=3, cursor=str(cursor))
+            cursor += 3
+        self.assertEqual(pages, everything)
+
+    def test_invalid_cursor(self):
+        """A cursor that is not a number is an error."""
+        self.assertEqual(get_files_info(self.working_directory, cursor="abc"), 'Error: Invalid cursor "abc"')
+
+    def test_symlinks_are_not_followed(self):
+        """A link to a directory is no directory, and its target's size is not shown."""
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        with open(os.path.join(outside, "secret.txt"), "w") as f:
+            f.write("x" * 5000)
+        os.symlink(outside, os.path.join(self.working_directory, "linked_dir"))
+        os.symlink(os.path.join(outside, "secret.txt"), os.path.join(self.working_directory, "linked_file"))
+        lines = get_files_info(self.working_directory, max_depth=1).splitlines()
+        linked = {line[2:].split(":")[0]: line for line in lines if "linked" in line}
+        self.assertEqual(sorted(linked), ["linked_dir", "linked_file"])
+        self.assertTrue(linked["linked_dir"].endswith("is_dir=False"))
+        self.assertNotIn("file_size=5000", linked["linked_file"])
+
+
+if __name__ == "__main__":
+    unittest.main()
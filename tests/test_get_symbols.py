@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.get_symbols import get_symbol_source, get_symbols
+
+SHAPES = '''import math
+from typing import List
+
+
+class Shape:
+    """A shape."""
+
+    def __init__(self, sides: int):
+        self.sides = sides
+
+    def area(self) -> float:
+        return 0.0
+
+    class Meta:
+        def describe(self):
+            return "meta"
+
+
+async def fetch(url, *, retries=3):
+    return url
+
+
+def total(shapes: List[Shape]) -> float:
+    return sum(shape.area() for shape in shapes)
+'''
+
+
+class TestGetSymbols(unittest.TestCase):
+    """
+    Tests the outline tools on a small package.
+
+    These tests ensure that:
+    1. A file's outline lists its imports and nested definitions with signatures and line ranges.
+    2. A directory is outlined file by file.
+    3. A symbol's source is found by its plain or dotted name.
+    4. Unknown symbols, other files and paths outside the sandbox are errors.
+    5. Ignore rules of the working directory apply when outlining a subdirectory.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a module, a package and a text file."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.write("shapes.py", SHAPES)
+        self.write("pkg/mod.py", "x = 1\n")
+        self.write("notes.txt", "not code\n")
+
+    def write(self, rel_path, content):
+        path = os.path.join(self.working_directory, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def test_file_outline(self):
+        """Every definition appears under its parent, with its lines."""
+        self.assertEqual(
+            get_symbols(self.working_directory, "shapes.py"),
+            "\n".join(
+                [
+                    "shapes.py (24 lines)",
+                    "  imports: math; typing: List",
+                    "  class Shape  [5-16]",
+                    "    def __init__(self, sides: int)  [8-9]",
+                    "    def area(self) -> float  [11-12]",
+                    "    class Meta  [14-16]",
+                    "      def describe(self)  [15-16]",
+                    "  async def fetch(url, *, retries=3)  [19-20]",
+                    "  def total(shapes: List[Shape]) -> float  [23-24]",
+                ]
+            ),
+        )
+
+    def test_directory_outline(self):
+        """Each Python file gets a section, in path order; other files are skipped."""
+        result = get_symbols(self.working_directory)
+        sections = result.split("\n\n")
+        self.assertEqual([section.split("\n")[0] for section in sections], ["pkg/mod.py (1 lines)", "shapes.py (24 lines)"])
+        self.assertNotIn("notes.txt", result)
+        self.assertEqual(get_symbols(self.working_directory, "pkg"), "pkg/mod.py (1 lines)")
+
+    def test_root_gitignore_applies_to_subdirectories(self):
+        """A file ignored by the root's .gitignore stays hidden when its directory is outlined."""
+        self.write(".gitignore", "generated_*.py\n")
+        self.write("pkg/generated_parser.py", "y = 2\n")
+        self.write("pkg/__pycache__/stale.py", "z = 3\n")
+        self.assertEqual(get_symbols(self.working_directory, "pkg"), "pkg/mod.py (1 lines)")
+        self.assertNotIn("generated_parser", get_symbols(self.working_directory))
+
+    def test_symbol_source(self):
+        """Only the symbol's lines are returned, under a line header."""
+        self.assertEqual(
+            get_symbol_source(self.working_directory, "shapes.py", "Shape.Meta.describe"),
+            '[Lines 15-16 of 24 in "shapes.py"]\n        def describe(self):\n            return "meta"',
+        )
+        self.assertTrue(get_symbol_source(self.working_directory, "shapes.py", "area").startswith('[Lines 11-12 of 24'))
+
+    def test_errors(self):
+        """Bad requests are answered with an explanation."""
+        self.assertEqual(
+            get_symbol_source(self.working_directory, "shapes.py", "does_not_exist"),
+            'Error: No class or function named "does_not_exist" in "shapes.py". Use get_symbols to list them.',
+        )
+        self.assertEqual(get_symbols(self.working_directory, "notes.txt"), 'Error: "notes.txt" is not a Python file.')
+        self.assertEqual(get_symbols(self.working_directory, "missing"), 'Error: "missing" does not exist.')
+        self.assertTrue(get_symbols(self.working_directory, "../").startswith('Error: Cannot outline "../"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
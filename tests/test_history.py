@@ -0,0 +1,121 @@
+import unittest
+
+from google.genai import types
+
+from history import TRUNCATED_REASONING_PREFIX, HistoryManager
+
+
+def call(name, **args):
+    return types.Content(role="model", parts=[types.Part.from_function_call(name=name, args=args)])
+
+
+def result(name, text):
+    return types.Content(role="tool", parts=[types.Part.from_function_response(name=name, response={"result": text})])
+
+
+def result_text(message):
+    return message.parts[0].function_response.response["result"]
+
+
+class TestSupersededFiles(unittest.TestCase):
+    """
+    Tests which later calls make an old read of a file obsolete.
+
+    These tests ensure that:
+    1. A later whole-file read or a write supersedes an old read.
+    2. A later ranged read or symbol lookup does not, since it only shows part of the file.
+    """
+
+    def setUp(self):
+        """A history whose first read is large enough to be stubbed."""
+        self.content = "".join(f"line {number} of a.py\n" for number in range(200))
+        self.manager = HistoryManager(token_budget=1, keep_recent=2)
+
+    def compact_after(self, *later):
+        """Compacts a read of a.py followed by `later` messages; returns the read's result."""
+        messages = [
+            types.Content(role="user", parts=[types.Part(text="Fix a.py")]),
+            call("get_file_content", file_path="a.py"),
+            result("get_file_content", self.content),
+            *later,
+            types.Content(role="user", parts=[types.Part(text="Go on")]),
+            types.Content(role="model", parts=[types.Part(text="Done")]),
+        ]
+        self.manager.compact(messages)
+        return result_text(messages[2])
+
+    def test_whole_file_read_supersedes(self):
+        """Reading the whole file again makes the first read obsolete."""
+        text = self.compact_after(call("get_file_content", file_path="a.py"), result("get_file_content", self.content))
+        self.assertTrue(text.startswith("[Superseded:"))
+
+    def test_write_supersedes(self):
+        """Writing the file makes the first read obsolete."""
+        text = self.compact_after(call("write_file", file_path="a.py", content="x = 1\n"), result("write_file", "ok"))
+        self.assertTrue(text.startswith("[Superseded:"))
+
+    def test_ranged_read_does_not_supersede(self):
+        """A read of a few lines leaves the rest of the first read needed."""
+        text = self.compact_after(
+            call("get_file_content", file_path="a.py", start_line=10, end_line=12),
+            result("get_file_content", "line 9 of a.py\nline 10 of a.py\nline 11 of a.py\n"),
+        )
+        self.assertFalse(text.startswith("[Superseded:"))
+
+    def test_symbol_source_does_not_supersede(self):
+        """The source of one symbol is not the whole file."""
+        text = self.compact_after(
+            call("get_symbol_source", file_path="a.py", symbol="main"),
+            result("get_symbol_source", "def main():\n    pass\n"),
+        )
+        self.assertFalse(text.startswith("[Superseded:"))
+
+
+class TestCompactionCopies(unittest.TestCase):
+    """
+    Tests how compaction rewrites old turns.
+
+    These tests ensure that:
+    1. Old reasoning is labeled as truncated and keeps its last sentences.
+    2. Compacted messages are copies: the original objects are left unchanged.
+    """
+
+    def setUp(self):
+        """A history with long reasoning, a superseded write and a large result."""
+        self.reasoning = "Let me look at the parser first. " * 20 + "So the bug is in tokenize(). I will fix it there."
+        self.written = "x = 1\n" * 100
+        self.output = "output line\n" * 200
+        self.messages = [
+            types.Content(role="user", parts=[types.Part(text="Fix a.py")]),
+            types.Content(role="model", parts=[types.Part(text=self.reasoning)]),
+            call("write_file", file_path="a.py", content=self.written),
+            result("write_file", "ok"),
+            call("run_python_file", file_path="a.py"),
+            result("run_python_file", self.output),
+            call("write_file", file_path="a.py", content="x = 2\n"),
+            result("write_file", "ok"),
+            types.Content(role="user", parts=[types.Part(text="Go on")]),
+            types.Content(role="model", parts=[types.Part(text="Done")]),
+        ]
+        self.originals = list(self.messages)
+        HistoryManager(token_budget=1, keep_recent=2).compact(self.messages)
+
+    def test_reasoning_is_labeled_truncated(self):
+        """The label says what happened; the conclusion survives."""
+        text = self.messages[1].parts[0].text
+        self.assertTrue(text.startswith(TRUNCATED_REASONING_PREFIX))
+        self.assertTrue(text.endswith("So the bug is in tokenize(). I will fix it there."))
+        self.assertLess(len(text), len(self.reasoning))
+
+    def test_originals_are_unchanged(self):
+        """The checkpoint and response cache may still hold the old objects."""
+        self.assertNotIn("x = 1", self.messages[2].parts[0].function_call.args["content"])
+        self.assertIsNot(self.messages[2], self.originals[2])
+        self.assertEqual(self.originals[1].parts[0].text, self.reasoning)
+        self.assertEqual(self.originals[2].parts[0].function_call.args["content"], self.written)
+        self.assertEqual(result_text(self.originals[5]), self.output)
+        self.assertNotEqual(result_text(self.messages[5]), self.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from config import OUTPUT_HEAD_BYTES, OUTPUT_TAIL_BYTES
+from functions.output_capture import BoundedCapture, capture_streams
+from functions.run_python_file import run_python_file
+
+
+class TestBoundedCapture(unittest.TestCase):
+    """
+    Tests the fixed-size capture of one output stream.
+
+    These tests ensure that:
+    1. Short output is kept whole.
+    2. Long output keeps exactly its head and its tail, however it is chunked.
+    3. The omitted middle is counted and marked.
+    """
+
+    def feed_all(self, data, chunk_sizes, head_bytes=8, tail_bytes=8):
+        capture = BoundedCapture(head_bytes, tail_bytes)
+        position = 0
+        for size in chunk_sizes:
+            capture.feed(data[position:position + size])
+            position += size
+        capture.feed(data[position:])
+        return capture
+
+    def test_short_output_is_kept(self):
+        """Output that fits in head and tail is not truncated."""
+        capture = self.feed_all(b"0123456789abcdef", [3, 5])
+        self.assertFalse(capture.truncated)
+        self.assertEqual(capture.text(), "0123456789abcdef")
+
+    def test_head_and_tail(self):
+        """Only the first and the last bytes survive, around a notice."""
+        data = bytes(range(65, 91)) * 4
+        capture = self.feed_all(data, [1, 20, 7])
+        self.assertTrue(capture.truncated)
+        self.assertEqual(capture.total_bytes, len(data))
+        omitted = len(data) - 16
+        expected = f"{data[:8].decode()}\n[...{omitted} bytes omitted...]\n{data[-8:].decode()}"
+        self.assertEqual(capture.text(), expected)
+
+    def test_any_chunking(self):
+        """Every way of splitting the stream gives the same capture."""
+        generator = random.Random(7)
+        data = bytes(generator.randrange(32, 127) for _ in range(300))
+        expected = self.feed_all(data, []).text()
+        for _ in range(50):
+            sizes = [generator.randrange(0, 40) for _ in range(generator.randrange(1, 20))]
+            self.assertEqual(self.feed_all(data, sizes).text(), expected)
+
+    def test_chunk_larger_than_tail(self):
+        """A single chunk larger than the ring buffer leaves its own end in it."""
+        capture = self.feed_all(b"h" * 8 + b"x" * 100 + b"TAILTAIL", [8, 5])
+        self.assertTrue(capture.text().endswith("\nTAILTAIL"))
+
+
+class TestCaptureStreams(unittest.TestCase):
+    """
+    Tests reading both pipes of a process.
+
+    These tests ensure that:
+    1. Both streams are read until they close, and reported live.
+    2. A stream over the byte cap stops the process.
+    3. The deadline stops the process.
+    """
+
+    def pipes(self):
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        return stdout_r, stdout_w, stderr_r, stderr_w
+
+    def test_both_streams(self):
+        """Output of both streams is captured and passed to the callback."""
+        stdout_r, stdout_w, stderr_r, stderr_w = self.pipes()
+        os.write(stdout_w, b"out\n")
+        os.write(stderr_w, "é\n".encode("utf-8"))
+        os.close(stdout_w)
+        os.close(stderr_w)
+        live = []
+        result = capture_streams(
+            stdout_r, stderr_r, time.monotonic() + 5, kill=lambda: None, on_output=lambda *chunk: live.append(chunk)
+        )
+        self.assertEqual(result.stdout.text(), "out\n")
+        self.assertEqual(result.stderr.text(), "é\n")
+        self.assertEqual(sorted(live), [("stderr", "é\n"), ("stdout", "out\n")])
+        self.assertFalse(result.timed_out)
+        self.assertIsNone(result.capped_stream)
+
+    def test_byte_cap(self):
+        """A stream past max_bytes kills the process."""
+        stdout_r, stdout_w, stderr_r, stderr_w = self.pipes()
+        killed = []
+        os.write(stdout_w, b"x" * 2000)
+        result = capture_streams(
+            stdout_r, stderr_r, time.monotonic() + 5, kill=lambda: killed.append(True), max_bytes=1000
+        )
+        os.close(stdout_w)
+        os.close(stderr_w)
+        self.assertEqual(result.capped_stream, "stdout")
+        self.assertEqual(killed, [True])
+
+    def test_deadline(self):
+        """A process still writing at the deadline is killed."""
+        stdout_r, stdout_w, stderr_r, stderr_w = self.pipes()
+        killed = []
+        result = capture_streams(stdout_r, stderr_r, time.monotonic() + 0.1, kill=lambda: killed.append(True))
+        os.close(stdout_w)
+        os.close(stderr_w)
+        self.assertTrue(result.timed_out)
+        self.assertEqual(killed, [True])
+
+
+class TestScriptOutput(unittest.TestCase):
+    """
+    Tests the output of a real script run.
+
+    These tests ensure that:
+    1. A script printing far more than fits keeps its first and last lines.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a script that prints 100,000 numbered lines."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "loud.py"), "w") as f:
+            f.write("for number in range(100000):\n    print(f'line {number}')\n")
+
+    def test_head_and_tail_of_a_run(self):
+        """The run result shows the start, the end and the size of the gap."""
+        result = run_python_file(self.working_directory, "loud.py", use_cache=False)
+        self.assertIn("line 0\n", result)
+        self.assertIn("line 99999", result)
+        self.assertIn("bytes omitted...]", result)
+        self.assertLess(len(result), OUTPUT_HEAD_BYTES + OUTPUT_TAIL_BYTES + 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from functions.profile_python_file import profile_python_file
+
+SCRIPT = '''import sys
+
+
+def square(n):
+    return n * n
+
+
+def total(count):
+    return sum(square(n) for n in range(count))
+
+
+print(total(int(sys.argv[1])))
+'''
+
+
+class TestProfilePythonFile(unittest.TestCase):
+    """
+    Tests profiling a script in the sandbox.
+
+    These tests ensure that:
+    1. The profile table lists the script's functions, followed by its output.
+    2. `top`, `sort` and `memory` shape the tables.
+    3. Invalid options and paths outside the sandbox are errors.
+    4. The report is written to a private directory that is removed afterwards.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a script that calls a function many times."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "squares.py"), "w") as f:
+            f.write(SCRIPT)
+
+    def profile(self, *args, **options):
+        return profile_python_file(self.working_directory, "squares.py", list(args), **options)
+
+    def test_profile_and_output(self):
+        """Call counts are attributed to file:line(function); the output follows."""
+        result = self.profile("1000")
+        self.assertTrue(result.startswith("PROFILE (top "))
+        self.assertIn("by own time;", result.split("\n")[0])
+        self.assertRegex(result, r"\n\s+1000\s+\S+\s+\S+\s+squares\.py:4\(square\)\n")
+        self.assertIn("\n\nOUTPUT:\nSTDOUT:\n332833500\n", result)
+
+    def test_top_and_cumulative(self):
+        """The table has `top` rows, ranked by cumulative time."""
+        result = self.profile("1000", sort="cumulative", top=3)
+        table = result.split("\n\n")[0].split("\n")
+        self.assertIn("by cumulative time;", table[0])
+        self.assertEqual(len(table), 2 + 3)
+        self.assertIn("squares.py:1(<module>)", table[2])
+
+    def test_memory(self):
+        """Memory tracing adds a table of allocation sites."""
+        result = self.profile("10", top=5, memory=True)
+        self.assertIn("\n\nMEMORY (top ", result)
+        self.assertLess(result.index("PROFILE"), result.index("MEMORY"))
+        self.assertLess(result.index("MEMORY"), result.index("OUTPUT"))
+
+    def test_errors(self):
+        """Bad options and paths are answered without running anything."""
+        self.assertEqual(self.profile(sort="slowest"), 'Error: sort must be "own" or "cumulative".')
+        for top in ("8", 2.5, None, True):
+            with self.subTest(top=top):
+                self.assertEqual(self.profile(top=top), "Error: top must be a whole number.")
+        self.assertTrue(
+            profile_python_file(self.working_directory, "../squares.py").startswith('Error: Cannot execute "../squares.py"')
+        )
+
+    def test_top_as_whole_float(self):
+        """A JSON number like 3.0 counts as 3."""
+        table = self.profile("10", top=3.0).split("\n\n")[0].split("\n")
+        self.assertEqual(len(table), 2 + 3)
+
+    def test_report_directory(self):
+        """The report lives in a fresh 0700 directory, gone once the profile is returned."""
+        created = []
+        real_mkdtemp = tempfile.mkdtemp
+
+        def mkdtemp(**kwargs):
+            path = real_mkdtemp(**kwargs)
+            created.append((path, stat.S_IMODE(os.stat(path).st_mode)))
+            return path
+
+        with mock.patch("functions.profile_python_file.tempfile.mkdtemp", side_effect=mkdtemp):
+            self.assertTrue(self.profile("10").startswith("PROFILE"))
+        ((report_dir, mode),) = created
+        self.assertEqual(mode, 0o700)
+        self.assertFalse(os.path.exists(report_dir))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.get_file_content import get_file_content
+from functions.read_ledger import CHANGES_PREFIX, UNCHANGED_PREFIX, ReadLedger, delta_since
+from functions.write_file import write_file
+
+
+class TestDeltaReads(unittest.TestCase):
+    """
+    Tests answering re-reads of a file with what changed since the model saw it.
+
+    These tests ensure that:
+    1. A re-read of an unchanged file says so instead of repeating it.
+    2. A small change is sent as a unified diff; a large one as the full text.
+    3. full=true, a forgotten entry or another session always get the full text.
+    4. What the model wrote itself counts as seen.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a 50-line file and an empty ledger."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.content = "".join(f"value_{number} = {number}\n" for number in range(50))
+        self.write(self.content)
+        self.ledger = ReadLedger()
+
+    def write(self, content):
+        with open(os.path.join(self.working_directory, "a.py"), "w") as f:
+            f.write(content)
+
+    def read(self, **options):
+        return get_file_content(self.working_directory, "a.py", ledger=self.ledger, **options)
+
+    def test_unchanged_reread(self):
+        """The second read of the same version is a short notice."""
+        self.assertEqual(self.read(), self.content)
+        result = self.read()
+        self.assertTrue(result.startswith(UNCHANGED_PREFIX))
+        self.assertIn("(50 lines)", result)
+
+    def test_small_change_is_a_diff(self):
+        """Changing one line sends only that hunk."""
+        self.read()
+        self.write(self.content.replace("value_25 = 25", "value_25 = 2500"))
+        result = self.read()
+        self.assertTrue(result.startswith(CHANGES_PREFIX))
+        self.assertIn("-value_25 = 25\n+value_25 = 2500", result)
+        self.assertNotIn("value_10 = 10", result)
+        # The diff is now the version the model has
+        self.assertTrue(self.read().startswith(UNCHANGED_PREFIX))
+
+    def test_large_change_is_sent_in_full(self):
+        """A rewrite whose diff is no smaller than the file comes back whole."""
+        self.read()
+        rewritten = "".join(f"renamed_{number} = {number}\n" for number in range(50))
+        self.write(rewritten)
+        self.assertEqual(self.read(), rewritten)
+
+    def test_full_and_forget(self):
+        """Asking for the full text, or losing it from the history, resends it."""
+        self.read()
+        self.assertEqual(self.read(full=True), self.content)
+        self.ledger.forget("./a.py")
+        self.assertEqual(self.read(), self.content)
+
+    def test_ranged_read_is_not_recorded(self):
+        """A few lines are not the whole file, so they are never a diff base."""
+        self.read(start_line=1, end_line=3)
+        self.assertEqual(len(self.ledger), 0)
+        self.assertEqual(self.read(), self.content)
+
+    def test_sessions_do_not_share_ledgers(self):
+        """Another session's read does not count as seen."""
+        self.read()
+        self.assertEqual(get_file_content(self.working_directory, "a.py", ledger=ReadLedger()), self.content)
+
+    def test_own_write_counts_as_seen(self):
+        """Reading back what the model just wrote needs no content."""
+        write_file(self.working_directory, "a.py", "x = 1\n", ledger=self.ledger)
+        self.assertTrue(self.read().startswith(UNCHANGED_PREFIX))
+
+    def test_final_newline_only(self):
+        """A change the line diff cannot show falls back to the full text."""
+        self.assertIsNone(delta_since("a.py", "x = 1\n", "x = 1"))
+
+
+class TestReadLedgerBound(unittest.TestCase):
+    """
+    Tests the size bound of the ledger.
+
+    These tests ensure that:
+    1. Least recently used versions are dropped beyond the bound.
+    2. The most recent version is kept even if it alone exceeds the bound.
+    """
+
+    def test_eviction(self):
+        """Reading an entry keeps it over ones that were not read."""
+        ledger = ReadLedger(max_bytes=10)
+        ledger.record("a.py", "aaaa")
+        ledger.record("b.py", "bbbb")
+        ledger.get("a.py")
+        ledger.record("c.py", "cccc")
+        self.assertEqual(ledger.get("a.py"), "aaaa")
+        self.assertIsNone(ledger.get("b.py"))
+
+    def test_single_large_entry(self):
+        """One file over the bound is still remembered."""
+        ledger = ReadLedger(max_bytes=10)
+        ledger.record("a.py", "a" * 100)
+        self.assertEqual(len(ledger), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from functions.output_store import OutputStore
+from functions.read_tool_output import read_tool_output
+from output_shaping import shape_output
+
+
+class TestOutputShaping(unittest.TestCase):
+    """
+    Tests shortening tool results before they enter the history.
+
+    These tests ensure that:
+    1. A short result is returned unchanged and nothing is stored.
+    2. Repeated lines and repeated stack frames are collapsed with a count.
+    3. A long log keeps its first and last lines and names the stored original.
+    4. Tools that return file content are never shaped.
+    """
+
+    def setUp(self):
+        """Creates an empty output store."""
+        self.store = OutputStore()
+
+    def test_short_output_is_unchanged(self):
+        """Nothing to shorten means nothing to store."""
+        self.assertEqual(shape_output("run_python_file", "STDOUT:\n4", self.store), "STDOUT:\n4")
+        self.assertEqual(len(self.store), 0)
+
+    def test_repeated_lines(self):
+        """A run of identical lines is kept once, with a count."""
+        text = "\n".join(["STDOUT:"] + ["warning: retrying"] * 50 + ["done"])
+        self.assertEqual(
+            shape_output("run_python_file", text, self.store),
+            "STDOUT:\nwarning: retrying  [line repeated 50 times]\ndone\n"
+            '[Output shortened from 52 lines (~228 tokens); the full output is "out-1", readable with read_tool_output]',
+        )
+        self.assertEqual(self.store.get("out-1"), text)
+
+    def test_repeated_stack_frames(self):
+        """A recursion traceback keeps one frame of the cycle."""
+        traceback = (
+            ["Traceback (most recent call last):", '  File "main.py", line 9, in <module>', "    f(1000)"]
+            + ['  File "main.py", line 2, in f', "    return f(n - 1)"] * 30
+            + ["RecursionError: maximum recursion depth exceeded"]
+        )
+        result = shape_output("run_python_file", "\n".join(traceback), self.store)
+        self.assertEqual(result.count('File "main.py", line 2'), 1)
+        self.assertIn("  [Previous frame repeated 29 more times]\nRecursionError", result)
+
+    def test_long_log(self):
+        """Lines that differ only in their numbers keep the first and the last."""
+        log = "\n".join(f"processed item {i} in {i % 7} ms" for i in range(5000))
+        self.assertEqual(
+            shape_output("run_python_file", log, self.store),
+            "processed item 0 in 0 ms\n"
+            "[... 4998 similar lines omitted (lines 2-4999) ...]\n"
+            "processed item 4999 in 1 ms\n"
+            '[Output shortened from 5000 lines (~34723 tokens); the full output is "out-1", readable with read_tool_output]',
+        )
+
+    def test_unshaped_tools(self):
+        """File content is the model's to read in full, however long."""
+        text = "x\n" * 10000
+        self.assertEqual(shape_output("get_file_content", text, self.store), text)
+        self.assertEqual(len(self.store), 0)
+
+
+class TestReadToolOutput(unittest.TestCase):
+    """
+    Tests paging through the original of a shortened result.
+
+    These tests ensure that:
+    1. The requested lines come back exactly as the tool produced them.
+    2. A read that does not fit says where to continue.
+    3. Unknown ids, missing stores and bad ranges are errors.
+    """
+
+    def setUp(self):
+        """Stores a shortened 5000-line log."""
+        self.store = OutputStore()
+        self.log = [f"processed item {i} in {i % 7} ms" for i in range(5000)]
+        shape_output("run_python_file", "\n".join(self.log), self.store)
+
+    def read(self, output_id="out-1", **options):
+        return read_tool_output("calculator", output_id, store=self.store, **options)
+
+    def test_line_range(self):
+        """Lines are numbered from 1 in the original output."""
+        self.assertEqual(
+            self.read(start_line=2500, end_line=2504),
+            '[Lines 2500-2504 of 5000 in output "out-1"]\n' + "\n".join(self.log[2499:2504]) + "\n[...Continue with start_line=2505...]",
+        )
+
+    def test_read_is_bounded(self):
+        """Reading to the end stops at a whole line and names the next one."""
+        result = self.read()
+        header, *lines, footer = result.split("\n")
+        self.assertTrue(header.startswith('[Lines 1-') and header.endswith(' of 5000 in output "out-1"]'))
+        self.assertEqual(lines, self.log[: len(lines)])
+        self.assertEqual(footer, f"[...Continue with start_line={len(lines) + 1}...]")
+
+    def test_errors(self):
+        """Bad requests are answered with an explanation."""
+        self.assertTrue(self.read("out-99").startswith('Error: Unknown output_id "out-99"'))
+        self.assertEqual(read_tool_output("calculator", "out-1"), "Error: No stored tool outputs in this session.")
+        self.assertEqual(self.read(start_line=6000), 'Error: Output "out-1" has only 5000 lines.')
+        self.assertTrue(self.read(start_line=5, end_line=4).startswith("Error: start_line must be"))
+
+
+if __name__ == "__main__":
+    unittest.main()
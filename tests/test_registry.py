@@ -0,0 +1,171 @@
+import inspect
+import unittest
+from typing import Dict, List, Optional, TypedDict
+
+from functions.registry import TOOLS, function_declaration, model_arguments, parse_docstring, tool_declarations, type_schema
+
+
+class Entry(TypedDict, total=False):
+    """
+    One entry of a list argument.
+
+    Attributes:
+        path (str): Where the entry points.
+        size (int): How large it is.
+    """
+
+    path: str
+    size: int
+
+
+def sample_tool(
+    working_directory: str,
+    name: str,
+    count: int = 3,
+    entries: Optional[List[Entry]] = None,
+    options: Optional[Dict[str, str]] = None,
+    verbose: bool = False,
+    *,
+    store: Optional[object] = None,
+) -> str:
+    """
+    Does something with a name.
+    Spans two lines:
+
+    The second paragraph.
+
+    Security:
+        - Not part of the description.
+
+    Args:
+        working_directory (str): Injected by the host.
+        name (str): The name to use,
+            continued on a second line.
+        count (int): How many times. Defaults to three.
+        entries (list, optional): Entries to process.
+        options (dict, optional): Free-form options.
+        verbose (bool): Print more.
+        store (object, optional): Host-side state.
+    """
+    return name
+
+
+class TestModelArguments(unittest.TestCase):
+    """
+    Tests which arguments of a model's function call reach the tool.
+
+    These tests ensure that:
+    1. Declared arguments are passed through unchanged.
+    2. Every host-side keyword-only option of every tool is dropped.
+    3. Unknown names and a missing argument dict are handled.
+    """
+
+    def test_declared_arguments_are_kept(self):
+        """Arguments in the schema pass through as they are."""
+        args = {"file_path": "main.py", "args": ["3 + 5"]}
+        self.assertEqual(model_arguments("run_python_file", args), args)
+
+    def test_limits_are_dropped(self):
+        """The model cannot lift the resource limits of a run."""
+        args = {"file_path": "main.py", "limits": {"cpu_seconds": None}}
+        self.assertEqual(model_arguments("run_python_file", args), {"file_path": "main.py"})
+
+    def test_host_options_are_dropped(self):
+        """No keyword-only parameter of any tool can be set by the model."""
+        for tool in TOOLS:
+            host_options = {
+                name: "from the model"
+                for name, parameter in inspect.signature(tool).parameters.items()
+                if parameter.kind is inspect.Parameter.KEYWORD_ONLY
+            }
+            with self.subTest(tool=tool.__name__):
+                self.assertEqual(model_arguments(tool.__name__, host_options), {})
+
+        # The options the host sets on its tools, named explicitly
+        for name in ("limits", "ledger", "store", "use_cache", "exec_mode", "on_output"):
+            with self.subTest(option=name):
+                self.assertNotIn(name, model_arguments("run_python_file", {name: True}))
+
+    def test_working_directory_is_dropped(self):
+        """The sandbox is always the host's, never the model's."""
+        self.assertEqual(model_arguments("get_files_info", {"working_directory": "/"}), {})
+
+    def test_unknown_arguments_and_none(self):
+        """Hallucinated names are dropped; a call without arguments has none."""
+        self.assertEqual(model_arguments("get_files_info", {"directory": "pkg", "recursive": True}), {"directory": "pkg"})
+        self.assertEqual(model_arguments("get_files_info", None), {})
+
+
+class TestFunctionDeclaration(unittest.TestCase):
+    """
+    Tests deriving a tool's schema from its signature and docstring.
+
+    These tests ensure that:
+    1. The description is the docstring up to its first section, paragraphs kept.
+    2. Parameters become typed properties; the host's parameters are left out.
+    3. Parameters without a default are required; other defaults are described.
+    4. TypedDict items become nested objects; every real tool has a schema.
+    """
+
+    def setUp(self):
+        """Derives the declaration of the sample tool."""
+        self.declaration = function_declaration(sample_tool)
+        self.properties = self.declaration["parameters"]["properties"]
+
+    def test_description(self):
+        """Line breaks inside a paragraph are joined, a line ending in a colon is no section, sections are dropped."""
+        self.assertEqual(self.declaration["name"], "sample_tool")
+        self.assertEqual(self.declaration["description"], "Does something with a name. Spans two lines:\n\nThe second paragraph.")
+
+    def test_properties(self):
+        """Every model-facing parameter is typed and described."""
+        self.assertEqual(list(self.properties), ["name", "count", "entries", "options", "verbose"])
+        self.assertEqual(self.properties["name"], {"type": "STRING", "description": "The name to use, continued on a second line."})
+        self.assertEqual(self.properties["options"]["type"], "OBJECT")
+        self.assertEqual(self.properties["verbose"]["type"], "BOOLEAN")
+
+    def test_required_and_defaults(self):
+        """Only `name` is required; defaults are added unless already described."""
+        self.assertEqual(self.declaration["parameters"]["required"], ["name"])
+        self.assertEqual(self.properties["count"]["description"], "How many times. Defaults to three.")
+        self.assertEqual(self.properties["verbose"]["description"], "Print more. Defaults to false.")
+        self.assertEqual(self.properties["entries"]["description"], "Entries to process.")
+
+    def test_typed_dict_items(self):
+        """A list of TypedDicts is an array of objects with described fields."""
+        self.assertEqual(
+            self.properties["entries"]["items"],
+            {
+                "type": "OBJECT",
+                "properties": {
+                    "path": {"type": "STRING", "description": "Where the entry points."},
+                    "size": {"type": "INTEGER", "description": "How large it is."},
+                },
+                "required": [],
+            },
+        )
+
+    def test_helpers(self):
+        """The docstring parser and type mapping work on their own."""
+        summary, arguments = parse_docstring(sample_tool.__doc__)
+        self.assertIn("store", arguments)
+        self.assertTrue(summary.startswith("Does something"))
+        self.assertEqual(type_schema(Optional[float]), {"type": "NUMBER"})
+        self.assertEqual(type_schema(List[int]), {"type": "ARRAY", "items": {"type": "INTEGER"}})
+        with self.assertRaises(TypeError):
+            type_schema(set)
+
+    def test_every_tool_has_a_declaration(self):
+        """The real tools all derive, in order, with a description for every property."""
+        declarations = tool_declarations()
+        self.assertEqual([declaration["name"] for declaration in declarations], [tool.__name__ for tool in TOOLS])
+        for declaration in declarations:
+            with self.subTest(tool=declaration["name"]):
+                self.assertTrue(declaration["description"])
+                self.assertNotIn("working_directory", declaration["parameters"]["properties"])
+                for name, schema in declaration["parameters"]["properties"].items():
+                    self.assertTrue(schema.get("description"), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
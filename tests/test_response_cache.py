@@ -0,0 +1,46 @@
+import unittest
+
+from google.genai import types
+
+from response_cache import request_key
+
+
+def conversation(result):
+    """A prompt, a run_python_file call and its result."""
+    return [
+        types.Content(role="user", parts=[types.Part(text="Run main.py")]),
+        types.Content(
+            role="model",
+            parts=[types.Part.from_function_call(name="run_python_file", args={"file_path": "main.py"})],
+        ),
+        types.Content(
+            role="tool",
+            parts=[types.Part.from_function_response(name="run_python_file", response={"result": result})],
+        ),
+    ]
+
+
+class TestRequestKey(unittest.TestCase):
+    """
+    Tests the canonical key of a model request.
+
+    These tests ensure that:
+    1. Run measurements, which differ between identical runs, do not change the key.
+    2. Any other difference in a tool result does.
+    """
+
+    def test_run_stats_are_ignored(self):
+        """Two runs that only differ in their timings give the same key."""
+        first = request_key("model", conversation("STDOUT:\nok\n[Run stats: wall 0.10s]"))
+        second = request_key("model", conversation("STDOUT:\nok\n[Run stats: wall 0.25s]"))
+        self.assertEqual(first, second)
+
+    def test_output_changes_the_key(self):
+        """A different output is a different request."""
+        first = request_key("model", conversation("STDOUT:\nok\n[Run stats: wall 0.10s]"))
+        second = request_key("model", conversation("STDOUT:\nfailed\n[Run stats: wall 0.10s]"))
+        self.assertNotEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
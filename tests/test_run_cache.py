@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from functions.run_cache import RunCache
+from functions.run_python_file import RUN_STATS_PREFIX, run_python_file
+from functions.write_file import write_file
+
+CACHED_NOTICE = "[Cached result: "
+
+
+class TestRunCache(unittest.TestCase):
+    """
+    Tests caching of run_python_file results.
+
+    These tests ensure that:
+    1. The same run over the same files is answered from the cache.
+    2. Any change to the workspace or the arguments runs the script again.
+    3. Runs with side effects on the workspace are never cached.
+    4. A cached result does not repeat the original run's measurements.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a script whose output differs on every run, and a private cache."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+        patcher = mock.patch("functions.run_python_file.run_cache", RunCache(cache_directory))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.write("clock.py", "import sys, time\nprint(time.time_ns(), sys.argv[1:])\n")
+        self.write("data.txt", "1\n")
+
+    def write(self, rel_path, content):
+        with open(os.path.join(self.working_directory, rel_path), "w") as f:
+            f.write(content)
+
+    def run_script(self, file_path="clock.py", args=None):
+        return run_python_file(self.working_directory, file_path, args, use_cache=True)
+
+    def test_hit(self):
+        """A repeated run returns the first run's output, marked as cached."""
+        first = self.run_script()
+        second = self.run_script()
+        self.assertNotIn(CACHED_NOTICE, first)
+        self.assertIn(CACHED_NOTICE, second)
+        self.assertEqual(first.split("\n")[1], second.split("\n")[1])
+
+    def test_cached_result_has_no_stale_stats(self):
+        """The measurements of the original run are not replayed."""
+        self.assertIn(RUN_STATS_PREFIX, self.run_script())
+        self.assertNotIn(RUN_STATS_PREFIX, self.run_script())
+
+    def test_workspace_change_invalidates(self):
+        """Changing any file, not only the script, runs the script again."""
+        self.run_script()
+        self.write("data.txt", "2\n")
+        self.assertNotIn(CACHED_NOTICE, self.run_script())
+
+    def test_write_tool_invalidates(self):
+        """A write through write_file is seen as well."""
+        self.run_script()
+        write_file(self.working_directory, "data.txt", "3\n")
+        self.assertNotIn(CACHED_NOTICE, self.run_script())
+
+    def test_ignored_paths_do_not_invalidate(self):
+        """Changes below ignored directories are not part of the fingerprint."""
+        self.run_script()
+        os.makedirs(os.path.join(self.working_directory, "__pycache__"))
+        self.write("__pycache__/clock.cpython-312.pyc", "x")
+        self.assertIn(CACHED_NOTICE, self.run_script())
+
+    def test_arguments_are_part_of_the_key(self):
+        """Other arguments are another run."""
+        self.run_script(args=["a"])
+        self.assertNotIn(CACHED_NOTICE, self.run_script(args=["b"]))
+        self.assertIn(CACHED_NOTICE, self.run_script(args=["a"]))
+
+    def test_side_effects_are_not_cached(self):
+        """A run that changed the workspace is run again next time."""
+        self.write("append.py", "with open('log.txt', 'a') as f:\n    f.write('run\\n')\n")
+        self.run_script("append.py")
+        # Back to the files the first run started from
+        os.remove(os.path.join(self.working_directory, "log.txt"))
+        self.assertNotIn(CACHED_NOTICE, self.run_script("append.py"))
+        with open(os.path.join(self.working_directory, "log.txt")) as f:
+            self.assertEqual(f.read(), "run\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
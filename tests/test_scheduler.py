@@ -0,0 +1,40 @@
+import time
+import unittest
+
+from google.genai import types
+
+from scheduler import ModelScheduler, RateLimiter, SessionDeadlineExceeded
+
+
+class TestModelScheduler(unittest.TestCase):
+    """
+    Tests the pacing of model calls.
+
+    These tests ensure that:
+    1. A call that cannot start before the deadline is not made.
+    2. Its reservation is given back, so it does not delay later calls.
+    """
+
+    def setUp(self):
+        """A limiter that admits one request per minute."""
+        self.limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=0)
+        self.scheduler = ModelScheduler(self.limiter)
+        self.request = {"contents": [types.Content(role="user", parts=[types.Part(text="hi")])]}
+        self.calls = 0
+
+    def call(self, **request):
+        self.calls += 1
+        return None
+
+    def test_deadline_refunds_the_reservation(self):
+        """A call refused for the deadline leaves the limiter as it was."""
+        self.scheduler.generate(self.call, self.request)
+        with self.assertRaises(SessionDeadlineExceeded):
+            self.scheduler.generate(self.call, self.request, deadline=time.monotonic() + 1)
+        self.assertEqual(self.calls, 1)
+        # One minute for the request already made, not two
+        self.assertLess(self.limiter.reserve(0), 61)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from config import SEARCH_MAX_FILE_BYTES
+from functions.search_code import TrigramIndex, search_code
+
+
+class TestSearchCode(unittest.TestCase):
+    """
+    Tests which files `search_code` looks at.
+
+    These tests ensure that:
+    1. Files too large to be indexed are still searched.
+    2. Binary files are not, whatever their size.
+    3. Case-insensitive queries find non-ASCII text in any case.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with a small file and a file too large to index."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        with open(os.path.join(self.working_directory, "small.py"), "w") as f:
+            f.write("def needle():\n    pass\n")
+        filler = "# filler line\n" * (SEARCH_MAX_FILE_BYTES // 14 + 1)
+        with open(os.path.join(self.working_directory, "large.py"), "w") as f:
+            f.write(filler + "needle_in_large = 1\n")
+
+    def test_large_file_is_searched(self):
+        """A match in a file over the index size limit is reported."""
+        result = search_code(self.working_directory, "needle")
+        self.assertIn("small.py:1: def needle():", result)
+        self.assertIn("needle_in_large = 1", result)
+
+    def test_large_file_with_regex(self):
+        """Regex queries scan large files as well."""
+        result = search_code(self.working_directory, r"needle_\w+ = 1", regex=True)
+        self.assertIn("large.py:", result)
+
+    def test_large_binary_file_is_skipped(self):
+        """A binary file is never searched, even when it is not indexed."""
+        with open(os.path.join(self.working_directory, "blob.bin"), "wb") as f:
+            f.write(b"\0" * SEARCH_MAX_FILE_BYTES + b"needle\n")
+        self.assertNotIn("blob.bin", search_code(self.working_directory, "needle"))
+
+    def test_ignore_case_non_ascii(self):
+        """Non-ASCII letters in another case are not filtered out by the index."""
+        with open(os.path.join(self.working_directory, "accents.py"), "w", encoding="utf-8") as f:
+            f.write('GREETING = "ÉCOLE CAFÉ"\nTEMPERATURE = "300 \u212aelvin"\n')
+        self.assertIn("accents.py:1:", search_code(self.working_directory, "école café", ignore_case=True))
+        self.assertIn("accents.py:2:", search_code(self.working_directory, "kelvin", ignore_case=True))
+        self.assertIn("accents.py:2:", search_code(self.working_directory, r"\d+ kelvin", regex=True, ignore_case=True))
+        self.assertEqual(search_code(self.working_directory, "école café"), 'No matches for "école café".')
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """
+    Tests the persisted trigram index.
+
+    These tests ensure that:
+    1. A new index over the same tree loads the saved rows without re-reading files.
+    2. Changed and deleted files are written back, and dropped from the postings.
+    3. An unreadable index file is replaced instead of failing the search.
+    """
+
+    def setUp(self):
+        """Creates a sandbox with two files and a private index directory."""
+        self.working_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.working_directory)
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir)
+        self.write("a.py", "alpha = 1\n")
+        self.write("b.py", "beta = 2\n")
+
+    def write(self, rel_path, content):
+        with open(os.path.join(self.working_directory, rel_path), "w") as f:
+            f.write(content)
+
+    def index(self):
+        index = TrigramIndex(self.working_directory, index_dir=self.index_dir)
+        index.refresh()
+        return index
+
+    def test_reload(self):
+        """The saved index is loaded as it was left."""
+        first = self.index()
+        second = TrigramIndex(self.working_directory, index_dir=self.index_dir)
+        second._load()
+        self.assertEqual(second.files, first.files)
+        self.assertEqual(second.postings, first.postings)
+        self.assertEqual(second.candidates(["alpha"]), [("a.py", True)])
+
+    def test_changes_are_written_back(self):
+        """Rewritten and deleted files are updated on disk and in memory."""
+        index = self.index()
+        self.write("a.py", "gamma = 3\n")
+        os.unlink(os.path.join(self.working_directory, "b.py"))
+        index.note_write("a.py")
+        index.note_write("b.py")
+        index.refresh()
+        self.assertEqual(index.candidates(["alpha"]), [])
+        self.assertEqual(index.candidates(["beta"]), [])
+        self.assertNotIn("b.py", set().union(*index.postings.values()))
+
+        reloaded = TrigramIndex(self.working_directory, index_dir=self.index_dir)
+        reloaded._load()
+        self.assertEqual(reloaded.postings, index.postings)
+        self.assertEqual(reloaded.candidates(["gamma"]), [("a.py", True)])
+
+    def test_corrupt_index_is_rebuilt(self):
+        """Garbage in the index file only costs a rebuild."""
+        index = self.index()
+        with open(index.index_path, "wb") as f:
+            f.write(b"not an index" * 100)
+        self.assertEqual(self.index().candidates(["beta"]), [("b.py", True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_client import ScriptedClient
+from server import AgentServer
+
+
+class TestServerProtocol(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the JSON-lines protocol of the agent server over its Unix socket.
+
+    These tests ensure that:
+    1. A prompt runs a session to its answer, echoing the request id.
+    2. A follow-up with the same session name continues that conversation.
+    3. Requests on one connection may be pipelined.
+    4. Malformed requests are answered with an error, not a dropped connection.
+    5. "close" forgets a session.
+    6. Working directories outside the allowed root are refused.
+    """
+
+    async def asyncSetUp(self):
+        """Starts a server with a scripted model on a socket in a private directory."""
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.working_directory = os.path.join(self.root, "workspace")
+        os.mkdir(self.working_directory)
+        with open(os.path.join(self.working_directory, "main.py"), "w") as f:
+            f.write("print('hello')\n")
+
+        self.client = ScriptedClient([])
+        self.server = AgentServer(self.client, rate_limit=False, allowed_root=self.root)
+        self.address = os.path.join(self.root, "agent.sock")
+        self.serving = asyncio.create_task(self.server.serve(self.address))
+        for _ in range(100):
+            if os.path.exists(self.address):
+                break
+            await asyncio.sleep(0.01)
+        self.reader, self.writer = await asyncio.open_unix_connection(self.address)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.serving.cancel()
+        try:
+            await self.serving
+        except asyncio.CancelledError:
+            pass
+
+    def script(self, *turns):
+        """Appends turns to what the scripted model answers, in order."""
+        self.client.models._script.extend(turns)
+
+    async def send(self, *requests):
+        """Sends requests (dicts or raw lines) on the connection and reads one reply per request."""
+        for request in requests:
+            line = request if isinstance(request, bytes) else json.dumps(request).encode("utf-8")
+            self.writer.write(line + b"\n")
+        await self.writer.drain()
+        replies = [json.loads(await asyncio.wait_for(self.reader.readline(), 10)) for _ in requests]
+        return replies
+
+    def request(self, **fields):
+        return {"working_directory": self.working_directory, **fields}
+
+    async def test_prompt_runs_to_an_answer(self):
+        """The reply carries the id, the session name, the answer and the iteration count."""
+        self.script([{"name": "get_files_info", "args": {}}], "main.py prints hello")
+        (reply,) = await self.send(self.request(id="r1", session="s1", prompt="What does main.py do?"))
+        self.assertEqual(
+            reply,
+            {"id": "r1", "session": "s1", "status": "ok", "result": "main.py prints hello", "iterations": 2},
+        )
+
+    async def test_follow_up_continues_the_session(self):
+        """A second prompt to the same session sees the first exchange."""
+        self.script("first answer", "second answer")
+        await self.send(self.request(session="s1", prompt="first"))
+        (reply,) = await self.send({"session": "s1", "prompt": "second"})
+        self.assertEqual(reply["result"], "second answer")
+        messages = self.server.sessions["s1"].session.messages
+        self.assertEqual([part.text for message in messages for part in message.parts], ["first", "first answer", "second", "second answer"])
+
+    async def test_new_session_gets_a_name(self):
+        """A request without a session name starts a new session and names it."""
+        self.script("answer")
+        (reply,) = await self.send(self.request(prompt="hello"))
+        self.assertEqual(reply["status"], "ok")
+        self.assertIn(reply["session"], self.server.sessions)
+
+    async def test_pipelined_requests(self):
+        """Several requests sent at once are each answered."""
+        self.script("one", "two")
+        replies = await self.send(
+            self.request(id=1, session="a", prompt="first"),
+            self.request(id=2, session="b", prompt="second"),
+        )
+        self.assertEqual(sorted(reply["id"] for reply in replies), [1, 2])
+        self.assertEqual(sorted(reply["result"] for reply in replies), ["one", "two"])
+
+    async def test_malformed_requests(self):
+        """Bad JSON, non-objects, missing prompts and bad directories are errors."""
+        replies = await self.send(
+            b"{not json",
+            b"[1, 2]",
+            {"id": "p", "session": "s"},
+            {"id": "d", "prompt": "hi", "working_directory": os.path.join(self.root, "missing")},
+        )
+        self.assertTrue(all(reply["status"] == "error" for reply in replies))
+        errors = {reply.get("id"): reply["error"] for reply in replies}
+        self.assertEqual(errors["p"], 'Missing "prompt"')
+        self.assertIn("not a directory", errors["d"])
+        # The connection is still usable
+        self.script("still here")
+        (reply,) = await self.send(self.request(prompt="hello"))
+        self.assertEqual(reply["result"], "still here")
+
+    async def test_working_directory_is_confined(self):
+        """Only the allowed root and directories below it can host a session."""
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        os.symlink(outside, os.path.join(self.root, "link"))
+        replies = await self.send(
+            {"id": "abs", "prompt": "hi", "working_directory": outside},
+            {"id": "up", "prompt": "hi", "working_directory": "../"},
+            {"id": "link", "prompt": "hi", "working_directory": "link"},
+        )
+        for reply in replies:
+            with self.subTest(id=reply["id"]):
+                self.assertEqual(reply["status"], "error")
+                self.assertIn("outside the allowed root", reply["error"])
+        self.assertEqual(self.server.sessions, {})
+
+        # A path relative to the root is fine, and so is no path at all
+        self.script("inside", "root")
+        replies = await self.send(
+            {"id": 1, "session": "rel", "prompt": "hi", "working_directory": "workspace"},
+            {"id": 2, "session": "default", "prompt": "hi"},
+        )
+        self.assertEqual({reply["status"] for reply in replies}, {"ok"})
+        self.assertEqual(self.server.sessions["rel"].session.working_directory, os.path.realpath(self.working_directory))
+        self.assertEqual(self.server.sessions["default"].session.working_directory, os.path.realpath(self.root))
+
+    async def test_socket_is_private(self):
+        """The socket is the user's alone; a shared directory is refused."""
+        self.assertEqual(os.stat(self.address).st_mode & 0o777, 0o600)
+        shared = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shared)
+        os.chmod(shared, 0o777)
+        with self.assertRaisesRegex(RuntimeError, "not accessible to others"):
+            await self.server.serve(os.path.join(shared, "agent.sock"))
+
+    async def test_close_forgets_the_session(self):
+        """After "close" the session name starts a fresh conversation."""
+        self.script("answer")
+        await self.send(self.request(session="s1", prompt="hello"))
+        (reply,) = await self.send({"id": "c", "op": "close", "session": "s1"})
+        self.assertEqual(reply, {"id": "c", "session": "s1", "status": "ok"})
+        self.assertNotIn("s1", self.server.sessions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+from tracing import Tracer, payload_size
+
+
+class TestTracerSummary(unittest.TestCase):
+    """
+    Tests the cumulative totals of a traced session.
+
+    These tests ensure that:
+    1. Model spans count iterations, seconds and tokens (missing counts as 0).
+    2. Tool spans are totaled per tool, with their maximum and sizes.
+    3. Other spans only add to "other" time.
+    """
+
+    def setUp(self):
+        """Records two model calls, three tool calls and a compaction."""
+        self.tracer = Tracer()
+        usage = SimpleNamespace(
+            prompt_token_count=100, candidates_token_count=20, cached_content_token_count=None, thoughts_token_count=5
+        )
+        self.tracer.record_model_call(1, 0.0, 1.0, SimpleNamespace(usage_metadata=usage))
+        self.tracer.record_model_call(2, 1.5, 2.0, None)
+        self.tracer.record_tool_call(1, "get_file_content", 1.0, 1.25, args_bytes=10, result_bytes=400)
+        self.tracer.record_tool_call(1, "get_file_content", 1.0, 1.5, args_bytes=12, result_bytes=100)
+        self.tracer.record_tool_call(1, "run_python_file", 1.0, 1.125, args_bytes=30, result_bytes=5)
+        self.tracer.record_span("history", "compact", 2, 1.5, 1.75, history_tokens=900)
+
+    def test_model_totals(self):
+        """Token counts are summed; a call without usage data adds nothing."""
+        summary = self.tracer.summary()
+        self.assertEqual(summary["iterations"], 2)
+        self.assertAlmostEqual(summary["model_seconds"], 1.5)
+        self.assertEqual(
+            [summary[key] for key in ("prompt_tokens", "response_tokens", "cached_tokens", "thoughts_tokens")],
+            [100, 20, 0, 5],
+        )
+
+    def test_tool_totals(self):
+        """Each tool gets its call count, total and maximum time, and sizes."""
+        summary = self.tracer.summary()
+        self.assertAlmostEqual(summary["tool_seconds"], 0.875)
+        self.assertEqual(
+            summary["tools"]["get_file_content"],
+            {"calls": 2, "seconds": 0.75, "max_seconds": 0.5, "args_bytes": 22, "result_bytes": 500},
+        )
+        self.assertEqual(summary["tools"]["run_python_file"]["calls"], 1)
+
+    def test_other_spans(self):
+        """A compaction span is neither model nor tool time."""
+        summary = self.tracer.summary()
+        self.assertAlmostEqual(summary["other_seconds"], 0.25)
+        self.assertGreater(summary["wall_seconds"], 0)
+
+    def test_concurrent_recording(self):
+        """Tool calls recorded from several threads are all kept."""
+        tracer = Tracer()
+        threads = [
+            threading.Thread(target=lambda: [tracer.record_tool_call(1, "t", 0.0, 0.0, 1, 1) for _ in range(100)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tracer.summary()["tools"]["t"]["calls"], 400)
+
+
+class TestTracerExport(unittest.TestCase):
+    """
+    Tests writing the spans of a session to a file.
+
+    These tests ensure that:
+    1. A ".json" path gets a Chrome trace of complete events in microseconds.
+    2. Any other path gets one JSON span per line and a closing summary line.
+    """
+
+    def setUp(self):
+        """Records one model and one tool span at known times."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.tracer = Tracer()
+        origin = self.tracer._origin
+        self.tracer.record_model_call(1, origin + 0.5, origin + 1.5, None)
+        self.tracer.record_tool_call(1, "get_files_info", origin + 1.5, origin + 1.502, args_bytes=2, result_bytes=80)
+
+    def test_chrome_trace(self):
+        """Events carry the span's kind, times, thread and details."""
+        path = os.path.join(self.directory, "nested", "trace.json")
+        self.tracer.export(path)
+        with open(path) as f:
+            trace = json.load(f)
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+        model, tool = trace["traceEvents"]
+        self.assertEqual(
+            {key: model[key] for key in ("name", "cat", "ph", "ts", "dur", "pid", "tid")},
+            {
+                "name": "generate_content",
+                "cat": "model",
+                "ph": "X",
+                "ts": 500000,
+                "dur": 1000000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            },
+        )
+        self.assertEqual(model["args"]["iteration"], 1)
+        self.assertEqual((tool["cat"], tool["ts"], tool["dur"]), ("tool", 1500000, 2000))
+        self.assertEqual(tool["args"], {"iteration": 1, "args_bytes": 2, "result_bytes": 80})
+
+    def test_jsonl(self):
+        """Spans come one per line, followed by the summary."""
+        path = os.path.join(self.directory, "trace.jsonl")
+        self.tracer.export(path)
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["kind"] for line in lines], ["model", "tool", "summary"])
+        self.assertEqual(lines[1]["name"], "get_files_info")
+        self.assertEqual(lines[2]["iterations"], 1)
+        self.assertIn("started_at", lines[2])
+
+    def test_payload_size(self):
+        """Sizes are UTF-8 bytes of strings, or of the JSON form of anything else."""
+        self.assertEqual(payload_size(None), 0)
+        self.assertEqual(payload_size("é"), 2)
+        self.assertEqual(payload_size({"a": 1}), len('{"a": 1}'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from functions.write_file import atomic_write_text, stage_text
+
+
+class TestAtomicWritePermissions(unittest.TestCase):
+    """
+    Tests the permission bits of files written atomically.
+
+    These tests ensure that:
+    1. A new file gets 0666 minus the umask in effect when it is written.
+    2. A rewritten file keeps its own bits.
+    3. A named temporary file that already exists is not overwritten.
+    """
+
+    def setUp(self):
+        """Creates an empty directory and sets a known umask for the test."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(os.umask, os.umask(0o027))
+
+    def mode(self, name):
+        return stat.S_IMODE(os.stat(os.path.join(self.directory, name)).st_mode)
+
+    def test_new_file_follows_the_umask(self):
+        """The kernel applies the current umask, not one read earlier."""
+        atomic_write_text(os.path.join(self.directory, "a.py"), "x = 1\n")
+        self.assertEqual(self.mode("a.py"), 0o640)
+        os.umask(0o022)
+        atomic_write_text(os.path.join(self.directory, "b.py"), "x = 1\n")
+        self.assertEqual(self.mode("b.py"), 0o644)
+
+    def test_existing_file_keeps_its_bits(self):
+        """An executable script stays executable after a rewrite."""
+        path = os.path.join(self.directory, "run.sh")
+        with open(path, "w") as f:
+            f.write("echo old\n")
+        os.chmod(path, 0o751)
+        atomic_write_text(path, "echo new\n")
+        self.assertEqual(self.mode("run.sh"), 0o751)
+        with open(path) as f:
+            self.assertEqual(f.read(), "echo new\n")
+        self.assertEqual(os.listdir(self.directory), ["run.sh"])
+
+    def test_named_temp_file_must_not_exist(self):
+        """A clash with an existing temporary name is an error, not an overwrite."""
+        with open(os.path.join(self.directory, ".part"), "w") as f:
+            f.write("keep")
+        with self.assertRaises(FileExistsError):
+            stage_text(os.path.join(self.directory, "a.py"), "x = 1\n", ".part")
+        with open(os.path.join(self.directory, ".part")) as f:
+            self.assertEqual(f.read(), "keep")
+
+
+if __name__ == "__main__":
+    unittest.main()
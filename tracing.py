@@ -0,0 +1,184 @@
+"""
+Lightweight tracing of an agent session.
+
+Every model call and every tool call is recorded as a timed span with its
+iteration number and sizes (tokens for the model, argument and result bytes
+for tools). The tracer keeps cumulative totals for an end-of-run summary and
+can export all spans either as JSONL (one span per line, easy to diff and
+aggregate) or in the Chrome trace format (open in chrome://tracing or
+https://ui.perfetto.dev to see tool calls overlapping on their threads).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _usage_tokens(usage: Any) -> Dict[str, int]:
+    """Extracts token counts from a response's `usage_metadata` (fields may be None)."""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "response_tokens": getattr(usage, "candidates_token_count", None) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+        "thoughts_tokens": getattr(usage, "thoughts_token_count", None) or 0,
+    }
+
+
+class Tracer:
+    """
+    Thread-safe recorder of session spans.
+
+    Spans are plain dicts: {"kind", "name", "iteration", "start", "duration",
+    "thread", **details}, with times in seconds relative to the tracer's
+    creation. Tool calls record from worker threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """Returns the current time on the tracer's clock."""
+        return time.perf_counter()
+
+    def _record(self, kind: str, name: str, iteration: int, start: float, end: float, **details: Any) -> None:
+        span = {
+            "kind": kind,
+            "name": name,
+            "iteration": iteration,
+            "start": start - self._origin,
+            "duration": end - start,
+            "thread": threading.get_ident(),
+        }
+        span.update(details)
+        with self._lock:
+            self.spans.append(span)
+
+    def record_model_call(self, iteration: int, start: float, end: float, response: Any = None) -> None:
+        """Records one `generate_content` round trip and its token usage."""
+        usage = getattr(response, "usage_metadata", None)
+        self._record("model", "generate_content", iteration, start, end, **_usage_tokens(usage))
+
+    def record_tool_call(
+        self,
+        iteration: int,
+        name: str,
+        start: float,
+        end: float,
+        args_bytes: int,
+        result_bytes: int,
+    ) -> None:
+        """Records one tool execution."""
+        self._record("tool", name, iteration, start, end, args_bytes=args_bytes, result_bytes=result_bytes)
+
+    def record_span(self, kind: str, name: str, iteration: int, start: float, end: float, **details: Any) -> None:
+        """Records any other timed step (e.g. history compaction)."""
+        self._record(kind, name, iteration, start, end, **details)
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns cumulative totals over all recorded spans."""
+        with self._lock:
+            spans = list(self.spans)
+
+        totals: Dict[str, Any] = {
+            "iterations": 0,
+            "model_seconds": 0.0,
+            "tool_seconds": 0.0,
+            "other_seconds": 0.0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "cached_tokens": 0,
+            "thoughts_tokens": 0,
+            "tools": {},
+        }
+        for span in spans:
+            if span["kind"] == "model":
+                totals["iterations"] += 1
+                totals["model_seconds"] += span["duration"]
+                for key in ("prompt_tokens", "response_tokens", "cached_tokens", "thoughts_tokens"):
+                    totals[key] += span[key]
+            elif span["kind"] == "tool":
+                totals["tool_seconds"] += span["duration"]
+                tool = totals["tools"].setdefault(
+                    span["name"],
+                    {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "args_bytes": 0, "result_bytes": 0},
+                )
+                tool["calls"] += 1
+                tool["seconds"] += span["duration"]
+                tool["max_seconds"] = max(tool["max_seconds"], span["duration"])
+                tool["args_bytes"] += span["args_bytes"]
+                tool["result_bytes"] += span["result_bytes"]
+            else:
+                totals["other_seconds"] += span["duration"]
+        totals["wall_seconds"] = time.perf_counter() - self._origin
+        return totals
+
+    def format_summary(self) -> str:
+        """Renders `summary()` for the terminal."""
+        totals = self.summary()
+        lines = [
+            f"Iterations: {totals['iterations']} "
+            f"(wall {totals['wall_seconds']:.2f}s: model {totals['model_seconds']:.2f}s, "
+            f"tools {totals['tool_seconds']:.2f}s, other {totals['other_seconds']:.2f}s)",
+            f"Tokens: prompt {totals['prompt_tokens']}, response {totals['response_tokens']}, "
+            f"cached {totals['cached_tokens']}, thoughts {totals['thoughts_tokens']}",
+        ]
+        for name, tool in sorted(totals["tools"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"  {name}: {tool['calls']} calls, {tool['seconds']:.3f}s total, "
+                f"{tool['max_seconds']:.3f}s max, {tool['args_bytes']} B args, {tool['result_bytes']} B results"
+            )
+        return "\n".join(lines)
+
+    def export(self, path: str) -> None:
+        """
+        Writes all spans to `path`: Chrome trace format if it ends in ".json",
+        JSONL (one span per line, then a summary line) otherwise.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump({"traceEvents": [_chrome_event(span) for span in spans], "displayTimeUnit": "ms"}, f)
+                return
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+            f.write(json.dumps({"kind": "summary", "started_at": self._wall_origin, **self.summary()}) + "\n")
+
+
+def _chrome_event(span: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a span to a Chrome trace "complete" event (times in microseconds)."""
+    details = {
+        key: value
+        for key, value in span.items()
+        if key not in ("kind", "name", "start", "duration", "thread")
+    }
+    return {
+        "name": span["name"],
+        "cat": span["kind"],
+        "ph": "X",
+        "ts": round(span["start"] * 1e6),
+        "dur": round(span["duration"] * 1e6),
+        "pid": os.getpid(),
+        "tid": span["thread"],
+        "args": details,
+    }
+
+
+def payload_size(value: Optional[Any]) -> int:
+    """Approximate size in bytes of a tool argument dict or result, as JSON."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(value).encode("utf-8"))